@@ -0,0 +1,130 @@
+"""
+Synthetic load generator for `fcdm serve`.
+
+Writes --images candidate trees (a mix of clean, root-login and open-port
+drifts), submits them to the daemon over HTTP from --clients concurrent
+clients (retrying when the queue pushes back with 503) and waits for every
+verdict. Reports end-to-end throughput and p50/p99 submit-to-verdict
+latency, next to the time of a few cold `python -m fcdm V1 V2` runs.
+
+Without --url an in-process daemon is started on a free port.
+
+    python benchmarks/bench_daemon.py --images 500 --clients 8
+    python benchmarks/bench_daemon.py --url http://127.0.0.1:8765 --baseline /path/to/v1
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "test"))
+
+from fcdm.fcdm_daemon import AuditDaemon, make_handler, percentile
+from test_batch import make_image
+
+
+def call(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data)) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def audit(url, path, poll=0.005):
+    """Submits one candidate and blocks until its verdict; returns (status, latency)."""
+    start = time.perf_counter()
+    while True:
+        code, body = call(url + "/audit", {'path': path})
+        if code == 202:
+            break
+        time.sleep(poll if code == 503 else 0)
+        if code != 503:
+            raise RuntimeError(body)
+
+    while True:
+        _, job = call(f"{url}/results/{body['id']}")
+        if job['status'] not in ('QUEUED', 'RUNNING'):
+            return job['status'], time.perf_counter() - start
+        time.sleep(poll)
+
+
+def make_candidates(work_dir, count):
+    variants = [{}, {'root': 'on'}, {'ports': ['23']}, {'password': 'on', 'ports': ['80', '8080']}]
+    return [make_image(work_dir, f"candidate-{index:05d}", **variants[index % len(variants)])
+            for index in range(count)]
+
+
+def cold_run(baseline, candidate):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'fcdm', baseline, candidate, '--no-cache'],
+                   cwd=PROJECT_ROOT, capture_output=True, check=False)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--queue-size', type=int, default=16, help="queue size of the in-process daemon")
+    parser.add_argument('--url', default=None, help="audit against an already running daemon")
+    parser.add_argument('--baseline', default=None, help="baseline of the running daemon, for the cold runs")
+    parser.add_argument('--cold-samples', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        baseline = args.baseline or make_image(work_dir, "v1")
+        candidates = make_candidates(work_dir, args.images)
+
+        server = daemon = None
+        url = args.url
+        if url is None:
+            daemon = AuditDaemon(baseline, queue_size=args.queue_size)
+            daemon.start()
+            server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(daemon))
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.clients) as pool:
+                outcomes = list(pool.map(lambda path: audit(url, path), candidates))
+            elapsed = time.perf_counter() - start
+            _, stats = call(url + "/stats")
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+                daemon.stop(timeout=5)
+
+        latencies = [latency for _, latency in outcomes]
+        statuses = {}
+        for status, _ in outcomes:
+            statuses[status] = statuses.get(status, 0) + 1
+
+        print(f"images: {len(candidates)}  clients: {args.clients}  verdicts: {statuses}")
+        print(f"throughput: {len(candidates) / elapsed:.1f} audits/s")
+        print(f"latency (client, submit to verdict): p50 {percentile(latencies, 0.50) * 1000:.1f} ms  "
+              f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms  max {max(latencies) * 1000:.1f} ms")
+        print(f"daemon: p50 {stats.get('latency_p50_ms', 0):.1f} ms  p99 {stats.get('latency_p99_ms', 0):.1f} ms  "
+              f"rejected submissions: {stats['rejected']}")
+
+        if args.cold_samples:
+            cold = [cold_run(baseline, candidates[index % len(candidates)]) for index in range(args.cold_samples)]
+            print(f"cold CLI run: {sum(cold) / len(cold) * 1000:.1f} ms per audit (mean of {len(cold)})")
+
+
+if __name__ == "__main__":
+    main()
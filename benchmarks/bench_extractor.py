@@ -0,0 +1,81 @@
+"""
+Compares the direct SquashFS extractor backend with the binwalk backend.
+
+Builds a synthetic sysupgrade-style image (kernel blob followed by a SquashFS
+root filesystem) of roughly --size-mb megabytes and times extract_config()
+with each available backend.
+
+    python benchmarks/bench_extractor.py --size-mb 40 --repeat 5
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "test"))
+
+from fcdm.fcdm_extractor import FirmwareExtractor
+from squashfs_builder import build_squashfs
+
+
+def build_image(path, size_mb):
+    files = {
+        "etc/config/dropbear": b"config dropbear\n\toption PasswordAuth 'off'\n\toption RootPasswordAuth 'off'\n",
+        "etc/config/firewall": b"config rule\n\toption src 'wan'\n\toption dest_port '22'\n\toption target 'ACCEPT'\n",
+    }
+    # Incompressible payload spread over many files stands in for the rest of the rootfs.
+    chunk = 256 * 1024
+    for index in range(max(1, (size_mb * 1024 * 1024 - 3 * 1024 * 1024) // chunk)):
+        files[f"usr/lib/blob_{index:04d}.so"] = os.urandom(chunk)
+
+    with open(path, 'wb') as f:
+        f.write(os.urandom(3 * 1024 * 1024))
+        f.write(build_squashfs(files))
+
+
+def time_backend(backend, image_path, work_dir, repeat):
+    timings = []
+    for run in range(repeat):
+        base_dir = os.path.join(work_dir, f"{backend}-{run}")
+        os.makedirs(base_dir)
+        extractor = FirmwareExtractor(base_dir=base_dir, backend=backend)
+        start = time.perf_counter()
+        config_path = extractor.extract_config(image_path)
+        timings.append(time.perf_counter() - start)
+        if config_path is None:
+            raise RuntimeError(f"{backend} backend failed to extract the config.")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    backends = ['squashfs']
+    if shutil.which('binwalk'):
+        backends.append('binwalk')
+    else:
+        print("[INFO] binwalk not installed; timing the squashfs backend only.")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        image_path = os.path.join(work_dir, "firmware.img")
+        build_image(image_path, args.size_mb)
+        print(f"Image: {os.path.getsize(image_path) / 1e6:.1f} MB")
+
+        results = {backend: time_backend(backend, image_path, work_dir, args.repeat) for backend in backends}
+
+    print(f"\n{'backend':<10} {'median (s)':>12} {'min (s)':>10}")
+    for backend, timings in results.items():
+        print(f"{backend:<10} {statistics.median(timings):>12.4f} {min(timings):>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
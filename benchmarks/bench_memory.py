@@ -0,0 +1,83 @@
+"""
+Checks that peak RSS stays flat when parsing ever larger hostile config files.
+
+For each size a firewall config is written that is mostly one giant line
+followed by a very large number of rule sections. Each file is parsed in a
+fresh interpreter, once with the default read limits and once effectively
+unbounded, and the child's peak RSS is reported.
+
+    python benchmarks/bench_memory.py --sizes-mb 8 32 128
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+
+CHILD = """
+import json, sys
+sys.path.insert(0, {root!r})
+from fcdm.fcdm_metrics import peak_rss_kb
+from fcdm.fcdm_parser import ConfigParser
+from fcdm.fcdm_uci import ReadLimits
+
+limits = None if {bounded} else ReadLimits(2 ** 62, 2 ** 62, 2 ** 62)
+diagnostics = []
+parser = ConfigParser(limits=limits)
+_, open_ports = parser.parse_config_dir({config_dir!r}, diagnostics=diagnostics)
+print(json.dumps({{'peak_rss_kb': peak_rss_kb(), 'open_ports': sorted(open_ports),
+                  'diagnostics': sorted(d['kind'] for d in diagnostics)}}))
+"""
+
+RULE = "config rule\n\toption src 'wan'\n\toption dest_port '22'\n\toption target 'ACCEPT'\n"
+
+
+def write_config(config_dir, size_mb):
+    os.makedirs(config_dir, exist_ok=True)
+    with open(os.path.join(config_dir, "dropbear"), 'w') as f:
+        f.write("config dropbear\n\toption PasswordAuth 'off'\n")
+
+    size = size_mb * 1024 * 1024
+    with open(os.path.join(config_dir, "firewall"), 'w') as f:
+        f.write("config rule\n\toption name '")
+        chunk = "A" * (1024 * 1024)
+        for _ in range(size // 2 // len(chunk)):
+            f.write(chunk)
+        f.write("'\n")
+        # Written in batches: a forked child's ru_maxrss starts from the parent's RSS.
+        rules = size // 2 // len(RULE)
+        for start in range(0, rules, 10000):
+            f.write(RULE * min(10000, rules - start))
+
+
+def measure(config_dir, bounded):
+    code = CHILD.format(root=PROJECT_ROOT, bounded=bounded, config_dir=config_dir)
+    completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes-mb', type=int, nargs='+', default=[8, 32, 128])
+    parser.add_argument('--skip-unbounded', action='store_true', help="only measure the default read limits")
+    args = parser.parse_args()
+
+    print(f"{'size MB':>8} {'bounded RSS MB':>15} {'unbounded RSS MB':>17}  diagnostics")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size_mb in args.sizes_mb:
+            config_dir = os.path.join(work_dir, f"config-{size_mb}")
+            write_config(config_dir, size_mb)
+
+            bounded = measure(config_dir, bounded=True)
+            unbounded = None if args.skip_unbounded else measure(config_dir, bounded=False)
+            unbounded_mb = f"{unbounded['peak_rss_kb'] / 1024:.1f}" if unbounded else "-"
+            print(f"{size_mb:>8} {bounded['peak_rss_kb'] / 1024:>15.1f} {unbounded_mb:>17}  "
+                  f"{', '.join(bounded['diagnostics']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares the per-port Bool encoding of the port surface with the bit-vector encoding.
+
+For each policy size (number of critical ports) a fresh policy is compiled and
+the verifier is timed on the Z3 path (the fast path is disabled):
+
+  cold  - first check: formula generation, baseline load and solve
+  warm  - a further candidate against the loaded baseline (push/pop)
+
+    python benchmarks/bench_port_encoding.py --ports 10 100 1000 --repeat 5
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_policy import DEFAULT_POLICY_PATH, CompiledPolicy
+from fcdm.fcdm_policy_verifier import PolicyVerifier
+
+
+def make_policy(port_count):
+    with open(DEFAULT_POLICY_PATH) as f:
+        document = json.load(f)
+    document['critical_ports'] = [str(1000 + index) for index in range(port_count - 1)] + ['23']
+    return CompiledPolicy(document)
+
+
+def time_encoding(port_count, encoding, repeat, rng):
+    secure = {"root_login_allowed": False, "password_auth_enabled": False}
+    unknown = {"root_login_allowed": None, "password_auth_enabled": False}
+    timings = {'cold': [], 'warm': []}
+
+    for _ in range(repeat):
+        policy = make_policy(port_count)
+        ports = sorted(policy.ports)
+        verifier = PolicyVerifier(fast_path=False, policy=policy, port_encoding=encoding)
+
+        start = time.perf_counter()
+        verifier.check_security_drift(secure, unknown, set(), set(rng.sample(ports, 3)))
+        timings['cold'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        result_text = verifier.check_candidate(unknown, set(rng.sample(ports, 3)))
+        timings['warm'].append(time.perf_counter() - start)
+        if "CRITICAL DRIFT DETECTED" not in result_text:
+            raise RuntimeError(f"{encoding} encoding missed the opened ports.")
+
+    return {phase: statistics.median(values) * 1000 for phase, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ports', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'ports':>6} {'encoding':>8} {'cold ms':>9} {'warm ms':>9}")
+    for port_count in args.ports:
+        for encoding in ('bool', 'bitvec'):
+            median = time_encoding(port_count, encoding, args.repeat, rng)
+            print(f"{port_count:>6} {encoding:>8} {median['cold']:>9.2f} {median['warm']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Runs N local worker processes against one shared queue directory.
+
+Generates --images candidates of a corpus profile (see corpus.py), queues
+them against the profile's baseline and drains the queue with 1..--workers
+worker processes, reporting throughput for each count. With --kill-one, one
+extra worker is killed while it holds a lease: its job is claimed again once
+the lease expires, and every job still ends up done exactly once.
+
+    python benchmarks/bench_queue.py --profile medium --images 64 --workers 4 --kill-one
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from corpus import DRIFTS, PROFILES, generate
+from fcdm.fcdm_queue import _work_process, open_broker, run_workers
+
+
+def expected_verdicts(candidate_dirs):
+    return {os.path.abspath(path): 'PASS' if DRIFTS[index % len(DRIFTS)] is None else 'DRIFT'
+            for index, path in enumerate(candidate_dirs)}
+
+
+def drain(work_dir, name, baseline_dir, candidate_dirs, workers, lease):
+    queue_dir = os.path.join(work_dir, name)
+    broker = open_broker(queue_dir)
+    for candidate in candidate_dirs:
+        broker.submit(baseline_dir, candidate)
+
+    start = time.perf_counter()
+    run_workers(queue_dir, workers, use_cache=False, backend='squashfs', lease_seconds=lease, poll_interval=0.05,
+                exit_when_idle=True, log_file_path=os.path.join(work_dir, "fcdm_analysis.log"),
+                results_path=os.path.join(work_dir, "results.sqlite3"))
+    return time.perf_counter() - start, broker
+
+
+def kill_one(work_dir, baseline_dir, candidate_dirs, workers, lease):
+    """Kills a worker holding a lease, then drains the queue with `workers` fresh workers."""
+    queue_dir = os.path.join(work_dir, "kill")
+    broker = open_broker(queue_dir)
+    for candidate in candidate_dirs:
+        broker.submit(baseline_dir, candidate)
+
+    options = {'use_cache': False, 'backend': 'squashfs', 'lease_seconds': lease, 'poll_interval': 0.05,
+               'exit_when_idle': True, 'log_file_path': os.path.join(work_dir, "fcdm_analysis.log"),
+               'results_path': os.path.join(work_dir, "results.sqlite3")}
+    victim = multiprocessing.get_context('spawn').Process(target=_work_process, args=(queue_dir, 99, options))
+    victim.start()
+    while not broker.stats()['leased']:
+        time.sleep(0.001)
+    victim.kill()
+    victim.join()
+    print(f"killed worker {victim.pid} holding a lease; stats: {json.dumps(broker.stats())}")
+
+    start = time.perf_counter()
+    run_workers(queue_dir, workers, use_cache=False, backend='squashfs', lease_seconds=lease, poll_interval=0.05,
+                exit_when_idle=True, log_file_path=options['log_file_path'], results_path=options['results_path'])
+    return time.perf_counter() - start, broker
+
+
+def check(broker, candidate_dirs):
+    jobs = broker.jobs()
+    verdicts = {job['v2']: (job['result'] or {}).get('verdict') for job in jobs}
+    if verdicts != expected_verdicts(candidate_dirs) or any(job['status'] != 'done' for job in jobs):
+        raise RuntimeError(f"queue did not finish every job with the expected verdict: {broker.stats()}")
+    return max(job['attempts'] for job in jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=list(PROFILES), default='medium')
+    parser.add_argument('--images', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--lease', type=float, default=2.0, help="lease length in seconds (default: 2)")
+    parser.add_argument('--kill-one', action='store_true', help="kill a worker mid-job and check its job is retried")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        baseline_dir, candidate_dirs = generate(os.path.join(work_dir, "corpus"), args.profile, args.images)
+        print(f"{'workers':>8} {'seconds':>10} {'audits/s':>10}")
+        for workers in range(1, args.workers + 1):
+            elapsed, broker = drain(work_dir, f"queue-{workers}", baseline_dir, candidate_dirs, workers, args.lease)
+            check(broker, candidate_dirs)
+            print(f"{workers:>8} {elapsed:>10.3f} {args.images / elapsed:>10.1f}")
+
+        if args.kill_one:
+            elapsed, broker = kill_one(work_dir, baseline_dir, candidate_dirs, args.workers, args.lease)
+            attempts = check(broker, candidate_dirs)
+            print(f"after the kill: every job done once in {elapsed:.3f}s, at most {attempts} attempt(s) per job")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Query latency of the result store (fcdm_results) over a large audit history.
+
+Fills a fresh store with --audits synthetic audits spread over a year
+(device models, candidate builds, rule violations and opened ports drawn
+at random) and times typical questions as the median of --repeat runs.
+
+    python benchmarks/bench_results.py --audits 300000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_results import ResultStore
+
+MODELS = [f"{vendor} {product}" for vendor in ("TP-Link", "Netgear", "Linksys", "GL.iNet")
+          for product in ("AX1800", "AC1200", "C7", "MT300", "WRT3200")]
+PORTS = ['21', '23', '53', '80', '443', '2323', '8080', '8443']
+
+
+def synthetic_audits(count, now, seed=0):
+    rng = random.Random(seed)
+    # Several builds usually share their policy files, and so their config fingerprint.
+    fingerprints = [f"{rng.getrandbits(256):064x}" for _ in range(max(1, count // 100))]
+    builds = [(f"{rng.getrandbits(256):064x}", rng.choice(fingerprints), rng.choice(MODELS))
+              for _ in range(max(1, count // 20))]
+    for index in range(count):
+        image_hash, fingerprint, model = rng.choice(builds)
+        violations = []
+        if rng.random() < 0.2:
+            violations.append({'rule': 'auth_integrity', 'settings': {'root_login_allowed': {}}, 'ports': []})
+        if rng.random() < 0.3:
+            violations.append({'rule': 'network_surface', 'settings': {},
+                               'ports': sorted(rng.sample(PORTS, rng.randint(1, 2)))})
+        yield {'ts': now - rng.random() * 365 * 86400, 'run_id': f"{index:012x}", 'v1_path': "/images/baseline.bin",
+               'v2_path': f"/images/{image_hash[:8]}.bin", 'v1_hash': "0" * 64, 'v2_hash': fingerprint,
+               'v2_image': image_hash,
+               'device_model': model, 'verdict': 'DRIFT' if violations else 'PASS', 'engine': 'fast_path',
+               'policy': "1", 'violations': violations}
+
+
+def median_ms(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--audits', type=int, default=300000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    now = time.time()
+    quarter = (now - 180 * 86400, now - 90 * 86400)
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, "results.sqlite3")
+        store = ResultStore(path)
+        start = time.perf_counter()
+        audits = list(synthetic_audits(args.audits, now))
+        for offset in range(0, len(audits), 10000):
+            store.record_many(audits[offset:offset + 10000])
+        elapsed = time.perf_counter() - start
+        print(f"stored {args.audits} audits in {elapsed:.1f}s ({args.audits / elapsed:.0f}/s), "
+              f"{os.path.getsize(path) / args.audits:.0f} bytes per audit")
+
+        sample = audits[len(audits) // 2]
+        queries = {
+            "port 23, last quarter (newest 50)": lambda: store.query(50, port='23', since=quarter[0], until=quarter[1]),
+            "port 23, last quarter (count)": lambda: store.count(port='23', since=quarter[0], until=quarter[1]),
+            "port 23, last quarter (builds)": lambda: store.builds(100, port='23', since=quarter[0], until=quarter[1]),
+            "rule auth_integrity, model TP-Link*": lambda: store.query(50, rule='auth_integrity',
+                                                                       device_model="TP-Link*"),
+            "history of one build (hash prefix)": lambda: store.query(50, image_hash=sample['v2_image'][:12]),
+            "drifts in the last 7 days": lambda: store.query(50, verdict='DRIFT', since=now - 7 * 86400),
+        }
+        print(f"{'query':<40} {'median ms':>10} {'rows':>6}")
+        for name, function in queries.items():
+            rows = function()
+            print(f"{name:<40} {median_ms(function, args.repeat):>10.2f} "
+                  f"{rows if isinstance(rows, int) else len(rows):>6}")
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Per-audit latency of the per-rule Z3 queries as the rule set grows.
+
+Builds policies of --rules port rules (plus the default auth rule), checks
+candidates with an unknown setting on the Z3 path, and reports the median
+warm check time. With --slow, one rule's solver also carries a hard
+pigeonhole assertion: that rule times out after --timeout-ms and is
+reported as UNKNOWN while the others are still decided.
+
+    python benchmarks/bench_rule_pool.py --rules 3 12 48 --slow
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, "test"))
+
+from fcdm.fcdm_policy import DEFAULT_POLICY_PATH, CompiledPolicy
+from fcdm.fcdm_policy_verifier import PolicyVerifier
+from test_fcdm import pigeonhole
+
+
+def make_policy(rule_count):
+    with open(DEFAULT_POLICY_PATH) as f:
+        document = json.load(f)
+    document['rules'] = document['rules'][:1] + [
+        {'id': f"ports_{index}", 'kind': 'ports', 'ports': [str(2000 + index)], 'message': f"Port {2000 + index} opened."}
+        for index in range(rule_count)]
+    return CompiledPolicy(document)
+
+
+def time_checks(rule_count, repeat, timeout_ms, slow):
+    secure = {"root_login_allowed": False, "password_auth_enabled": False}
+    unknown = {"root_login_allowed": None, "password_auth_enabled": False}
+    verifier = PolicyVerifier(fast_path=False, policy=make_policy(rule_count), rule_timeout_ms=timeout_ms)
+    verifier.load_baseline(secure, set())
+    if slow:
+        verifier.rule_solvers[0].add(pigeonhole(verifier.rule_solvers[0].ctx, 12))
+
+    timings = []
+    for index in range(repeat):
+        start = time.perf_counter()
+        verifier.check_candidate(unknown, {str(2000 + index % rule_count)})
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, verifier.last_explanation['verdict'], len(verifier.last_unknown)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rules', type=int, nargs='+', default=[3, 12, 48])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--timeout-ms', type=int, default=250)
+    parser.add_argument('--slow', action='store_true', help="make one rule's query time out")
+    args = parser.parse_args()
+
+    print(f"{'rules':>6} {'slow':>5} {'median ms':>10} {'verdict':>8} {'unknown':>8}")
+    for rule_count in args.rules:
+        for slow in (False, True) if args.slow else (False,):
+            median, verdict, unknown = time_checks(rule_count, args.repeat, args.timeout_ms, slow)
+            print(f"{rule_count + 1:>6} {'yes' if slow else 'no':>5} {median:>10.2f} {verdict:>8} {unknown:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
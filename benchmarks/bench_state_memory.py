@@ -0,0 +1,95 @@
+"""
+Bytes kept in memory per parsed image, before and after the compact records.
+
+Parses --images candidates of a corpus profile (see corpus.py) and measures
+with tracemalloc what holding every parsed state costs, as batch and
+timeline runs do:
+
+- state: the (DropbearSettings, PortSet) pair the parser returns, against
+  the settings dict and set of port strings it used to return;
+- sections: the firewall UCI sections (as kept by tree diffs) with interned
+  option names and values, against one private copy of each string.
+
+    python benchmarks/bench_state_memory.py --profile medium --images 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from corpus import PROFILES, generate
+from fcdm.fcdm_parser import ConfigParser
+from fcdm.fcdm_records import DropbearSettings, PortSet
+from fcdm.fcdm_uci import UCISection, iter_sections
+
+
+def fresh(text):
+    """A private copy of `text`, as the parser built them before interning."""
+    return text.encode().decode()
+
+
+def legacy_state(state):
+    config, open_ports = state
+    return dict(config), {fresh(port) for port in open_ports}
+
+
+def record_state(state):
+    config, open_ports = state
+    return DropbearSettings(*config.values()), PortSet(open_ports.mask, open_ports.universe)
+
+
+def legacy_sections(sections):
+    copies = []
+    for section in sections:
+        copy = UCISection(section.package, fresh(section.section_type), section.name, section.index)
+        copy.options = {fresh(key): fresh(value) for key, value in section.options.items()}
+        copy.lists = {fresh(key): [fresh(value) for value in values] for key, values in section.lists.items()}
+        copies.append(copy)
+    return copies
+
+
+def retained(build):
+    """Returns (bytes still allocated by the object `build()` returns, the object)."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=list(PROFILES), default='medium')
+    parser.add_argument('--images', type=int, default=200)
+    args = parser.parse_args()
+
+    config_parser = ConfigParser()
+    with tempfile.TemporaryDirectory() as work_dir:
+        _, candidate_dirs = generate(work_dir, args.profile, args.images)
+        config_dirs = [os.path.join(path, "squashfs-root", "etc", "config") for path in candidate_dirs]
+
+        # Both representations are rebuilt from the parsed states, so parser caches are not counted.
+        states = [config_parser.parse_config_dir(path) for path in config_dirs]
+        states_before, _ = retained(lambda: [legacy_state(state) for state in states])
+        states_after, _ = retained(lambda: [record_state(state) for state in states])
+        sections_after, sections = retained(
+            lambda: [list(iter_sections(os.path.join(path, "firewall"))) for path in config_dirs])
+        sections_before, _ = retained(lambda: [legacy_sections(image) for image in sections])
+
+    print(f"{args.images} '{args.profile}' images, bytes per parsed image:")
+    print(f"{'':<10} {'before':>10} {'after':>10} {'saved':>8}")
+    for name, before, after in (("state", states_before, states_after),
+                                ("sections", sections_before, sections_after)):
+        before, after = before / args.images, after / args.images
+        print(f"{name:<10} {before:>10.0f} {after:>10.0f} {1 - after / before:>8.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
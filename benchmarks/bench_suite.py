@@ -0,0 +1,201 @@
+"""
+End-to-end benchmark suite on a synthetic firmware corpus (see corpus.py).
+
+For every profile the suite times, as the median of --repeat runs:
+
+  extract    - reading the configs out of a SquashFS image (squashfs backend)
+  parse      - ConfigParser.parse_config_dir on one candidate tree, uncached
+  verify     - a warm PolicyVerifier check (fast path)
+  verify_z3  - a warm PolicyVerifier check on the Z3 path
+  batch      - run_batch over --batch-images candidates, per image
+
+Results can be saved as a JSON baseline; `compare` re-runs the suite with
+the baseline's settings (or reads a second result file) and exits with
+status 1 when a stage is slower than the baseline by more than --threshold
+and by at least --min-delta-ms.
+
+    python benchmarks/bench_suite.py run --output benchmarks/baseline.json
+    python benchmarks/bench_suite.py compare benchmarks/baseline.json --threshold 0.25
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from corpus import DRIFTS, PROFILES, config_files, generate, write_image
+from fcdm import __version__
+from fcdm.fcdm_batch import run_batch
+from fcdm.fcdm_extractor import FirmwareExtractor
+from fcdm.fcdm_parser import ConfigParser
+from fcdm.fcdm_policy_verifier import PolicyVerifier
+
+
+def median_time(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def bench_profile(profile, work_dir, repeat, batch_images, workers):
+    """Returns {stage: median seconds} for one corpus profile."""
+    profile_dir = os.path.join(work_dir, profile)
+    baseline_dir, candidate_dirs = generate(profile_dir, profile, max(batch_images, 4))
+    config_dir = lambda image_dir: os.path.join(image_dir, "squashfs-root", "etc", "config")
+    quiet = lambda: contextlib.redirect_stdout(io.StringIO())
+    stages = {}
+
+    rules, instances, ports = PROFILES[profile]
+    image_path = write_image(os.path.join(profile_dir, "firmware.img"),
+                             config_files(rules, instances, ports, seed=1, drift='open_port'))
+    runs = iter(range(repeat))
+
+    def extract():
+        base_dir = os.path.join(profile_dir, f"extract-{next(runs)}")
+        os.makedirs(base_dir)
+        with quiet():
+            if FirmwareExtractor(base_dir=base_dir, backend='squashfs').extract_config(image_path) is None:
+                raise RuntimeError(f"{profile}: extraction failed")
+    stages['extract'] = median_time(extract, repeat)
+
+    parser = ConfigParser()
+    stages['parse'] = median_time(lambda: parser.parse_config_dir(config_dir(candidate_dirs[3])), repeat)
+
+    baseline = parser.parse_config_dir(config_dir(baseline_dir))
+    states = [parser.parse_config_dir(config_dir(path)) for path in candidate_dirs[:4]]
+    for stage, fast_path in (('verify', True), ('verify_z3', False)):
+        verifier = PolicyVerifier(fast_path=fast_path)
+        candidates = itertools.cycle(states)
+
+        def check():
+            config, open_ports = next(candidates)
+            verifier.check_security_drift(baseline[0], config, baseline[1], open_ports)
+        # The first check loads the baseline; the timed ones reuse it.
+        check()
+        stages[stage] = median_time(check, repeat)
+
+    with quiet():
+        start = time.perf_counter()
+        summaries = run_batch(baseline_dir, candidate_dirs[:batch_images], workers=workers,
+                              report_dir=os.path.join(profile_dir, "reports"))
+        stages['batch'] = (time.perf_counter() - start) / batch_images
+    expected = ['PASS' if DRIFTS[index % len(DRIFTS)] is None else 'DRIFT' for index in range(batch_images)]
+    if [summary['status'] for summary in summaries] != expected:
+        raise RuntimeError(f"{profile}: batch verdicts do not match the generated drifts")
+
+    return stages
+
+
+def run_suite(profiles, repeat, batch_images, workers):
+    results = {
+        'meta': {
+            'fcdm': __version__,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'profiles': profiles,
+            'repeat': repeat,
+            'batch_images': batch_images,
+            'workers': workers,
+        },
+        'stages': {},
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        for profile in profiles:
+            for stage, seconds in bench_profile(profile, work_dir, repeat, batch_images, workers).items():
+                results['stages'][f"{profile}.{stage}"] = seconds
+    return results
+
+
+def compare(baseline, current, threshold, min_delta):
+    """Returns one row per stage in both results: (stage, baseline s, current s, ratio, regressed)."""
+    rows = []
+    for stage, before in baseline['stages'].items():
+        after = current['stages'].get(stage)
+        if after is None:
+            continue
+        ratio = after / before if before else float('inf')
+        rows.append((stage, before, after, ratio, ratio > 1 + threshold and after - before >= min_delta))
+    return rows
+
+
+def print_results(results):
+    print(f"{'stage':<20} {'median ms':>12}")
+    for stage, seconds in results['stages'].items():
+        print(f"{stage:<20} {seconds * 1000:>12.3f}")
+    for profile in results['meta']['profiles']:
+        batch = results['stages'].get(f"{profile}.batch")
+        if batch:
+            print(f"{profile} batch throughput: {1 / batch:.1f} images/s "
+                  f"({results['meta']['workers']} worker(s))")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="run the suite and optionally save the results")
+    run.add_argument('--profiles', nargs='+', choices=list(PROFILES), default=list(PROFILES))
+    run.add_argument('--repeat', type=int, default=5)
+    run.add_argument('--batch-images', type=int, default=32)
+    run.add_argument('--workers', type=int, default=2)
+    run.add_argument('--output', default=None, help="write the results to this JSON file")
+
+    check = commands.add_parser('compare', help="fail when a stage regressed against a baseline")
+    check.add_argument('baseline', help="baseline results JSON")
+    check.add_argument('current', nargs='?', default=None,
+                       help="results JSON to compare (default: run the suite with the baseline's settings)")
+    check.add_argument('--threshold', type=float, default=0.25, help="allowed relative slowdown (default: 0.25)")
+    check.add_argument('--min-delta-ms', type=float, default=0.5,
+                       help="ignore slowdowns smaller than this many milliseconds (default: 0.5)")
+    check.add_argument('--output', default=None, help="write the new results to this JSON file")
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        results = run_suite(args.profiles, args.repeat, args.batch_images, args.workers)
+        print_results(results)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if args.current:
+            with open(args.current) as f:
+                results = json.load(f)
+        else:
+            meta = baseline['meta']
+            results = run_suite(meta['profiles'], meta['repeat'], meta['batch_images'], meta['workers'])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n[INFO] Results written to: {args.output}")
+
+    if args.command == 'compare':
+        rows = compare(baseline, results, args.threshold, args.min_delta_ms / 1000)
+        print(f"{'stage':<20} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+        for stage, before, after, ratio, regressed in rows:
+            print(f"{stage:<20} {before * 1000:>12.3f} {after * 1000:>12.3f} {ratio:>7.2f}"
+                  f"{'  REGRESSION' if regressed else ''}")
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            print(f"\nFAIL: {len(regressions)} stage(s) regressed by more than {args.threshold:.0%}: "
+                  f"{', '.join(regressions)}")
+            return 1
+        print(f"\nOK: no stage regressed by more than {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Synthetic OpenWrt-style firmware corpus.
+
+A profile sets how many firewall rules, dropbear instances and distinct ports
+an image carries; generated images are deterministic for a given seed. Each
+image is available as a {path: bytes} file map, as an extracted
+squashfs-root tree or as a SquashFS image built with test/squashfs_builder.py.
+"""
+import os
+import random
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.append(os.path.join(PROJECT_ROOT, "test"))
+
+from squashfs_builder import build_squashfs
+
+# name: (firewall rules, dropbear instances, ports in the pool)
+PROFILES = {
+    'small': (10, 1, 8),
+    'medium': (250, 4, 64),
+    'large': (5000, 16, 1024),
+}
+
+CRITICAL_PORTS = ('22', '23', '80')
+ZONES = ('wan', 'lan', 'guest')
+TARGETS = ('ACCEPT', 'REJECT', 'DROP')
+# Candidates cycle through these so a corpus mixes passing and drifting images.
+DRIFTS = (None, 'root_login', 'password_auth', 'open_port')
+
+
+def port_pool(size, rng):
+    """Random unprivileged ports; critical ports are only added to rules explicitly."""
+    return [str(port) for port in rng.sample(range(1024, 65535), size)]
+
+
+def config_files(rules, instances, ports, seed=0, drift=None):
+    """Returns {path inside squashfs-root: bytes} for one synthetic image."""
+    rng = random.Random(seed)
+    pool = port_pool(ports, rng)
+
+    dropbear = []
+    for index in range(instances):
+        root = 'on' if drift == 'root_login' and index == instances - 1 else 'off'
+        password = 'on' if drift == 'password_auth' and index == 0 else 'off'
+        dropbear.append(f"config dropbear\n\toption PasswordAuth '{password}'\n"
+                        f"\toption RootPasswordAuth '{root}'\n\toption Port '{22 + index}'\n"
+                        f"\toption Interface 'lan{index}'\n")
+
+    firewall = ["config defaults\n\toption input 'REJECT'\n\toption output 'ACCEPT'\n\toption forward 'REJECT'\n"]
+    for zone in ZONES:
+        firewall.append(f"config zone\n\toption name '{zone}'\n\tlist network '{zone}'\n"
+                        f"\toption input '{'REJECT' if zone == 'wan' else 'ACCEPT'}'\n")
+    for index in range(rules):
+        src = rng.choice(ZONES)
+        target = rng.choice(TARGETS)
+        dest_ports = rng.sample(pool, min(len(pool), rng.randint(1, 3)))
+        if src != 'wan' and rng.random() < 0.2:
+            # Critical ports opened towards the LAN are allowed by the policy.
+            dest_ports.append(rng.choice(CRITICAL_PORTS))
+        firewall.append(f"config rule\n\toption name 'Rule-{index}'\n\toption src '{src}'\n"
+                        f"\toption proto 'tcp'\n\toption dest_port '{' '.join(dest_ports)}'\n"
+                        f"\toption target '{target}'\n")
+    if drift == 'open_port':
+        firewall.insert(rng.randint(1, len(firewall)),
+                        "config rule\n\toption name 'Allow-Telnet'\n\toption src 'wan'\n"
+                        "\toption dest_port '23'\n\toption target 'ACCEPT'\n")
+
+    return {
+        "etc/config/dropbear": "\n".join(dropbear).encode(),
+        "etc/config/firewall": "\n".join(firewall).encode(),
+        "etc/config/system": b"config system\n\toption hostname 'OpenWrt'\n\toption timezone 'UTC'\n",
+        "etc/openwrt_release": b"DISTRIB_ID='OpenWrt'\nDISTRIB_RELEASE='synthetic'\n",
+    }
+
+
+def write_tree(image_dir, files):
+    """Writes a file map as image_dir/squashfs-root and returns image_dir."""
+    for path, content in files.items():
+        full_path = os.path.join(image_dir, "squashfs-root", *path.split('/'))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as f:
+            f.write(content)
+    return image_dir
+
+
+def write_image(image_path, files):
+    """Writes a file map as a SquashFS image and returns its path."""
+    with open(image_path, 'wb') as f:
+        f.write(build_squashfs(files))
+    return image_path
+
+
+def generate(base_dir, profile, count, seed=0):
+    """
+    Writes a baseline and `count` candidate trees for a profile.
+
+    Returns:
+    tuple: (baseline directory, list of candidate directories)
+    """
+    rules, instances, ports = PROFILES[profile]
+    baseline = write_tree(os.path.join(base_dir, f"{profile}-base"), config_files(rules, instances, ports, seed))
+    candidates = [
+        write_tree(os.path.join(base_dir, f"{profile}-{index:05d}"),
+                   config_files(rules, instances, ports, seed + index + 1, DRIFTS[index % len(DRIFTS)]))
+        for index in range(count)
+    ]
+    return baseline, candidates
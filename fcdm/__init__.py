@@ -1,11 +1,17 @@
 from .__version__ import __version__
-import pyfiglet
-
-
-LOGO = pyfiglet.figlet_format("FCDM", font="doom")
 
 
 __title__ = 'FCDM'
 __author__ = 'Daniel Tsang'
 __license__ = 'The MIT License (MIT)'
-__copyright__ = '(c) 2025 Daniel Tsang'
\ No newline at end of file
+__copyright__ = '(c) 2025 Daniel Tsang'
+
+
+def __getattr__(name):
+    # The figlet logo is only rendered for --help, so pyfiglet is imported on first access.
+    if name == 'LOGO':
+        import pyfiglet
+        global LOGO
+        LOGO = pyfiglet.figlet_format("FCDM", font="doom")
+        return LOGO
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,124 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from .fcdm_cache import ParseCache
+from .fcdm_extraction_store import ExtractionStore
+from .fcdm_extractor import FirmwareExtractor
+from .fcdm_parser import ConfigParser
+from .fcdm_policy_verifier import PolicyVerifier
+
+
+# Per-process state, populated once by the pool initializer so every worker
+# reuses the same parser, verifier and parsed baseline across its candidates.
+_worker_state = {}
+
+
+def parse_image(parser, extractor, image_dir):
+    """Extracts or locates the config tree of an image and returns (dropbear, firewall) state."""
+    root = extractor.prepare_root(image_dir)
+    if root is None:
+        return None
+
+    diagnostics = []
+    config, open_ports = parser.parse_config_dir(os.path.join(root, "etc", "config"), diagnostics=diagnostics)
+    for diagnostic in diagnostics:
+        print(f"WARNING: Read limit hit in {diagnostic['source']}: {diagnostic['detail']}.")
+    if config is None or open_ports is None:
+        print(f"ERROR: dropbear or firewall config missing under {root}.")
+        return None
+
+    return config, open_ports
+
+
+def make_extractor(store_dir=None, backend='auto'):
+    return FirmwareExtractor(base_dir=os.path.expanduser('~'), backend=backend,
+                             store=ExtractionStore(store_dir) if store_dir else None)
+
+
+def _init_worker(baseline, cache_dir=None, store_dir=None, backend='auto'):
+    _worker_state['parser'] = ConfigParser(cache=ParseCache(cache_dir) if cache_dir else None)
+    _worker_state['verifier'] = PolicyVerifier()
+    _worker_state['extractor'] = make_extractor(store_dir, backend)
+    _worker_state['baseline'] = baseline
+
+
+def _audit_candidate(candidate_dir):
+    """Audits a single candidate directory against the worker's baseline."""
+    start = time.perf_counter()
+    summary = {'candidate': candidate_dir}
+
+    candidate = parse_image(_worker_state['parser'], _worker_state['extractor'], candidate_dir)
+    if candidate is None:
+        summary['status'] = 'ERROR'
+        summary['result'] = "Analysis Aborted: Could not normalize all configuration data."
+    else:
+        config_v1, net_v1 = _worker_state['baseline']
+        config_v2, net_v2 = candidate
+        result = _worker_state['verifier'].check_security_drift(config_v1, config_v2, net_v1, net_v2)
+        summary['status'] = _worker_state['verifier'].last_explanation['verdict']
+        summary['result'] = result
+        summary['explanation'] = _worker_state['verifier'].last_explanation
+
+    summary['elapsed'] = time.perf_counter() - start
+    return summary
+
+
+def write_report(summary, report_dir, index, baseline_dir):
+    """Writes the summary report of one candidate and returns its path."""
+    name = os.path.basename(os.path.normpath(summary['candidate']))
+    report_path = os.path.join(report_dir, f"{index:04d}-{name}.fcdm.txt")
+
+    with open(report_path, 'w') as f:
+        f.write(f"V1 Baseline: {baseline_dir}\n")
+        f.write(f"V2 Candidate: {summary['candidate']}\n")
+        f.write(f"Status: {summary['status']}\n")
+        f.write(f"Elapsed: {summary['elapsed']:.3f}s\n\n")
+        f.write(summary['result'] + "\n")
+
+    return report_path
+
+
+def run_batch(v1_path, candidate_paths, workers=None, report_dir=None, cache_dir=None,
+              store_dir=None, backend='auto'):
+    """
+    Verifies one baseline image against many candidate images or extracted directories.
+
+    The baseline is parsed once in the parent process and handed to every
+    worker; candidates are spread over a process pool of `workers` processes
+    (defaults to the CPU count). One summary report is written per candidate.
+    When `cache_dir`/`store_dir` are given, every worker shares the on-disk
+    parse cache and extraction store.
+
+    Returns:
+    list: One summary dict per candidate, in the order of `candidate_paths`.
+    """
+    HOME_DIR = os.path.expanduser('~')
+    report_dir = report_dir or os.path.join(HOME_DIR, 'fcdm_reports')
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(report_dir, exist_ok=True)
+
+    baseline = parse_image(ConfigParser(), make_extractor(store_dir, backend), v1_path)
+    if baseline is None:
+        print("Batch Aborted: Could not normalize the baseline configuration data.")
+        return []
+
+    print(f"\n-> Auditing {len(candidate_paths)} candidates with {workers} worker(s).")
+    start = time.perf_counter()
+
+    if workers == 1:
+        _init_worker(baseline, cache_dir, store_dir, backend)
+        summaries = [_audit_candidate(path) for path in candidate_paths]
+        _worker_state['verifier'].close()
+    else:
+        chunksize = max(1, len(candidate_paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(baseline, cache_dir, store_dir, backend)) as executor:
+            summaries = list(executor.map(_audit_candidate, candidate_paths, chunksize=chunksize))
+
+    for index, summary in enumerate(summaries):
+        summary['report'] = write_report(summary, report_dir, index, v1_path)
+        print(f"[{summary['status']:>5}] {summary['candidate']}")
+
+    elapsed = time.perf_counter() - start
+    print(f"\n[INFO] {len(summaries)} candidates audited in {elapsed:.2f}s. Reports written to: {report_dir}")
+    return summaries
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import tempfile
+
+
+class ParseCache:
+    """Persistent, content-addressed cache of normalized parser output with LRU eviction."""
+
+    def __init__(self, cache_dir, max_entries=1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(kind, content, policy_version):
+        """Builds the cache key from the parser kind, raw file bytes and policy version."""
+        digest = hashlib.sha256()
+        digest.update(kind.encode())
+        digest.update(b'\0')
+        digest.update(policy_version.encode())
+        digest.update(b'\0')
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None on a miss."""
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r') as f:
+                value = json.load(f)
+            # Touching the entry keeps the mtime ordering usable as LRU order.
+            os.utime(entry_path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Stores `value` atomically, then evicts the least recently used entries."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, self._entry_path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.json'):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    continue
+
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return
+
+        for _, path in sorted(entries)[:excess]:
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                continue
+
+    def stats(self):
+        """Returns the hit/miss/eviction counters of this cache instance."""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
@@ -1,31 +1,36 @@
-import time
+import json
 import os
 import sys
 import argparse
-from colorama import Fore, Style
-from .fcdm_extractor import FirmwareExtractor 
-from .fcdm_parser import ConfigParser 
-from .fcdm_policy_verifier import PolicyVerifier
 from .utils import colorize
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from fcdm import LOGO, __version__
+from fcdm import __version__
+
+# Heavy dependencies (z3 through the verifier, pyfiglet, colorama, asyncio and the
+# extractor) are imported on the code paths that use them, so that --log and
+# --version start fast.
+
+def view_log(run_id=None):
+    """Streams the records of one run (default: the last one) or of every run with run_id='all'."""
+    from .fcdm_log import iter_records, last_run_id, format_record
 
-def view_log():
     HOME_DIR = os.path.expanduser('~')
     log_file_path = os.path.join(HOME_DIR, 'fcdm_analysis.log')
 
     if os.path.exists(log_file_path):
         try:
-           with open(log_file_path,'r') as f:
-                content = f.read()
-                if content:
-                    print(content)
-                else:
-                    print("[INFO]:Log file is empty.")
+            if run_id is None:
+                run_id = last_run_id(log_file_path)
+            shown = 0
+            for record in iter_records(log_file_path, run_id=None if run_id == 'all' else run_id):
+                print(format_record(record))
+                shown += 1
+            if not shown:
+                print("[INFO]:Log file is empty." if run_id in (None, 'all') else f"[INFO] No log records for run {run_id}.")
         except Exception as e:
-                  print(f"[ERROR] Could not find log file: {e}")
+                  print(f"[ERROR] Could not read log file: {e}")
     else:
         print("[INFO] No log file was found during analysis.")
 
@@ -33,11 +38,14 @@ class ColoredTextFormatter(argparse.RawTextHelpFormatter):
     """Custom wrapper that adds color to argparse help output."""
 
     def _format_usage(self, usage, actions, groups, prefix):
+        from colorama import Fore
+
         if prefix:
             prefix = colorize(prefix, Fore.BLUE)
         return super()._format_usage(usage,actions, groups, prefix)
     
     def _format_action(self, action):
+        from colorama import Fore
 
         formatted_action = super()._format_action(action) 
         
@@ -60,113 +68,387 @@ class ColoredTextFormatter(argparse.RawTextHelpFormatter):
         return colorize(formatted_action.strip(), Fore.GREEN)
     
 
+class FCDMArgumentParser(argparse.ArgumentParser):
+    """Builds the logo and colored description only when help is actually rendered."""
+
+    def format_help(self):
+        if self.description is None:
+            from colorama import Fore, Style
+            from fcdm import LOGO
+
+            core_description = (f"{Fore.GREEN}Version: {__version__}{Style.RESET_ALL}\n"
+                                f"{Fore.GREEN}Firmware Configuration Drift Monitor (FCDM) is a tool for Formal Verification of Firmware Configuration Drift. "
+                                f"{Style.RESET_ALL}\n"
+                                )
+            self.description = f"{Fore.GREEN}{LOGO.strip()}\n\n{core_description}"
+
+            # iterate through the sections ( options and positional arguments) and color them.
+            for group in self._action_groups:
+                if group.title == 'positional arguments':
+                    group.title = colorize('positional arguments', Fore.GREEN)
+                elif group.title == 'options':
+                    group.title = colorize('options', Fore.GREEN)
+
+        return super().format_help()
+
+
 class FCDMController:
+
+    # How PolicyVerifier.last_engine decided a check, as logged.
+    ENGINES = {'z3': 'formal verification (Z3)', 'fast_path': 'ground evaluation (no Z3)',
+               'tree_diff': 'tree diff (no policy input changed)'}
     
-    def __init__(self,parser , verifier, extractor, log_file_path = 'fcdm_analysis.log'):
+    def __init__(self,parser , verifier, extractor, log_file_path = 'fcdm_analysis.log',
+                 extract_concurrency = 2, parse_concurrency = 2, profile = False,
+                 fingerprints = None, report_path = None, tree_diff = False, results = None):
         self.parser = parser
         self.verifier = verifier
         self.extractor = extractor
+        # Optional FingerprintIndex: pairs of unchanged configs get their stored verdict back.
+        self.fingerprints = fingerprints
+        # Optional ResultStore every audit is recorded in (see fcdm_results).
+        self.results = results
+        # Optional path of the structured JSON drift report (see PolicyVerifier.explain()).
+        self.report_path = report_path
+        # Also diff the whole etc/config trees (see fcdm_diff) and report every changed option.
+        self.tree_diff = tree_diff
+        if tree_diff:
+            # The direct SquashFS backend must then read every etc/config file, not only the policy inputs.
+            self.extractor.config_tree = True
         self.log_file_path = log_file_path
-        self.log_messages = []
+
+        from .fcdm_log import LogSink
+
+        # Records are buffered and appended as JSON lines tagged with the run ID (see fcdm_log).
+        self.sink = LogSink(log_file_path)
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        # Stage concurrency limits of the audit pipeline.
+        self.extract_concurrency = extract_concurrency
+        self.parse_concurrency = parse_concurrency
+        # One solve thread: the verifier keeps per-check state (last_explanation, last_engine, ...) and its
+        # baseline solver lives in the main Z3 context, neither of which may be shared by concurrent checks.
+        self.solve_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fcdm-solve')
+
+        # Instrumentation of the last run (see fcdm_metrics); profile also collects cProfile data.
+        self.profile = profile
+        self.last_metrics = None
+        self.last_explanation = None
+        # Queue job the current audit runs for; its result store row is replaced when the job is retried.
+        self.job_id = None
     
+    def close(self):
+        """Flushes the log, shuts down the solve executor and the verifier's rule pool, and closes the result store."""
+        self.sink.flush()
+        self.solve_executor.shutdown(wait=True)
+        self.verifier.close()
+        if self.results is not None:
+            self.results.close()
+
     def log(self,message):
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        self.log_messages.append(f"[{timestamp}] {message}")
+        self.sink.emit(message)
         print(message)
     
     def write_log(self):
-        with open(self.log_file_path,'w') as f:
-            f.write("\n".join(self.log_messages))
-        print(f"\n[INFO] Diagnostic log written to: {self.log_file_path}")
+        self.sink.flush()
+        print(f"\n[INFO] Diagnostic log written to: {self.log_file_path} (run {self.sink.run_id})")
     
   
   
-    def run_auth_integrity_audit(self):
-        self.log("\n---Starting FCDM Drift Analysis---")
+    def write_report(self, v1_path, v2_path, explanation):
+        """Keeps the drift report of the last audit and writes it as JSON when report_path is set."""
+        self.last_explanation = explanation
+        if self.report_path is None or explanation is None:
+            return
+        with open(self.report_path, 'w') as f:
+            json.dump({'v1': v1_path, 'v2': v2_path, 'run_id': self.sink.run_id, **explanation}, f, indent=2)
+        print(f"[INFO] JSON drift report written to: {self.report_path}")
+
+    def run_auth_integrity_audit(self, v1_path, v2_path, job_id=None):
+        import asyncio
+
+        return asyncio.run(self.run_auth_integrity_audit_async(v1_path, v2_path, job_id))
+
+    async def _prepare_side(self, path, label, extract_limit, parse_limit, metrics):
+        """Extracts one image and parses it as soon as its tree is ready. Returns (root, (config, net))."""
+        import asyncio
+
+        # ---- Extraction stage ----
+        # Image files are extracted (through the extraction store when configured);
+        # directories are treated as already extracted trees.
+        loop = asyncio.get_running_loop()
+        async with extract_limit:
+            # Timed on the executor thread, so the overlapping V1 and V2 stages each count only their own CPU.
+            root_dir = await loop.run_in_executor(None, metrics.timed, f"extract_{label}",
+                                                  self.extractor.resolve_root, path)
+        if root_dir is None:
+            return None, None
+
+        #--- Parsing stage ----
+        diagnostics = []
+        async with parse_limit:
+            parsed = await loop.run_in_executor(None, metrics.timed, f"parse_{label}", self.parser.parse_config_dir,
+                                                os.path.join(root_dir, "etc", "config"), None, diagnostics)
+        for diagnostic in diagnostics:
+            self.log(f" -> Read limit hit in {diagnostic['source']}: {diagnostic['detail']}.")
+        return root_dir, parsed
+
+    async def run_auth_integrity_audit_async(self, v1_path, v2_path, job_id=None):
+        """
+        Runs the audit as a staged pipeline.
+
+        V1 and V2 are extracted concurrently, each side is parsed as soon as
+        its tree is ready, and the solver runs on the solve executor, so the
+        end-to-end latency approaches that of the slowest stage. Stage timings
+        are appended as a JSON record next to the log. `job_id` identifies the
+        queue job the audit runs for (see fcdm_queue).
+        """
+        from .fcdm_metrics import RunMetrics, metrics_path_for
+
+        metrics = RunMetrics(v1_path, v2_path, profile=self.profile)
+        metrics.run_id = self.sink.start_run()
+        self.last_metrics = metrics
+        self.last_explanation = None
+        self.job_id = job_id
+        bytes_read_start = self.parser.bytes_read
 
-        # ---- Extraction phase ----
-        v1_root_dir = os.path.join(self.extractor.base_dir,"_firmware_v1_hardened.img.extracted", "squashfs-root")
-        config_path_v1 = os.path.join(v1_root_dir, "etc","config", "dropbear")
+        try:
+            metrics.verdict = await self._audit(v1_path, v2_path, metrics)
+        finally:
+            # The records of a run that raised are kept too.
+            self.sink.flush()
 
-        self.extractor.extracted_last_root = v1_root_dir
-        fire_wall_path_v1 = self.extractor.get_firewall_path()
+        metrics.bytes_read = self.parser.bytes_read - bytes_read_start
+        metrics_path = metrics_path_for(self.log_file_path)
+        metrics.write(metrics_path)
+        print(f"[INFO] Metrics record appended to: {metrics_path}")
 
-        v2_root_dir = os.path.join(self.extractor.base_dir,"_firmware_v2_drift.img.extracted", "squashfs-root")
-        config_path_v2 = os.path.join(v2_root_dir, "etc","config", "dropbear")
+    async def _audit(self, v1_path, v2_path, metrics):
+        import asyncio
 
-        self.extractor.extracted_last_root = v2_root_dir
-        fire_wall_path_v2 = self.extractor.get_firewall_path()
+        self.log("\n---Starting FCDM Drift Analysis---")
 
-        if None in (config_path_v1, config_path_v2, fire_wall_path_v1, fire_wall_path_v2):
+        fingerprints = (None, None)
+        if self.fingerprints is not None:
+            fingerprints = await self._fingerprint_pair(v1_path, v2_path, metrics)
+            cached = self._cached_verdict(fingerprints)
+            if cached is not None:
+                metrics.cached_verdict = True
+                self.log(f" -> Cached verdict: config fingerprints {fingerprints[0][:12]}/{fingerprints[1][:12]} "
+                         f"were audited on {cached['audited']}; skipping extraction, parsing and Z3.")
+                self.log(cached['result'])
+                self.write_report(v1_path, v2_path, cached.get('explanation'))
+                self._record_result((v1_path, v2_path), (None, None), fingerprints, cached['verdict'],
+                                    cached.get('explanation'), 'cached')
+                self.log("---FCDM Analysis Complete---")
+                self.write_log()
+                return cached['verdict']
+
+        extract_limit = asyncio.Semaphore(self.extract_concurrency)
+        parse_limit = asyncio.Semaphore(self.parse_concurrency)
+        (v1_root_dir, parsed_v1), (v2_root_dir, parsed_v2) = await asyncio.gather(
+            self._prepare_side(v1_path, "v1", extract_limit, parse_limit, metrics),
+            self._prepare_side(v2_path, "v2", extract_limit, parse_limit, metrics))
+
+        if None in (v1_root_dir, v2_root_dir):
             self.log("Analysis Aborted: Could not extract all required configuration files.")
+            self._record_result((v1_path, v2_path), (v1_root_dir, v2_root_dir), fingerprints, 'ABORTED')
             self.write_log()
-            return
+            return 'ABORTED'
 
-        #--- Parsing phase ----
-        config_v1 = self.parser.parse_dropbear_config(config_path_v1)
-        config_v2 = self.parser.parse_dropbear_config(config_path_v2)
-
-        net_v1 = self.parser.parse_firewall_config(fire_wall_path_v1)
-        net_v2 = self.parser.parse_firewall_config(fire_wall_path_v2)
+        (config_v1, net_v1), (config_v2, net_v2) = parsed_v1, parsed_v2
       
         if None in (config_v1, config_v2, net_v1, net_v2):
             self.log("Analysis Aborted: Could not normalize all configuration data.")
+            self._record_result((v1_path, v2_path), (v1_root_dir, v2_root_dir), fingerprints, 'ABORTED')
             self.write_log()
-            return
-        
-        self.log("\n -> Running formal verification (Z3)")
+            return 'ABORTED'
+
+        if self.parser.cache is not None:
+            stats = self.parser.cache.stats()
+            self.log(f" -> Parse cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions.")
+
+        loop = asyncio.get_running_loop()
+        changes = None
+        if self.tree_diff:
+            changes = await loop.run_in_executor(None, metrics.timed, "diff", self._diff_trees, v1_root_dir, v2_root_dir)
+
+        self.log("\n -> Running policy verification")
         self.write_log()
         
-        # ---- Verification phase ---
-        verification_result = self.verifier.check_security_drift(config_v1, config_v2, net_v1, net_v2)
+        # ---- Verification stage ---
+        verification_result = await loop.run_in_executor(self.solve_executor, metrics.timed, "verify",
+                                                         self.verifier.check_security_drift,
+                                                         config_v1, config_v2, net_v1, net_v2, changes)
+        metrics.solver = {'engine': self.verifier.last_engine, 'statistics': self.verifier.last_statistics}
+        self.log(f" -> Decided by: {self.ENGINES.get(self.verifier.last_engine, self.verifier.last_engine)}")
         self.log(verification_result)
+        explanation = self.verifier.last_explanation
+        verdict = explanation['verdict']
+        self.write_report(v1_path, v2_path, explanation)
+
+        # A rule that timed out says nothing about the configs, so UNKNOWN is never cached.
+        if self.fingerprints is not None and verdict != 'UNKNOWN':
+            await loop.run_in_executor(None, self._record_verdict, fingerprints, (v1_path, v2_path),
+                                       (v1_root_dir, v2_root_dir), verdict, verification_result, explanation)
+        if self.results is not None:
+            await loop.run_in_executor(None, self._record_result, (v1_path, v2_path), (v1_root_dir, v2_root_dir),
+                                       fingerprints, verdict, explanation, self.verifier.last_engine)
 
         self.log("---FCDM Analysis Complete---")
         self.write_log()
+        return verdict
 
-
-def run_fcdm(v1_path,v2_path):
+    def _record_result(self, paths, roots, fingerprints, verdict, explanation=None, engine=None):
+        """Adds the audit to the result store, keyed by the config fingerprints (and image hashes) of both images."""
+        if self.results is None:
+            return
+        from .fcdm_extraction_store import ExtractionStore
+        from .fcdm_fingerprint import FingerprintIndex
+        from .fcdm_results import device_model
+
+        hashes = [fingerprint if fingerprint is not None
+                  else FingerprintIndex.tree_fingerprint(self.extractor, root) if root is not None else None
+                  for fingerprint, root in zip(fingerprints, roots)]
+        # Image files are told apart by their SHA-256 (remembered from extraction), extracted trees by fingerprint.
+        images = [ExtractionStore.image_digest(path) if os.path.isfile(path) else None for path in paths]
+        model = device_model(roots[1]) if roots[1] is not None else None
+        if model is None and hashes[1] is not None:
+            model = self.results.last_device_model(hashes[1])
+        self.results.record({
+            'run_id': self.sink.run_id,
+            'v1_path': os.path.abspath(paths[0]), 'v2_path': os.path.abspath(paths[1]),
+            'v1_hash': hashes[0], 'v2_hash': hashes[1],
+            'v1_image': images[0], 'v2_image': images[1],
+            'device_model': model,
+            'verdict': verdict,
+            'engine': engine,
+            'policy': self.verifier.policy.version,
+            'violations': explanation['violations'] if explanation else (),
+            'job_id': self.job_id,
+        })
+
+    def _diff_trees(self, v1_root_dir, v2_root_dir):
+        from .fcdm_diff import diff_trees
+
+        changes = diff_trees(os.path.join(v1_root_dir, "etc", "config"), os.path.join(v2_root_dir, "etc", "config"),
+                             self.parser.limits)
+        inputs = changes.mark_policy_inputs(self.parser.default_consumers())
+        self.log(f"\n -> Tree diff: {changes.summary()}; {len(inputs)} touch policy inputs.")
+        for change in changes:
+            self.log(f"    {'*' if change.policy_input else ' '} {change}")
+        return changes
+
+    def _verdict_policy_version(self):
+        """Verdicts depend on the compiled policy and on the parser's normalization settings."""
+        return f"{self.verifier.policy.version}:{self.parser.policy_version}"
+
+    async def _fingerprint_pair(self, v1_path, v2_path, metrics):
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        with metrics.stage("fingerprint"):
+            return tuple(await asyncio.gather(
+                *(loop.run_in_executor(None, self.fingerprints.fingerprint, path, self.extractor)
+                  for path in (v1_path, v2_path))))
+
+    def _cached_verdict(self, fingerprints):
+        if None in fingerprints:
+            return None
+        return self.fingerprints.lookup_verdict(*fingerprints, self._verdict_policy_version())
+
+    def _record_verdict(self, fingerprints, paths, roots, verdict, result, explanation=None):
+        # Images that could only be fingerprinted after a full extraction are indexed now.
+        fingerprints = [fingerprint if fingerprint is not None else self.fingerprints.record_image(path, self.extractor, root)
+                        for fingerprint, path, root in zip(fingerprints, paths, roots)]
+        self.fingerprints.record_verdict(*fingerprints, self._verdict_policy_version(), verdict, result, *paths,
+                                         explanation=explanation)
+
+
+def default_cache_dir():
+    return os.path.join(os.path.expanduser('~'), '.fcdm', 'parse_cache')
+
+def default_store_dir():
+    return os.path.join(os.path.expanduser('~'), '.fcdm', 'extractions')
+
+def default_index_dir():
+    return os.path.join(os.path.expanduser('~'), '.fcdm', 'fingerprints')
+
+def non_negative_int(text):
+    """argparse type of millisecond options: an integer >= 0."""
+    try:
+        value = int(text)
+    except ValueError:
+        value = -1
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"expected a non-negative integer, got {text!r}")
+    return value
+
+def make_controller(use_cache=True, backend='auto', profile=False, report_path=None, tree_diff=False, log_file_path=None,
+                    results_path=None, solver_timeout_ms=None):
+    """Builds a controller with the default log, caches, verdict index and result store under the home directory."""
+    from .fcdm_cache import ParseCache
+    from .fcdm_extraction_store import ExtractionStore
+    from .fcdm_extractor import FirmwareExtractor
+    from .fcdm_fingerprint import FingerprintIndex
+    from .fcdm_parser import ConfigParser
+    from .fcdm_policy_verifier import PolicyVerifier
+    from .fcdm_results import ResultStore, default_results_path
 
     HOME_DIR = os.path.expanduser('~')
     LOG_FILE = os.path.join(HOME_DIR, 'fcdm_analysis.log')
 
-    print(f"\nV1 Baseline: {v1_path}")
-    print(f"V2 Candidate:{v2_path}")
- 
-
-    extractor_instance =  FirmwareExtractor(base_dir = HOME_DIR) 
-    parser_instance = ConfigParser()
-    verifier_instance = PolicyVerifier()
+    extractor_instance =  FirmwareExtractor(base_dir = HOME_DIR, backend = backend,
+                                            store = ExtractionStore(default_store_dir()) if use_cache else None)
+    parser_instance = ConfigParser(cache = ParseCache(default_cache_dir()) if use_cache else None)
+    # 0 disables the per-rule timeout; None keeps the default.
+    verifier_instance = PolicyVerifier(rule_timeout_ms=PolicyVerifier.DEFAULT_RULE_TIMEOUT_MS
+                                       if solver_timeout_ms is None else solver_timeout_ms or None)
 
     controller = FCDMController(parser = parser_instance,
                                  verifier=verifier_instance, 
                                  extractor = extractor_instance,
-                                 log_file_path= LOG_FILE
+                                 log_file_path= log_file_path or LOG_FILE,
+                                 profile = profile,
+                                 report_path = report_path,
+                                 tree_diff = tree_diff,
+                                 # Fingerprints only cover the files the policy reads, not the whole tree.
+                                 fingerprints = FingerprintIndex(default_index_dir()) if use_cache and not tree_diff else None,
+                                 results = ResultStore(results_path or default_results_path())
                                  )
-    
-    controller.run_auth_integrity_audit()
+    return controller
+
+def run_fcdm(v1_path,v2_path, use_cache=True, backend='auto', profile=False, report_path=None, tree_diff=False,
+             solver_timeout_ms=None):
+    print(f"\nV1 Baseline: {v1_path}")
+    print(f"V2 Candidate:{v2_path}")
+
+    controller = make_controller(use_cache, backend, profile, report_path, tree_diff,
+                                 solver_timeout_ms=solver_timeout_ms)
+
+    try:
+        if not profile:
+            controller.run_auth_integrity_audit(v1_path, v2_path)
+            return
+
+        import cProfile
+        from .fcdm_metrics import dump_profile
+
+        profiler = cProfile.Profile()
+        profiler.runcall(controller.run_auth_integrity_audit, v1_path, v2_path)
+        profile_path = os.path.join(os.path.expanduser('~'), 'fcdm_analysis.prof')
+        dump_profile(profiler, controller.last_metrics, profile_path)
+    finally:
+        controller.close()
+    print(f"[INFO] cProfile statistics written to: {profile_path}")
 
 def cli_cmd():
-    
-    core_description = (f"{Fore.GREEN}Version: {__version__}{Style.RESET_ALL}\n"
-                        f"{Fore.GREEN}Firmware Configuration Drift Monitor (FCDM) is a tool for Formal Verification of Firmware Configuration Drift. "
-                        f"{Style.RESET_ALL}\n"
-                        )
-    
-    full_description = f"{Fore.GREEN}{LOGO.strip()}\n\n{core_description}"
-    
 
-    parser = argparse.ArgumentParser(prog = "Firmware Configuration Drift Monitor",
-                                     formatter_class=ColoredTextFormatter,
-                                    description=full_description,
-                                    usage =argparse.SUPPRESS
-                                    )
-    # iterate through the sections ( options and positional arguments) and color them.
-    for group in parser._action_groups:
-        if group.title == 'positional arguments':
-            group.title = colorize('positional arguments', Fore.GREEN)
-        elif group.title == 'options':
-            group.title = colorize('options', Fore.GREEN)
+    parser = FCDMArgumentParser(prog = "Firmware Configuration Drift Monitor",
+                                formatter_class=ColoredTextFormatter,
+                                usage =argparse.SUPPRESS
+                                )
 
     parser.add_argument(
         '-l','--log',
@@ -174,10 +456,87 @@ def cli_cmd():
         help=' view the contents of the last analysis log.'
     )
 
+    parser.add_argument(
+        '--run-id',
+        default=None,
+        help=' with --log, show the records of this run ID instead of the last run ("all" shows every run).'
+    )
+
     parser.add_argument(
         'paths',
         nargs='*',
-        help=' [V1_Path],[V2_Path] -Path of v1 (baseline, secure) and V2 (candidate) firmware image directories.'
+        help=' [V1_Path],[V2_Path] -Path of v1 (baseline, secure) and V2 (candidate) firmware images or extracted image directories.'
+    )
+
+    parser.add_argument(
+        '-b', '--batch',
+        action='store_true',
+        help=' audit every candidate directory after the first path against that baseline.'
+    )
+
+    parser.add_argument(
+        '-t', '--timeline',
+        action='store_true',
+        help=' audit an ordered release series (oldest first) against its first release and find the first regression.'
+    )
+
+    parser.add_argument(
+        '--bisect',
+        action='store_true',
+        help=' with --timeline, only parse the releases needed to bisect to the first regression.'
+    )
+
+    parser.add_argument(
+        '-j', '--workers',
+        type=int,
+        default=None,
+        help=' number of worker processes used in batch mode (default: CPU count).'
+    )
+
+    parser.add_argument(
+        '--report-dir',
+        default=None,
+        help=' directory for the per-candidate batch reports (default: ~/fcdm_reports).'
+    )
+
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help=' re-extract, re-parse and re-verify every image instead of using the extraction store, parse cache and verdict index.'
+    )
+
+    parser.add_argument(
+        '--extractor',
+        choices=('auto', 'squashfs', 'binwalk'),
+        default='auto',
+        help=' extraction backend: direct SquashFS read, binwalk, or SquashFS with binwalk fallback (default: auto).'
+    )
+
+    parser.add_argument(
+        '--tree-diff',
+        action='store_true',
+        help=' also diff the whole etc/config trees and report every changed section and option.'
+    )
+
+    parser.add_argument(
+        '--solver-timeout',
+        type=non_negative_int,
+        default=None,
+        metavar='MS',
+        help=' timeout in milliseconds of the Z3 query of each policy rule; a rule that exceeds it is reported as UNKNOWN (default: 10000, 0 disables it).'
+    )
+
+    parser.add_argument(
+        '--json-report',
+        default=None,
+        metavar='PATH',
+        help=' write a JSON drift report naming only the changed settings and ports to PATH.'
+    )
+
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help=' run the analysis under cProfile and write the statistics to ~/fcdm_analysis.prof.'
     )
 
     parser.add_argument(
@@ -192,14 +551,62 @@ def cli_cmd():
 
 def main():
     try:
+        if sys.argv[1:2] == ['serve']:
+            from .fcdm_daemon import serve_main
+
+            sys.exit(serve_main(sys.argv[2:]))
+
+        if sys.argv[1:2] == ['results']:
+            from .fcdm_results import results_main
+
+            sys.exit(results_main(sys.argv[2:]))
+
+        if sys.argv[1:2] == ['queue']:
+            from .fcdm_queue import queue_main
+
+            sys.exit(queue_main(sys.argv[2:]))
+
         args = cli_cmd()
 
-        
+
         if args.log:
-            view_log()
+            view_log(args.run_id)
+            sys.exit(0)
+
+        if args.batch:
+            if len(args.paths) < 2:
+                print("\nERROR: Batch mode needs a baseline path and at least one candidate path.", file=sys.stderr)
+                print("Usage: python -m fcdm --batch <V1_PATH> <CANDIDATE_PATH>...", file=sys.stderr)
+                sys.exit(1)
+
+            if not all(os.path.exists(path) for path in args.paths):
+                print(f"\nERROR: All batch paths must be existing firmware images or directories.", file=sys.stderr)
+                sys.exit(1)
+
+            from .fcdm_batch import run_batch
+
+            run_batch(args.paths[0], args.paths[1:], workers=args.workers, report_dir=args.report_dir,
+                      cache_dir=None if args.no_cache else default_cache_dir(),
+                      store_dir=None if args.no_cache else default_store_dir(), backend=args.extractor)
+            sys.exit(0)
+
+        if args.timeline:
+            if len(args.paths) < 2:
+                print("\nERROR: Timeline mode needs at least two release paths, oldest first.", file=sys.stderr)
+                print("Usage: python -m fcdm --timeline <V1_PATH> <V2_PATH> <V3_PATH>...", file=sys.stderr)
+                sys.exit(1)
+
+            if not all(os.path.exists(path) for path in args.paths):
+                print(f"\nERROR: All timeline paths must be existing firmware images or directories.", file=sys.stderr)
+                sys.exit(1)
+
+            from .fcdm_timeline import run_timeline
+
+            run_timeline(args.paths, bisect=args.bisect,
+                         cache_dir=None if args.no_cache else default_cache_dir(),
+                         store_dir=None if args.no_cache else default_store_dir(), backend=args.extractor)
             sys.exit(0)
 
-        
         if len(args.paths) != 2:
             print("\nERROR: You must provide exactly two firmware paths for analysis.", file=sys.stderr)
             print("Usage: python fcdm_controller.py <V1_PATH> <V2_PATH>", file=sys.stderr)
@@ -211,12 +618,13 @@ def main():
         v2_path = args.paths[1]
 
         
-        if not os.path.isdir(v1_path) or not os.path.isdir(v2_path):
-            print(f"\nERROR: Both V1 and V2 paths must be existing directories.", file=sys.stderr)
+        if not os.path.exists(v1_path) or not os.path.exists(v2_path):
+            print(f"\nERROR: Both V1 and V2 paths must be existing firmware images or directories.", file=sys.stderr)
             sys.exit(1)
         
         
-        run_fcdm(v1_path, v2_path)
+        run_fcdm(v1_path, v2_path, use_cache=not args.no_cache, backend=args.extractor, profile=args.profile,
+                 report_path=args.json_report, tree_diff=args.tree_diff, solver_timeout_ms=args.solver_timeout)
 
     except KeyboardInterrupt:
         print("\n\n Analysis ended due to user pressing CTRL+C. Exiting program...")
@@ -0,0 +1,331 @@
+import argparse
+import itertools
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .fcdm_batch import make_extractor, parse_image
+from .fcdm_cache import ParseCache
+from .fcdm_log import LogSink
+from .fcdm_parser import ConfigParser
+from .fcdm_policy_verifier import PolicyVerifier
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty sequence."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+class AuditDaemon:
+    """
+    Audits candidate images against one baseline with a warm parser and verifier.
+
+    Candidates arrive through submit() (HTTP) or the inbox watcher and wait in
+    a bounded queue; when it is full, HTTP submissions are refused and the
+    watcher stops scanning until there is room again. A single worker thread
+    owns the parser and verifier, since the Z3 context is not thread-safe.
+    """
+
+    def __init__(self, baseline_path, queue_size=64, history=10000, cache_dir=None, store_dir=None,
+                 backend='auto', log_file_path=None):
+        self.baseline_path = baseline_path
+        self.parser = ConfigParser(cache=ParseCache(cache_dir) if cache_dir else None)
+        self.verifier = PolicyVerifier()
+        self.extractor = make_extractor(store_dir, backend)
+        self.sink = LogSink(log_file_path) if log_file_path else None
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.jobs = OrderedDict()
+        self.history = history
+        self.latencies = deque(maxlen=history)
+        self.completed = 0
+        self.rejected = 0
+        self.errors = 0
+        self.started = None
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self._ids = itertools.count(1)
+        self._worker = threading.Thread(target=self._work, name='fcdm-audit', daemon=True)
+
+    def start(self):
+        """Parses the baseline, loads it into the verifier and starts the worker."""
+        self.baseline = parse_image(self.parser, self.extractor, self.baseline_path)
+        if self.baseline is None:
+            raise ValueError(f"Could not normalize the baseline configuration data of {self.baseline_path}.")
+        self.started = time.time()
+        self._worker.start()
+
+    def stop(self, timeout=None):
+        self.stopping.set()
+        self._worker.join(timeout)
+        if not self._worker.is_alive():
+            self.verifier.close()
+        if self.sink is not None:
+            self.sink.flush()
+
+    def submit(self, path, block=False, timeout=None):
+        """Queues a candidate and returns its job ID, or None when the queue is full."""
+        job = {'id': next(self._ids), 'candidate': path, 'status': 'QUEUED', 'queued_at': time.time()}
+        try:
+            self.queue.put(job, block=block, timeout=timeout)
+        except queue.Full:
+            with self.lock:
+                self.rejected += 1
+            return None
+
+        with self.lock:
+            self.jobs[job['id']] = job
+            while len(self.jobs) > self.history:
+                self.jobs.popitem(last=False)
+        return job['id']
+
+    def result(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def results(self, since=0, limit=100):
+        """Returns up to `limit` finished jobs with an ID greater than `since`."""
+        with self.lock:
+            finished = [dict(job) for job_id, job in self.jobs.items()
+                        if job_id > since and job['status'] not in ('QUEUED', 'RUNNING')]
+        return finished[:limit]
+
+    def stats(self):
+        with self.lock:
+            latencies = list(self.latencies)
+            completed, rejected, errors = self.completed, self.rejected, self.errors
+        uptime = time.time() - self.started if self.started else 0.0
+        stats = {
+            'baseline': self.baseline_path,
+            'queued': self.queue.qsize(),
+            'queue_size': self.queue.maxsize,
+            'completed': completed,
+            'rejected': rejected,
+            'errors': errors,
+            'uptime_s': round(uptime, 3),
+            'throughput_per_s': round(completed / uptime, 3) if uptime else 0.0,
+        }
+        if latencies:
+            stats.update({'latency_p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+                          'latency_p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+                          'latency_max_ms': round(max(latencies) * 1000, 3)})
+        return stats
+
+    def _work(self):
+        while not self.stopping.is_set():
+            try:
+                job = self.queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            try:
+                self._audit(job)
+            except Exception as e:
+                # One bad image must not take the worker, and every job queued behind it, down.
+                self._fail(job, e)
+
+    def _fail(self, job, error):
+        finished = time.time()
+        result = f"Analysis Aborted: {type(error).__name__}: {error}"
+        with self.lock:
+            job.update(status='ERROR', result=result, explanation=None, finished_at=finished,
+                       latency_s=round(finished - job['queued_at'], 6))
+            self.errors += 1
+
+        if self.sink is not None:
+            job['run_id'] = self.sink.start_run()
+            self.sink.emit(f"[serve] job {job['id']} ERROR: {job['candidate']}")
+            self.sink.emit(result)
+            self.sink.flush()
+
+    def _audit(self, job):
+        with self.lock:
+            job['status'] = 'RUNNING'
+        started = time.time()
+
+        candidate = parse_image(self.parser, self.extractor, job['candidate'])
+        explanation = None
+        if candidate is None:
+            status, result = 'ERROR', "Analysis Aborted: Could not normalize all configuration data."
+        else:
+            (config_v1, net_v1), (config_v2, net_v2) = self.baseline, candidate
+            result = self.verifier.check_security_drift(config_v1, config_v2, net_v1, net_v2)
+            status = self.verifier.last_explanation['verdict']
+            explanation = self.verifier.last_explanation
+
+        finished = time.time()
+        with self.lock:
+            job.update(status=status, result=result, explanation=explanation, engine=self.verifier.last_engine,
+                       started_at=started, finished_at=finished,
+                       latency_s=round(finished - job['queued_at'], 6))
+            self.latencies.append(finished - job['queued_at'])
+            self.completed += 1
+
+        if self.sink is not None:
+            job['run_id'] = self.sink.start_run()
+            self.sink.emit(f"[serve] job {job['id']} {status}: {job['candidate']}")
+            self.sink.emit(result)
+            self.sink.flush()
+
+
+class InboxWatcher(threading.Thread):
+    """
+    Polls an inbox directory and submits every new image once it has stopped changing.
+
+    An entry is ready when its size and mtime are the same on two consecutive
+    polls, so images still being copied in are not picked up. Hidden entries
+    and *.part / *.tmp files are ignored; extracted directories should be
+    written under such a name and renamed into place, since a directory's
+    mtime does not follow its nested files. When the queue is full the
+    watcher blocks, leaving further images in the inbox.
+    """
+
+    IGNORED_SUFFIXES = ('.part', '.tmp')
+
+    def __init__(self, daemon, inbox, poll_interval=0.5):
+        super().__init__(name='fcdm-inbox', daemon=True)
+        self.audit_daemon = daemon
+        self.inbox = inbox
+        self.poll_interval = poll_interval
+        self.pending = {}
+        self.seen = {}
+
+    def scan(self):
+        """Returns the inbox entries that are ready and not submitted yet."""
+        current = {}
+        for entry in os.scandir(self.inbox):
+            if entry.name.startswith('.') or entry.name.endswith(self.IGNORED_SUFFIXES):
+                continue
+            try:
+                info = entry.stat()
+            except FileNotFoundError:
+                continue
+            current[entry.path] = (info.st_size, info.st_mtime_ns)
+
+        ready = [path for path, key in sorted(current.items())
+                 if self.pending.get(path) == key and self.seen.get(path) != key]
+        self.pending = current
+        # Entries removed from the inbox are forgotten, which keeps `seen` bounded.
+        self.seen = {path: key for path, key in self.seen.items() if path in current}
+        return ready
+
+    def run(self):
+        stopping = self.audit_daemon.stopping
+        while not stopping.is_set():
+            for path in self.scan():
+                while not stopping.is_set():
+                    if self.audit_daemon.submit(path, block=True, timeout=0.5) is not None:
+                        self.seen[path] = self.pending[path]
+                        break
+            stopping.wait(self.poll_interval)
+
+
+def make_handler(daemon):
+    class AuditRequestHandler(BaseHTTPRequestHandler):
+        """JSON API: POST /audit, GET /results[?since=ID], GET /results/<id>, GET /stats."""
+
+        def _send(self, code, body, headers=()):
+            payload = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            if self.path != '/audit':
+                return self._send(404, {'error': 'not found'})
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                path = json.loads(self.rfile.read(length))['path']
+            except (ValueError, KeyError, TypeError):
+                return self._send(400, {'error': 'expected a JSON body {"path": ...}'})
+            if not os.path.exists(path):
+                return self._send(400, {'error': f'no such image: {path}'})
+
+            job_id = daemon.submit(path)
+            if job_id is None:
+                return self._send(503, {'error': 'queue full'}, headers=[('Retry-After', '1')])
+            self._send(202, {'id': job_id})
+
+        def do_GET(self):
+            route, _, query = self.path.partition('?')
+            if route == '/stats':
+                return self._send(200, daemon.stats())
+            if route == '/results':
+                params = dict(part.partition('=')[::2] for part in query.split('&') if part)
+                try:
+                    since, limit = int(params.get('since', 0)), int(params.get('limit', 100))
+                except ValueError:
+                    return self._send(400, {'error': 'since and limit must be integers'})
+                return self._send(200, daemon.results(since, limit))
+            if route.startswith('/results/'):
+                try:
+                    job = daemon.result(int(route.rsplit('/', 1)[1]))
+                except ValueError:
+                    job = None
+                return self._send(200, job) if job is not None else self._send(404, {'error': 'unknown job'})
+            self._send(404, {'error': 'not found'})
+
+        def log_message(self, format, *args):
+            # Request lines would drown the audit output.
+            pass
+
+    return AuditRequestHandler
+
+
+def serve_main(argv):
+    """Entry point of `python -m fcdm serve`."""
+    parser = argparse.ArgumentParser(prog='fcdm serve',
+                                     description='Audit candidate images against a baseline from a long-running process.')
+    parser.add_argument('baseline', help='baseline (V1) firmware image or extracted image directory')
+    parser.add_argument('--inbox', default=None, help='directory to watch for candidate images')
+    parser.add_argument('--host', default='127.0.0.1', help='HTTP bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='HTTP port (default: 8765, 0 picks a free port)')
+    parser.add_argument('--queue-size', type=int, default=64, help='maximum number of queued candidates')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='inbox polling interval in seconds')
+    parser.add_argument('--no-cache', action='store_true', help='do not use the extraction store and parse cache')
+    parser.add_argument('--extractor', choices=('auto', 'squashfs', 'binwalk'), default='auto')
+    args = parser.parse_args(argv)
+
+    from .fcdm_controller import default_cache_dir, default_store_dir
+
+    HOME_DIR = os.path.expanduser('~')
+    daemon = AuditDaemon(args.baseline, queue_size=args.queue_size,
+                         cache_dir=None if args.no_cache else default_cache_dir(),
+                         store_dir=None if args.no_cache else default_store_dir(), backend=args.extractor,
+                         log_file_path=os.path.join(HOME_DIR, 'fcdm_analysis.log'))
+    try:
+        daemon.start()
+    except ValueError as e:
+        print(f"\nERROR: {e}", file=sys.stderr)
+        return 1
+
+    if args.inbox:
+        os.makedirs(args.inbox, exist_ok=True)
+        InboxWatcher(daemon, args.inbox, args.poll_interval).start()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(daemon))
+    # Stop on SIGTERM the same way as on CTRL+C.
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+
+    host, port = server.server_address[:2]
+    print(f"[INFO] FCDM serving on http://{host}:{port} (baseline: {args.baseline}"
+          f"{', inbox: ' + args.inbox if args.inbox else ''})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.stop(timeout=5)
+        print("\n[INFO] FCDM daemon stopped.")
+    return 0
@@ -0,0 +1,231 @@
+import hashlib
+import io
+import os
+from collections import Counter
+from .fcdm_uci import DEFAULT_LIMITS, bounded_lines, parse_sections
+
+
+class Change:
+    """
+    One typed difference between two UCI config trees.
+
+    `kind` is one of package_added, package_removed, section_added,
+    section_removed, section_type_changed, option_added, option_removed,
+    option_changed or list_changed. Sections are addressed like `uci show`
+    does: by name, or as @type[n] for anonymous ones.
+    """
+
+    def __init__(self, kind, package, section=None, section_type=None, option=None, old=None, new=None):
+        self.kind = kind
+        self.package = package
+        self.section = section
+        self.section_type = section_type
+        self.option = option
+        self.old = old
+        self.new = new
+        # Set by ChangeSet.mark_policy_inputs() when the change can alter what the policy reads.
+        self.policy_input = False
+
+    def to_dict(self):
+        return {key: value for key, value in vars(self).items() if value is not None}
+
+    def __str__(self):
+        path = ".".join(part for part in (self.package, self.section, self.option) if part)
+        if self.kind in ('option_changed', 'list_changed', 'section_type_changed'):
+            return f"{self.kind} {path}: {self.old!r} -> {self.new!r}"
+        value = self.new if self.new is not None else self.old
+        return f"{self.kind} {path}" + (f" = {value!r}" if value is not None else "")
+
+    def __repr__(self):
+        return f"Change({self})"
+
+
+class ChangeSet:
+    """The typed changes between two config trees, with how much of the trees hashing let the differ skip."""
+
+    def __init__(self):
+        self.changes = []
+        self.stats = {'packages': 0, 'packages_skipped': 0, 'sections': 0, 'sections_skipped': 0}
+
+    def __iter__(self):
+        return iter(self.changes)
+
+    def __len__(self):
+        return len(self.changes)
+
+    def packages(self):
+        return sorted({change.package for change in self.changes})
+
+    def touching(self, package, section_type=None, options=None):
+        """
+        Returns the changes that can affect the `options` (lowercase names) of
+        `section_type` sections of `package`; None matches any type or option.
+        """
+        touched = []
+        for change in self.changes:
+            if change.package != package:
+                continue
+            if change.kind not in ('package_added', 'package_removed'):
+                types = (change.old, change.new) if change.kind == 'section_type_changed' else (change.section_type,)
+                if section_type is not None and section_type not in types:
+                    continue
+                if options is not None and change.option is not None and change.option.lower() not in options:
+                    continue
+            touched.append(change)
+        return touched
+
+    def mark_policy_inputs(self, consumers):
+        """Flags the changes that touch what any of the parser `consumers` read and returns them."""
+        marked = []
+        for consumer in consumers:
+            for change in self.touching(consumer.package, consumer.section_type, consumer.options):
+                if not change.policy_input:
+                    change.policy_input = True
+                    marked.append(change)
+        return marked
+
+    def to_dicts(self):
+        return [change.to_dict() for change in self.changes]
+
+    def summary(self):
+        stats = self.stats
+        return (f"{len(self.changes)} changes in {len(self.packages())} packages "
+                f"({stats['packages_skipped']} of {stats['packages']} packages and "
+                f"{stats['sections_skipped']} of {stats['sections']} sections skipped by hash)")
+
+
+def section_digest(section):
+    """
+    Canonical hash of a section's type and contents. Option order, quoting,
+    comments and whitespace do not change it; the order of list values does.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(section.section_type.encode() + b'\0')
+    for key in sorted(section.options):
+        digest.update(b'o' + key.encode() + b'\0' + section.options[key].encode() + b'\0')
+    for key in sorted(section.lists):
+        digest.update(b'l' + key.encode() + b'\0' + b'\1'.join(v.encode() for v in section.lists[key]) + b'\0')
+    return digest.digest()
+
+
+def _read_package(file_path, limits):
+    with open(file_path, 'rb') as f:
+        return f.read(limits.max_file_size + 1)
+
+
+def _keyed_sections(content, package, limits, diagnostics):
+    """Returns ({name: section}, {type: [(key, section)]}) with anonymous sections keyed as @type[n]."""
+    text = io.StringIO(content.decode('utf-8', errors='replace'))
+    named, anonymous, ordinals = {}, {}, Counter()
+    for section in parse_sections(bounded_lines(text, limits, diagnostics, package), package, limits, diagnostics):
+        ordinal = ordinals[section.section_type]
+        ordinals[section.section_type] += 1
+        if section.name is not None:
+            named[section.name] = section
+        else:
+            anonymous.setdefault(section.section_type, []).append((f"@{section.section_type}[{ordinal}]", section))
+    return named, anonymous
+
+
+def _diff_section(change_set, package, key, old, new):
+    """Compares the options of two sections whose hashes differ."""
+    if old.section_type != new.section_type:
+        change_set.changes.append(Change('section_type_changed', package, key, new.section_type,
+                                         old=old.section_type, new=new.section_type))
+
+    for option in sorted(old.options.keys() | new.options.keys()):
+        before, after = old.options.get(option), new.options.get(option)
+        if before == after:
+            continue
+        kind = 'option_added' if before is None else 'option_removed' if after is None else 'option_changed'
+        change_set.changes.append(Change(kind, package, key, new.section_type, option, before, after))
+
+    for option in sorted(old.lists.keys() | new.lists.keys()):
+        before, after = old.lists.get(option, []), new.lists.get(option, [])
+        if before != after:
+            change_set.changes.append(Change('list_changed', package, key, new.section_type, option, before, after))
+
+
+def _diff_package(change_set, package, old_content, new_content, limits, diagnostics):
+    old_named, old_anonymous = _keyed_sections(old_content, package, limits, diagnostics)
+    new_named, new_anonymous = _keyed_sections(new_content, package, limits, diagnostics)
+    stats = change_set.stats
+
+    for name in sorted(old_named.keys() | new_named.keys()):
+        old, new = old_named.get(name), new_named.get(name)
+        stats['sections'] += 1
+        if new is None:
+            change_set.changes.append(Change('section_removed', package, name, old.section_type))
+        elif old is None:
+            change_set.changes.append(Change('section_added', package, name, new.section_type))
+        elif section_digest(old) == section_digest(new):
+            stats['sections_skipped'] += 1
+        else:
+            _diff_section(change_set, package, name, old, new)
+
+    # Anonymous sections have no identity: equal hashes are matched wherever they
+    # moved, and only the leftovers are paired in order and compared option by option.
+    for section_type in sorted(old_anonymous.keys() | new_anonymous.keys()):
+        old_sections = [(key, section, section_digest(section)) for key, section in old_anonymous.get(section_type, ())]
+        new_sections = [(key, section, section_digest(section)) for key, section in new_anonymous.get(section_type, ())]
+        stats['sections'] += max(len(old_sections), len(new_sections))
+
+        common = Counter(digest for _, _, digest in old_sections) & Counter(digest for _, _, digest in new_sections)
+        stats['sections_skipped'] += sum(common.values())
+        old_rest, new_rest = [], []
+        for sections, rest in ((old_sections, old_rest), (new_sections, new_rest)):
+            matched = Counter(common)
+            for key, section, digest in sections:
+                if matched[digest]:
+                    matched[digest] -= 1
+                else:
+                    rest.append((key, section))
+
+        for (_, old), (key, new) in zip(old_rest, new_rest):
+            _diff_section(change_set, package, key, old, new)
+        for key, old in old_rest[len(new_rest):]:
+            change_set.changes.append(Change('section_removed', package, key, section_type))
+        for key, new in new_rest[len(old_rest):]:
+            change_set.changes.append(Change('section_added', package, key, section_type))
+
+
+def config_packages(config_dir):
+    """Returns the UCI package files of a config directory."""
+    if not os.path.isdir(config_dir):
+        return set()
+    return {entry.name for entry in os.scandir(config_dir)
+            if entry.is_file() and not entry.name.startswith('.') and '-opkg' not in entry.name}
+
+
+def diff_trees(old_dir, new_dir, limits=DEFAULT_LIMITS, diagnostics=None):
+    """
+    Structurally diffs two UCI config directories (e.g. etc/config).
+
+    Packages with identical bytes are skipped without parsing. Other packages
+    are parsed within the read limits, sections are compared by canonical
+    hash, and only sections whose hashes differ are compared option by
+    option, so the cost follows the size of the drift.
+
+    Returns:
+    ChangeSet: The typed changes, in package order.
+    """
+    change_set = ChangeSet()
+    old_packages, new_packages = config_packages(old_dir), config_packages(new_dir)
+
+    for package in sorted(old_packages | new_packages):
+        change_set.stats['packages'] += 1
+        if package not in new_packages:
+            change_set.changes.append(Change('package_removed', package))
+            continue
+        if package not in old_packages:
+            change_set.changes.append(Change('package_added', package))
+            continue
+
+        old_content = _read_package(os.path.join(old_dir, package), limits)
+        new_content = _read_package(os.path.join(new_dir, package), limits)
+        if old_content == new_content:
+            change_set.stats['packages_skipped'] += 1
+            continue
+        _diff_package(change_set, package, old_content, new_content, limits, diagnostics)
+
+    return change_set
@@ -0,0 +1,209 @@
+import fcntl
+import functools
+import hashlib
+import os
+import shutil
+import tempfile
+
+
+ROOT_FILE = '.fcdm-root'
+SIZE_FILE = '.fcdm-size'
+
+
+class ExtractionStore:
+    """
+    Content-addressed store of extracted firmware trees, keyed by the SHA-256 of the image.
+
+    Entries are populated in a private staging directory and renamed into
+    place, so readers never see a partial tree. A per-digest lock makes
+    concurrent runs on the same image share one extraction instead of racing,
+    and eviction only removes entries (with their lock file) it can lock.
+    """
+
+    def __init__(self, store_dir, max_bytes=2 * 1024 ** 3):
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    @staticmethod
+    def image_digest(image_path, chunk_size=1024 * 1024):
+        """SHA-256 of an image file; remembered per path, size and mtime so later callers do not re-read it."""
+        stat = os.stat(image_path)
+        return _image_digest(os.path.abspath(image_path), stat.st_size, stat.st_mtime_ns, chunk_size)
+
+    def _entry_dir(self, digest):
+        return os.path.join(self.store_dir, digest)
+
+    def _read_root(self, digest):
+        """Returns the extracted root recorded for `digest`, or None if there is no complete entry."""
+        entry_dir = self._entry_dir(digest)
+        try:
+            with open(os.path.join(entry_dir, ROOT_FILE), 'r') as f:
+                relative_root = f.read().strip()
+            os.utime(entry_dir)
+        except OSError:
+            return None
+        return os.path.join(entry_dir, relative_root)
+
+    def fetch(self, image_path, extract, variant=None):
+        """
+        Returns the extracted root of `image_path`, extracting it only on a miss.
+
+        `extract(work_dir)` must unpack the image somewhere below `work_dir`
+        and return the extracted root directory, or None on failure. Trees
+        holding a different file set of the same image are stored under a
+        separate entry named by `variant`.
+        """
+        digest = self.image_digest(image_path)
+        if variant:
+            digest = f"{digest}-{variant}"
+        root = self._cached_root(digest, image_path)
+        if root is not None:
+            return root
+
+        lock = self._acquire(digest)
+        try:
+            # Another process may have populated the entry while we waited for the lock.
+            root = self._read_root(digest)
+            if root is not None:
+                return root
+
+            staging = self._staging_dir(digest)
+            try:
+                self._commit(digest, staging, extract(staging))
+            finally:
+                if os.path.exists(staging):
+                    shutil.rmtree(staging, ignore_errors=True)
+        finally:
+            self._release(lock, digest)
+
+        self.evict(keep=digest)
+        return self._read_root(digest)
+
+    def _cached_root(self, digest, image_path):
+        # The shared lock keeps eviction out while the entry is read and its mtime refreshed.
+        lock = self._acquire(digest, fcntl.LOCK_SH)
+        try:
+            root = self._read_root(digest)
+        finally:
+            self._release(lock, digest)
+        if root is not None:
+            print(f"-> Reusing stored extraction {digest[:12]} for: {image_path}")
+        return root
+
+    def _lock_path(self, digest):
+        return os.path.join(self.store_dir, f".{digest}.lock")
+
+    def _acquire(self, digest, mode=fcntl.LOCK_EX):
+        """
+        Opens and locks the lock file of `digest`, returning it.
+
+        If the file was removed (by eviction or a failed extraction) while we
+        waited, the lock is taken again on the current file, so two holders
+        can never lock different files of the same digest.
+        """
+        path = self._lock_path(digest)
+        while True:
+            lock = open(path, 'a')
+            try:
+                fcntl.flock(lock, mode)
+                if os.fstat(lock.fileno()).st_ino == os.stat(path).st_ino:
+                    return lock
+            except FileNotFoundError:
+                pass
+            except BaseException:
+                lock.close()
+                raise
+            lock.close()
+
+    def _release(self, lock, digest, remove=None):
+        """Unlocks `lock`; the lock file is removed first when `remove` is set, or when there is no entry."""
+        if remove or (remove is None and not os.path.isdir(self._entry_dir(digest))):
+            try:
+                os.remove(self._lock_path(digest))
+            except FileNotFoundError:
+                pass
+        lock.close()
+
+    def _staging_dir(self, digest):
+        return tempfile.mkdtemp(dir=self.store_dir, prefix=f".staging-{digest[:12]}-")
+
+    def _commit(self, digest, staging, extracted_root):
+        """Records the entry metadata and atomically renames the staging tree into place."""
+        if extracted_root is None:
+            return
+
+        with open(os.path.join(staging, ROOT_FILE), 'w') as f:
+            f.write(os.path.relpath(extracted_root, staging))
+        with open(os.path.join(staging, SIZE_FILE), 'w') as f:
+            f.write(str(_tree_size(staging)))
+
+        os.rename(staging, self._entry_dir(digest))
+
+    def evict(self, keep=None):
+        """
+        Removes least recently used entries until the store fits in max_bytes.
+        Entries locked by a concurrent fetch are skipped.
+        """
+        entries = []
+        for entry in os.scandir(self.store_dir):
+            if entry.name.startswith('.') or not entry.is_dir():
+                continue
+            try:
+                with open(os.path.join(entry.path, SIZE_FILE), 'r') as f:
+                    size = int(f.read())
+                entries.append((entry.stat().st_mtime, entry.name, size))
+            except (OSError, ValueError):
+                continue
+
+        total = sum(size for _, _, size in entries)
+        for mtime, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+
+            try:
+                lock = self._acquire(name, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            try:
+                used = os.stat(self._entry_dir(name)).st_mtime != mtime
+            except OSError:
+                used = True
+            if used:
+                # Used (or removed) since the scan: no longer the least recently used entry.
+                self._release(lock, name)
+                continue
+
+            # Rename first so concurrent readers never see a half-deleted tree.
+            trash = tempfile.mkdtemp(dir=self.store_dir, prefix=".trash-")
+            try:
+                os.rename(self._entry_dir(name), os.path.join(trash, name))
+            except OSError:
+                os.rmdir(trash)
+                self._release(lock, name, remove=False)
+                continue
+            self._release(lock, name, remove=True)
+            shutil.rmtree(trash, ignore_errors=True)
+            total -= size
+
+
+@functools.lru_cache(maxsize=1024)
+def _image_digest(image_path, size, mtime_ns, chunk_size):
+    digest = hashlib.sha256()
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _tree_size(path):
+    total = 0
+    for dir_path, _, file_names in os.walk(path):
+        for file_name in file_names:
+            try:
+                total += os.lstat(os.path.join(dir_path, file_name)).st_size
+            except OSError:
+                continue
+    return total
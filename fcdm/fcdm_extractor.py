@@ -1,44 +1,176 @@
 import subprocess
+import glob
 import os
+import shutil
+from .fcdm_squashfs import SquashFSImage, SquashFSError
+from .fcdm_uci import DEFAULT_LIMITS
+
+def find_root(image_dir):
+    """Returns the squashfs-root (the directory holding etc/config) of an extracted image directory, or None."""
+    candidates = [image_dir, os.path.join(image_dir, "squashfs-root")]
+    candidates += sorted(glob.glob(os.path.join(image_dir, "_*.extracted", "squashfs-root")))
+
+    for candidate in candidates:
+        if os.path.isdir(os.path.join(candidate, "etc", "config")):
+            return candidate
+    return None
+
 
 class FirmwareExtractor:
     """Handles binwalk operations and file path resolution."""
-    def __init__(self, base_dir):
+
+    # Files read by the direct SquashFS backend, relative to squashfs-root.
+    CONFIG_FILES = (("etc", "config", "dropbear"), ("etc", "config", "firewall"))
+    # Build identification, copied next to the configs for the result store (see fcdm_results.device_model).
+    IDENTITY_FILES = (("etc", "device_info"), ("etc", "openwrt_release"))
+    BACKENDS = ('auto', 'squashfs', 'binwalk')
+    # One byte past the parser's file size limit, so truncated files are still reported as oversize.
+    MAX_CONFIG_BYTES = DEFAULT_LIMITS.max_file_size + 1
+
+    def __init__(self, base_dir, backend='auto', store=None, config_tree=False):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown extractor backend '{backend}'. Choose one of: {', '.join(self.BACKENDS)}.")
         self.base_dir = base_dir
+        self.backend = backend
+        self.store = store
+        # The direct SquashFS backend then reads every file under etc/config (for tree diffs), not only CONFIG_FILES.
+        self.config_tree = config_tree
         self.extracted_last_root = None
 
     def extract_config(self, firmware_path):
         """Extracts firmware and returns the path to the dropbear config."""
-        print(f"\n-> Starting extraction on: {firmware_path}")
-        
-        base_name = os.path.basename(firmware_path)
-        output_dir_root = os.path.join(self.base_dir, f"_{base_name}.extracted")
-        
-        if os.path.exists(output_dir_root):
-            subprocess.run(['rm', '-rf', output_dir_root], check=True)
-        else:
-            try:
-               subprocess.run(['binwalk', '-e', firmware_path], 
-                           cwd=self.base_dir, check=True, capture_output=True)
-               print("-> Binwalk extraction successful.")
-            except subprocess.CalledProcessError:
-               print("ERROR: Binwalk failed during extraction.")
+        extracted_root = self.extract_root(firmware_path)
+        if extracted_root is None:
             return None
 
-        extract_config_path = os.path.join(output_dir_root, "squashfs-root","etc","config","dropbear")
-        extracted__root = os.path.join(output_dir_root, "squashfs-root")
-        self.extracted_last_root = extracted__root
+        self.extracted_last_root = extracted_root
+        extract_config_path = os.path.join(extracted_root, "etc", "config", "dropbear")
 
-        
         if not os.path.exists(extract_config_path):
             print(f"ERROR: Config file not found at expected location.")
-            if not os.path.exists(extracted__root):
-                print("DIAGNOSIS: Squashfs-root directory was not created.")
             return None
         
         print(f"-> Configuration file located: {extract_config_path}")
         return extract_config_path
+
+    def extract_root(self, firmware_path):
+        """
+        Extracts a firmware image (through the store, if any) and returns its squashfs-root.
+        Unlike extract_config(), extracted_last_root is left alone.
+        """
+        print(f"\n-> Starting extraction on: {firmware_path}")
+        if self.store is not None:
+            return self.store.fetch(firmware_path, lambda work_dir: self._extract_into(firmware_path, work_dir),
+                                    variant='config-tree' if self.config_tree else None)
+        return self._extract_into(firmware_path, self.base_dir)
+
+    def _extract_into(self, firmware_path, work_dir):
+        """Extracts the image below work_dir with the configured backend and returns its squashfs-root."""
+        output_dir_root = os.path.join(work_dir, f"_{os.path.basename(firmware_path)}.extracted")
+
+        if self.backend in ('auto', 'squashfs'):
+            extracted_root = self._extract_squashfs(firmware_path, output_dir_root)
+            if extracted_root is not None or self.backend == 'squashfs':
+                return extracted_root
+            print("-> Falling back to binwalk extraction.")
+
+        return self._extract_binwalk(firmware_path, work_dir, output_dir_root)
+
+    def _extract_binwalk(self, firmware_path, work_dir, output_dir_root):
+        # binwalk refuses to overwrite, so a stale tree from an earlier run is cleared first.
+        if os.path.exists(output_dir_root):
+            shutil.rmtree(output_dir_root)
+
+        try:
+            subprocess.run(['binwalk', '-e', '-C', work_dir, firmware_path],
+                           cwd=work_dir, check=True, capture_output=True)
+            print("-> Binwalk extraction successful.")
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            print("ERROR: Binwalk failed during extraction.")
+            return None
+
+        extracted_root = os.path.join(output_dir_root, "squashfs-root")
+        if not os.path.exists(extracted_root):
+            print("DIAGNOSIS: Squashfs-root directory was not created.")
+            return None
+        return extracted_root
     
+    def read_image_configs(self, firmware_path, files=None, config_tree=False):
+        """
+        Returns {CONFIG_FILES (or `files`) entry: bytes or None} read straight out of
+        the image's SquashFS; with `config_tree`, every regular file under etc/config
+        is added. Raises SquashFSError if the image has no readable SquashFS.
+        """
+        with SquashFSImage(firmware_path) as image:
+            files = tuple(files or self.CONFIG_FILES)
+            if config_tree:
+                files += tuple(("etc", "config", name) for name in image.listdir("etc/config") or ()
+                               if ("etc", "config", name) not in files)
+            contents = {parts: image.read_file("/".join(parts), max_bytes=self.MAX_CONFIG_BYTES) for parts in files}
+        return contents
+
+    def _extract_squashfs(self, firmware_path, output_dir_root):
+        """
+        Reads only CONFIG_FILES and IDENTITY_FILES (plus all of etc/config with
+        config_tree) straight out of the image's SquashFS, without unpacking it.
+        """
+        extracted_root = os.path.join(output_dir_root, "squashfs-root")
+
+        try:
+            contents = self.read_image_configs(firmware_path, self.CONFIG_FILES + self.IDENTITY_FILES,
+                                               config_tree=self.config_tree)
+            if self.config_tree:
+                # Drop config files an earlier image of the same name left behind.
+                config_dir = os.path.join(extracted_root, "etc", "config")
+                for name in os.listdir(config_dir) if os.path.isdir(config_dir) else ():
+                    if ("etc", "config", name) not in contents:
+                        os.remove(os.path.join(config_dir, name))
+
+            for parts, content in contents.items():
+                target = os.path.join(extracted_root, *parts)
+
+                if content is None:
+                    if os.path.exists(target):
+                        os.remove(target)
+                    continue
+
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'wb') as f:
+                    f.write(content)
+        except (SquashFSError, OSError) as e:
+            print(f"ERROR: Direct SquashFS read failed: {e}")
+            return None
+
+        return extracted_root
+
+    def resolve_root(self, path):
+        """
+        Like prepare_root(), but returns the squashfs-root instead of relying on
+        extracted_last_root, so the controller can resolve several images at once
+        on executor threads.
+        """
+        if not os.path.isfile(path):
+            return self.locate_root(path)
+        return self.extract_root(path)
+
+    def prepare_root(self, path):
+        """Returns the squashfs-root for a firmware image file or an already extracted directory."""
+        if os.path.isfile(path):
+            if self.extract_config(path) is None:
+                return None
+            return self.extracted_last_root
+        return self.locate_root(path)
+
+    def locate_root(self, image_dir):
+        """Returns the squashfs-root of an already extracted firmware image directory."""
+        root = find_root(image_dir)
+        if root is None:
+            print(f"ERROR: No squashfs-root with etc/config found under {image_dir}.")
+            return None
+
+        self.extracted_last_root = root
+        return root
+
     def get_firewall_path(self):
         if not self.extracted_last_root:
             raise Exception("Extraction of firewall path not found.")
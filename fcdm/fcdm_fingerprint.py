@@ -0,0 +1,143 @@
+import functools
+import hashlib
+import os
+import time
+from .fcdm_cache import ParseCache
+from .fcdm_extraction_store import ExtractionStore
+from .fcdm_squashfs import SquashFSError
+
+
+def merkle_root(files):
+    """
+    Returns the Merkle root of {path parts: bytes or None}.
+
+    Files hash as blobs, directories as the sorted (name, child hash) list of
+    their entries, and a missing file as its own marker, so the root changes
+    whenever any relevant file is added, removed or edited.
+    """
+    tree = {}
+    for parts, content in files.items():
+        node = tree
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = content
+
+    def node_hash(node):
+        if isinstance(node, dict):
+            digest = hashlib.sha256(b'tree\0')
+            for name in sorted(node):
+                digest.update(name.encode() + b'\0' + node_hash(node[name]))
+            return digest.digest()
+        if node is None:
+            return hashlib.sha256(b'missing\0').digest()
+        return hashlib.sha256(b'blob\0' + node).digest()
+
+    return node_hash(tree).hex()
+
+
+def config_tree_fingerprint(config_dir):
+    """
+    Returns the Merkle root of every file under an etc/config directory.
+
+    The files are only re-read when one was added or removed or its size or
+    mtime changed since the last call for the same directory.
+    """
+    stamps = []
+    for dirpath, dirnames, filenames in os.walk(config_dir):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            stamps.append((os.path.relpath(path, config_dir), info.st_size, info.st_mtime_ns))
+    return _config_tree_fingerprint(os.path.abspath(config_dir), tuple(stamps))
+
+
+@functools.lru_cache(maxsize=1024)
+def _config_tree_fingerprint(config_dir, stamps):
+    files = {}
+    for relative_path, _, _ in stamps:
+        try:
+            with open(os.path.join(config_dir, relative_path), 'rb') as f:
+                files[tuple(relative_path.split(os.sep))] = f.read()
+        except OSError:
+            files[tuple(relative_path.split(os.sep))] = None
+    return merkle_root(files)
+
+
+class FingerprintIndex:
+    """
+    Persistent index of config fingerprints and the verdicts audited for them.
+
+    An image's fingerprint is the Merkle root of the config files the
+    extractor reads (FirmwareExtractor.CONFIG_FILES), so images that differ
+    only outside etc/config share one. Image digests are mapped to their
+    fingerprint, and verdicts are keyed by the (baseline, candidate)
+    fingerprint pair and the policy version.
+    """
+
+    def __init__(self, index_dir, max_entries=4096):
+        self.index_dir = index_dir
+        self.images = ParseCache(os.path.join(index_dir, 'images'), max_entries=max_entries)
+        self.verdicts = ParseCache(os.path.join(index_dir, 'verdicts'), max_entries=max_entries)
+
+    @staticmethod
+    def tree_fingerprint(extractor, root):
+        files = {}
+        for parts in extractor.CONFIG_FILES:
+            try:
+                with open(os.path.join(root, *parts), 'rb') as f:
+                    files[parts] = f.read()
+            except FileNotFoundError:
+                files[parts] = None
+        return merkle_root(files)
+
+    def fingerprint(self, path, extractor):
+        """
+        Returns the config fingerprint of an image file or extracted directory,
+        or None when it cannot be computed without a full extraction.
+        """
+        if not os.path.isfile(path):
+            root = extractor.locate_root(path)
+            return self.tree_fingerprint(extractor, root) if root is not None else None
+
+        image_key = ParseCache.make_key('image', ExtractionStore.image_digest(path).encode(), '')
+        cached = self.images.get(image_key)
+        if cached is not None:
+            return cached['fingerprint']
+
+        try:
+            fingerprint = merkle_root(extractor.read_image_configs(path))
+        except (SquashFSError, OSError):
+            return None
+        self.images.put(image_key, {'fingerprint': fingerprint})
+        return fingerprint
+
+    def record_image(self, path, extractor, root):
+        """Fingerprints an image from its extracted tree and returns the fingerprint."""
+        fingerprint = self.tree_fingerprint(extractor, root)
+        if os.path.isfile(path):
+            image_key = ParseCache.make_key('image', ExtractionStore.image_digest(path).encode(), '')
+            self.images.put(image_key, {'fingerprint': fingerprint})
+        return fingerprint
+
+    @staticmethod
+    def _verdict_key(baseline, candidate, policy_version):
+        return ParseCache.make_key('verdict', f"{baseline}:{candidate}".encode(), policy_version)
+
+    def lookup_verdict(self, baseline, candidate, policy_version):
+        """Returns the stored verdict record for a fingerprint pair, or None."""
+        return self.verdicts.get(self._verdict_key(baseline, candidate, policy_version))
+
+    def record_verdict(self, baseline, candidate, policy_version, verdict, result, v1_path=None, v2_path=None,
+                       explanation=None):
+        self.verdicts.put(self._verdict_key(baseline, candidate, policy_version), {
+            'verdict': verdict,
+            'result': result,
+            'explanation': explanation,
+            'audited': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'v1': v1_path,
+            'v2': v2_path,
+        })
@@ -0,0 +1,133 @@
+import fcntl
+import json
+import os
+import time
+import uuid
+from .fcdm_uci import ReadLimits, bounded_lines
+
+
+# Log files are streamed line by line; a corrupt giant line is truncated rather than loaded.
+VIEW_LIMITS = ReadLimits(max_line_length=1024 * 1024, max_file_size=float('inf'))
+
+
+class LogSink:
+    """
+    Buffered, append-only JSON-lines log shared by concurrent FCDM processes.
+
+    Records are buffered in memory and appended in one write per flush while
+    holding an exclusive lock on a sidecar lock file, which also serializes
+    size-based rotation (fcdm_analysis.log -> fcdm_analysis.log.1 -> ...).
+    """
+
+    def __init__(self, log_file_path, max_bytes=10 * 1024 * 1024, backups=5, buffer_size=64):
+        self.log_file_path = log_file_path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.run_id = None
+        self.start_run()
+
+    def start_run(self):
+        """Starts a new run and returns its ID; every following record carries it."""
+        self.flush()
+        self.run_id = uuid.uuid4().hex[:12]
+        return self.run_id
+
+    def emit(self, message, level='INFO'):
+        self.buffer.append({
+            'ts': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'run_id': self.run_id,
+            'pid': os.getpid(),
+            'level': level,
+            'msg': message,
+        })
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Appends the buffered records to the log file."""
+        if not self.buffer:
+            return
+
+        data = "".join(json.dumps(record) + "\n" for record in self.buffer).encode()
+        self.buffer = []
+        append_locked(self.log_file_path, data, self._rotate_if_full)
+
+    def _rotate_if_full(self, size):
+        try:
+            if os.path.getsize(self.log_file_path) + size > self.max_bytes:
+                self._rotate()
+        except FileNotFoundError:
+            pass
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.log_file_path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.log_file_path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.log_file_path, f"{self.log_file_path}.1")
+        else:
+            os.remove(self.log_file_path)
+
+
+def append_locked(path, data, before_write=None):
+    """
+    Appends `data` (bytes) to `path` in one O_APPEND write while holding an
+    exclusive flock on the sidecar `path.lock`, so records of concurrent
+    processes never interleave. `before_write(len(data))` runs under the lock.
+    """
+    with open(path + '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if before_write is not None:
+            before_write(len(data))
+
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+
+def log_files(log_file_path, backups=5):
+    """Returns the existing log file and its rotated backups, oldest first."""
+    candidates = [f"{log_file_path}.{index}" for index in range(backups, 0, -1)] + [log_file_path]
+    return [path for path in candidates if os.path.exists(path)]
+
+
+def iter_records(log_file_path, run_id=None, backups=5):
+    """
+    Streams log records one line at a time, optionally only those of `run_id`.
+
+    Lines that are not JSON (logs written by older FCDM versions) are yielded
+    as records with a None run ID.
+    """
+    for path in log_files(log_file_path, backups):
+        with open(path, 'r', errors='replace') as f:
+            for line in bounded_lines(f, VIEW_LIMITS):
+                line = line.rstrip("\n")
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = {'ts': None, 'run_id': None, 'msg': line}
+                if not isinstance(record, dict):
+                    continue
+                if run_id is None or record.get('run_id') == run_id:
+                    yield record
+
+
+def last_run_id(log_file_path, backups=5):
+    """Returns the run ID of the most recent record, scanning the log without loading it."""
+    run_id = None
+    for record in iter_records(log_file_path, backups=backups):
+        run_id = record.get('run_id') or run_id
+    return run_id
+
+
+def format_record(record):
+    if record.get('ts') is None:
+        return record['msg']
+    return f"[{record['ts']}] [{record.get('run_id')}] {record['msg']}"
@@ -0,0 +1,111 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module; peak RSS is then reported as None.
+    resource = None
+
+
+def peak_rss_kb():
+    """Returns the peak resident set size of this process in KiB, or None if unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in KiB on Linux.
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class RunMetrics:
+    """Collects per-stage wall/CPU timers, bytes read, solver statistics and peak RSS for one audit run."""
+
+    def __init__(self, v1_path=None, v2_path=None, profile=False):
+        self.v1_path = v1_path
+        self.v2_path = v2_path
+        self.run_id = None
+        self.started = time.time()
+        self._start_wall = time.perf_counter()
+        self.stages = {}
+        self.bytes_read = 0
+        self.solver = {}
+        self.verdict = None
+        self.cached_verdict = False
+
+        # cProfile only sees the thread it is enabled on, so executor jobs get their own profilers.
+        self.profilers = [] if profile else None
+
+    @contextmanager
+    def stage(self, name, cpu_clock=time.process_time):
+        """
+        Times a stage. Stages that run entirely on one worker thread should pass
+        cpu_clock=time.thread_time so that overlapping stages are not double counted.
+        """
+        wall_start, cpu_start = time.perf_counter(), cpu_clock()
+        try:
+            yield
+        finally:
+            stage = self.stages.setdefault(name, {'wall_s': 0.0, 'cpu_s': 0.0, 'calls': 0})
+            stage['wall_s'] += time.perf_counter() - wall_start
+            stage['cpu_s'] += cpu_clock() - cpu_start
+            stage['calls'] += 1
+
+    def timed(self, name, func, *args):
+        """Calls func(*args) inside a thread-CPU timed stage; meant for executor jobs."""
+        with self.stage(name, cpu_clock=time.thread_time):
+            if self.profilers is None:
+                return func(*args)
+
+            import cProfile
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+ profiles every thread from the main profiler already.
+                return func(*args)
+            try:
+                return func(*args)
+            finally:
+                profiler.disable()
+                self.profilers.append(profiler)
+
+    def record(self):
+        """Returns the run as a JSON-serializable dict."""
+        return {
+            'run_id': self.run_id,
+            'started': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            'v1': self.v1_path,
+            'v2': self.v2_path,
+            'verdict': self.verdict,
+            'cached_verdict': self.cached_verdict,
+            'wall_s': round(time.perf_counter() - self._start_wall, 6),
+            'stages': {name: {key: round(value, 6) if isinstance(value, float) else value
+                              for key, value in stage.items()}
+                       for name, stage in self.stages.items()},
+            'bytes_read': self.bytes_read,
+            'solver': self.solver,
+            'peak_rss_kb': peak_rss_kb(),
+        }
+
+    def write(self, metrics_path):
+        """Appends the run record as one JSON line, under the same lock as the log (see fcdm_log)."""
+        from .fcdm_log import append_locked
+
+        append_locked(metrics_path, (json.dumps(self.record(), sort_keys=True) + "\n").encode())
+
+
+def dump_profile(main_profiler, metrics, profile_path):
+    """Merges the main-thread profile with the executor job profiles and writes a pstats file."""
+    import pstats
+
+    stats = pstats.Stats(main_profiler)
+    for profiler in getattr(metrics, 'profilers', None) or []:
+        stats.add(profiler)
+    stats.dump_stats(profile_path)
+
+
+def metrics_path_for(log_file_path):
+    """Returns the metrics file that sits next to a log file (fcdm_analysis.log -> fcdm_analysis.metrics.jsonl)."""
+    return os.path.splitext(log_file_path)[0] + '.metrics.jsonl'
@@ -1,104 +1,224 @@
+import io
 import json
 import os
+import threading
+from collections import deque
+from .fcdm_policy import load_policy, port_sort_key
+from .fcdm_records import DropbearSettings, PortSet, PortUniverse
+from .fcdm_uci import DEFAULT_LIMITS, UCIStream, bounded_lines
+
+
+class DropbearPolicy:
+    """Folds every `config dropbear` instance into the normalized auth settings."""
+    kind = 'dropbear'
+    package = 'dropbear'
+    section_type = 'dropbear'
+    # Options read by on_section (lowercase), so tree diffs can tell which changes matter.
+    options = frozenset({'passwordauth', 'rootpasswordauth'})
+
+    def __init__(self, default_root_allowed=False):
+        self.default_root_allowed = default_root_allowed
+        self.instances = []
+
+    def on_section(self, section):
+        options = {key.lower(): value.lower() for key, value in section.options.items()}
+        root_value = options.get('rootpasswordauth')
+        self.instances.append(DropbearSettings(
+            root_login_allowed=self.default_root_allowed if root_value is None else root_value == 'on',
+            password_auth_enabled=options.get('passwordauth') == 'on'
+        ))
+
+    def result(self):
+        # Any instance that allows a login method exposes it on the device.
+        if not self.instances:
+            return DropbearSettings(self.default_root_allowed, False)
+        return DropbearSettings(*(any(instance[setting] for instance in self.instances)
+                                  for setting in DropbearSettings.SETTINGS))
+
+    def dump(self, policy_settings):
+        return dict(policy_settings)
+
+    def load(self, cached):
+        return DropbearSettings.from_dict(cached)
+
+
+class FirewallPolicy:
+    """
+    Collects the critical ports that WAN `config rule` sections ACCEPT.
+
+    The result is a PortSet over `universe` (built from the critical ports
+    when none is given), i.e. one int mask per parsed image.
+    """
+    kind = 'firewall'
+    package = 'firewall'
+    section_type = 'rule'
+    options = frozenset({'src', 'target', 'dest_port'})
+
+    def __init__(self, critical_ports, universe=None):
+        self.critical_ports = critical_ports
+        self.universe = universe or PortUniverse(sorted(critical_ports, key=port_sort_key))
+        self.open_mask = 0
+
+    def on_section(self, section):
+        if section.get('src') != 'wan' or section.get('target') != 'ACCEPT':
+            return
+        for value in section.values('dest_port'):
+            for port in value.split():
+                if port in self.critical_ports:
+                    self.open_mask |= self.universe.bits[port]
+
+    def result(self):
+        return PortSet(self.open_mask, self.universe)
+
+    def dump(self, open_ports):
+        return sorted(open_ports)
+
+    def load(self, cached):
+        return self.universe.port_set(cached)
 
 
 class ConfigParser:
     """Handles the configuration parsing process."""
     
-    def __init__(self, default_root_allowed=False):
+    def __init__(self, default_root_allowed=False, cache=None, policy=None, limits=None):
         self.default_root_allowed = default_root_allowed
+        self.cache = cache
+        self.bytes_read = 0
+        # The controller parses V1 and V2 on separate executor threads.
+        self._bytes_lock = threading.Lock()
+
+        # Line length, section count and file size bounds (see fcdm_uci.ReadLimits), and the
+        # most recent limit violations of calls that did not collect their own diagnostics.
+        self.limits = limits or DEFAULT_LIMITS
+        self.diagnostics = deque(maxlen=256)
+
+        # The compiled rule table is shared with the verifier and loaded once per process.
+        self.policy = policy if policy is not None else load_policy()
+        # Every port some rule refers to, not only the critical ones.
+        self.CRITICAL_PORTS = self.policy.ports
+
+    @property
+    def policy_version(self):
+        """Identifies the policy inputs that the normalized output depends on."""
+        return json.dumps({"critical_ports": sorted(self.CRITICAL_PORTS),
+                           "default_root_allowed": self.default_root_allowed})
+
+    def _count_bytes(self, count):
+        with self._bytes_lock:
+            self.bytes_read += count
+
+    def default_consumers(self):
+        return [DropbearPolicy(self.default_root_allowed), FirewallPolicy(self.CRITICAL_PORTS, self.policy.port_universe)]
+
+    def parse_config_dir(self, config_dir, consumers=None, diagnostics=None):
+        """
+        Runs policy consumers over a UCI config directory (e.g. etc/config).
 
-        current_file_dir = os.path.dirname(os.path.abspath(__file__))
-        config_path = os.path.join(current_file_dir, 'fcdm_config.json')
-        try:
-            with open(config_path, 'r') as f:
-                self.policy = json.load(f)
-                self.CRITICAL_PORTS = self.policy['critical_ports']
-
-        except FileNotFoundError:
-            raise FileNotFoundError(f"Required configuration file 'fcdm_config.json' not found. "
-                f"It must be in the same folder as the parser script. Looked at: {config_path}"
-            )
+        Each package file is read exactly once, however many consumers
+        subscribe to it. Returns the consumer results in consumer order, with
+        None for consumers whose package file does not exist. Input beyond
+        the read limits is truncated and reported in `diagnostics` (a list),
+        or in self.diagnostics when none is given.
+        """
+        consumers = consumers if consumers is not None else self.default_consumers()
+        diagnostics = self.diagnostics if diagnostics is None else diagnostics
+        results = [None] * len(consumers)
+
+        by_package = {}
+        for index, consumer in enumerate(consumers):
+            by_package.setdefault(consumer.package, []).append((index, consumer))
+
+        stream = UCIStream(self.limits)
+        for package, members in by_package.items():
+            file_path = os.path.join(config_dir, package)
+            if not os.path.isfile(file_path):
+                continue
+
+            if self.cache is None:
+                for _, consumer in members:
+                    stream.subscribe(package, consumer.on_section, consumer.section_type)
+            else:
+                self._parse_cached(file_path, members, results, diagnostics)
+
+        stream.scan(config_dir)
+        self._count_bytes(stream.bytes_read)
+        diagnostics.extend(stream.diagnostics)
+        for index, consumer in enumerate(consumers):
+            if results[index] is None and os.path.isfile(os.path.join(config_dir, consumer.package)):
+                results[index] = consumer.result()
+
+        return results
+
+    def _parse_cached(self, file_path, members, results, diagnostics):
+        """Serves consumers from the parse cache and feeds the misses from a single read."""
+        with open(file_path, 'rb') as f:
+            content = f.read(self.limits.max_file_size + 1)
+
+        if len(content) > self.limits.max_file_size:
+            # The key would only cover a truncated prefix, so oversize files bypass the cache.
+            self._parse_streaming(file_path, members, results, diagnostics)
+            return
+        self._count_bytes(len(content))
+
+        misses = []
+        for index, consumer in members:
+            key = self.cache.make_key(consumer.kind, content, self.policy_version)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[index] = consumer.load(cached)
+            else:
+                misses.append((index, consumer, key))
+
+        if not misses:
+            return
+
+        stream = UCIStream(self.limits)
+        for _, consumer, _ in misses:
+            stream.subscribe(consumer.package, consumer.on_section, consumer.section_type)
+        text = io.StringIO(content.decode('utf-8', errors='replace'))
+        stream.feed(misses[0][1].package, bounded_lines(text, self.limits, stream.diagnostics, file_path))
+        diagnostics.extend(stream.diagnostics)
+
+        for index, consumer, key in misses:
+            results[index] = consumer.result()
+            self.cache.put(key, consumer.dump(results[index]))
+
+    def _parse_streaming(self, file_path, members, results, diagnostics):
+        """Feeds the consumers straight from the file within the read limits."""
+        stream = UCIStream(self.limits)
+        for _, consumer in members:
+            stream.subscribe(consumer.package, consumer.on_section, consumer.section_type)
+        with open(file_path, 'r', errors='replace') as f:
+            self._count_bytes(min(os.fstat(f.fileno()).st_size, self.limits.max_file_size))
+            stream.feed_file(members[0][1].package, f, source=file_path)
+        diagnostics.extend(stream.diagnostics)
+
+        for index, consumer in members:
+            results[index] = consumer.result()
+
+    def _parse_file(self, consumer, file_path):
+        results = [None]
+        if self.cache is not None:
+            self._parse_cached(file_path, [(0, consumer)], results, self.diagnostics)
+        else:
+            self._parse_streaming(file_path, [(0, consumer)], results, self.diagnostics)
+        return results[0]
 
-        
     def parse_firewall_config(self, file_path):
-        open_ports = set()
-        current_rules = {}
-        in_rule = False
-
-        def check_and_add_port(rules):
-            if (rules.get('src') == 'wan' and 
-                rules.get('dest_port')in self.CRITICAL_PORTS and rules.get('target') == 'ACCEPT'):
-                open_ports.add(rules['dest_port'])
-
-        try: 
-            with open(file_path,'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#'): continue
-
-                    if line.startswith('config rule'):
-                        check_and_add_port(current_rules)
-                        current_rules = {}
-                        in_rule = True
-
-                    elif in_rule:
-                        parts = line.split()
-                        if len(parts) >= 3 and parts[0] == 'option':
-                            key = parts[1]
-                            raw_val = ' '.join(parts[2:])
-                            val = raw_val.strip("'\"").strip()
-                            current_rules[key] = val
-
-            check_and_add_port(current_rules)        
-            
+        try:
+            return self._parse_file(FirewallPolicy(self.CRITICAL_PORTS, self.policy.port_universe), file_path)
         except FileNotFoundError:
             print(f"Warning: Firewall config not found at {file_path}.")
             return set()
-        
-        return open_ports
-                    
 
     def parse_dropbear_config(self, file_path):
         """
         Parses the dropbear UCI config and normalizes policy settings.
-        file_path is now correctly recognized as an argument of this method.
+        Every `config dropbear` instance is considered; a login method
+        enabled on any instance counts as enabled.
         """
-        
-        policy_settings = {
-            "root_login_allowed": self.default_root_allowed,
-            "password_auth_enabled": False  
-        }
-
-
-        in_dropbear_config = False
-
         try:
-            with open(file_path, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    
-                    if not line or line.startswith('#'):
-                        continue
-                
-                    if line.startswith('config dropbear'):
-                        in_dropbear_config = True
-                    
-                    elif in_dropbear_config:
-                        parts = line.split()
-                        
-                        if len(parts) >= 3 and parts[0].lower() == 'option':
-                            directive = parts[1].lower()
-                            value = parts[2].strip("'").lower()
-
-                            if directive == 'rootpasswordauth':
-                                policy_settings["root_login_allowed"] = (value == 'on')
-                        
-                            elif directive == 'passwordauth':
-                                policy_settings["password_auth_enabled"] = (value == 'on')
-
+            return self._parse_file(DropbearPolicy(self.default_root_allowed), file_path)
         except FileNotFoundError:
             print(f"Error: Config file not found at {file_path}")
             return None
-        
-        return policy_settings
\ No newline at end of file
@@ -0,0 +1,169 @@
+import functools
+import hashlib
+import json
+import os
+from .fcdm_records import PortSet, PortUniverse
+
+
+DEFAULT_POLICY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fcdm_config.json')
+
+# Normalized auth setting -> name of its Z3 variable (v1_root_allowed, v2_password_enabled, ...).
+AUTH_VARIABLES = {
+    'root_login_allowed': 'root_allowed',
+    'password_auth_enabled': 'password_enabled',
+}
+
+
+class PolicyRule:
+    """
+    One compiled drift rule: V1 satisfied it and V2 violates it.
+
+    `auth` rules are violated when any of their settings is enabled, `ports`
+    rules when any of their ports is open. `timeout_ms` optionally bounds the
+    rule's own Z3 query (see PolicyVerifier.check_candidate()).
+    """
+
+    def __init__(self, rule_id, kind, message, settings=(), ports=frozenset(), timeout_ms=None):
+        self.rule_id = rule_id
+        self.kind = kind
+        self.message = message
+        self.settings = settings
+        self.ports = ports
+        self.timeout_ms = timeout_ms
+
+    def violated(self, config, firewall):
+        if self.kind == 'auth':
+            return any(config[setting] for setting in self.settings)
+        return not self.ports.isdisjoint(firewall)
+
+    def evaluate(self, config_v1, config_v2, firewall_v1, firewall_v2):
+        """Fast evaluator for ground configurations."""
+        return bool(not self.violated(config_v1, firewall_v1) and self.violated(config_v2, firewall_v2))
+
+    def formula(self, auth_vars, opened):
+        """
+        Builds the Z3 drift formula. `opened(version, ports)` returns the Z3
+        condition "some of `ports` is open in `version`" of the port encoding in use.
+        """
+        from z3 import And, Or, Not
+
+        if self.kind == 'auth':
+            def enabled(version):
+                return Or(*(auth_vars[version][AUTH_VARIABLES[s]] for s in self.settings))
+        else:
+            def enabled(version):
+                return opened(version, self.ports)
+        return And(Not(enabled('v1')), enabled('v2'))
+
+    def __repr__(self):
+        return f"PolicyRule({self.rule_id!r}, kind={self.kind!r})"
+
+
+class CompiledPolicy:
+    """
+    The policy file compiled once into an indexed rule table.
+
+    Ports are frozensets and rules are shared by the parser (critical ports)
+    and the verifier (fast evaluators and Z3 formulas), so adding rules costs
+    nothing per run beyond evaluating them.
+    """
+
+    def __init__(self, document):
+        try:
+            self.critical_ports = frozenset(str(p) for p in document['critical_ports'])
+            self.service_port = str(document['service_hardening']['service_port'])
+            rule_specs = document['rules']
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Policy is missing a required entry: {e}")
+
+        self.rules = tuple(self._compile_rule(spec) for spec in rule_specs)
+        self.settings = tuple(dict.fromkeys(s for rule in self.rules for s in rule.settings))
+        self.ports = frozenset().union(self.critical_ports, {self.service_port}, *(rule.ports for rule in self.rules))
+        # Bit position of every port in the bit-vector port encoding.
+        self.port_index = {p: i for i, p in enumerate(sorted(self.ports, key=port_sort_key))}
+        # Parsed firewall results are PortSets over the same bit positions.
+        self.port_universe = PortUniverse(self.port_index)
+        self.version = hashlib.sha256(json.dumps(document, sort_keys=True).encode()).hexdigest()[:16]
+        self._formulas = {}
+
+    def _compile_rule(self, spec):
+        kind = spec.get('kind')
+        message = spec.get('message', spec.get('id', kind)).format(service_port=self.service_port)
+        timeout_ms = spec.get('timeout_ms')
+        if timeout_ms is not None and (not isinstance(timeout_ms, int) or isinstance(timeout_ms, bool) or timeout_ms <= 0):
+            raise ValueError(f"Rule {spec.get('id')} needs a positive integer timeout_ms.")
+        if kind == 'auth':
+            settings = tuple(spec.get('settings', AUTH_VARIABLES))
+            unknown = [s for s in settings if s not in AUTH_VARIABLES]
+            if unknown:
+                raise ValueError(f"Rule {spec.get('id')} uses unknown auth settings: {unknown}")
+            return PolicyRule(spec.get('id'), kind, message, settings=settings, timeout_ms=timeout_ms)
+
+        if kind == 'ports':
+            ports = spec.get('ports')
+            if ports == 'critical_ports':
+                ports = self.critical_ports
+            elif ports == 'service_port':
+                ports = {self.service_port}
+            elif not isinstance(ports, list):
+                raise ValueError(f"Rule {spec.get('id')} needs a port list, 'critical_ports' or 'service_port'.")
+            return PolicyRule(spec.get('id'), kind, message, ports=frozenset(str(p) for p in ports),
+                              timeout_ms=timeout_ms)
+
+        raise ValueError(f"Rule {spec.get('id')} has unknown kind {kind!r}.")
+
+    def evaluate(self, config_v1, config_v2, firewall_v1, firewall_v2):
+        """Returns one verdict per rule for ground configurations."""
+        return [rule.evaluate(config_v1, config_v2, firewall_v1, firewall_v2) for rule in self.rules]
+
+    def port_mask(self, ports):
+        """Returns the bit mask of the policy ports among `ports`; other ports are ignored."""
+        if isinstance(ports, PortSet) and ports.universe is self.port_universe:
+            return ports.mask
+        mask = 0
+        for p in ports:
+            index = self.port_index.get(p)
+            if index is not None:
+                mask |= 1 << index
+        return mask
+
+    def formulas(self, encoding='bool'):
+        """
+        Returns the Z3 drift formulas, one per rule, built on first use.
+
+        'bool' models every port of each version as its own Bool (v1_23_open);
+        'bitvec' models each version's open ports as one bit-vector (v1_ports)
+        and tests a rule's ports with a single mask operation.
+        """
+        if encoding not in self._formulas:
+            from z3 import Bool, BitVec, Or
+
+            auth_vars = {version: {var: Bool(f'{version}_{var}') for var in AUTH_VARIABLES.values()}
+                         for version in ('v1', 'v2')}
+            if encoding == 'bitvec':
+                def opened(version, ports):
+                    return BitVec(f'{version}_ports', len(self.port_index)) & self.port_mask(ports) != 0
+            elif encoding == 'bool':
+                def opened(version, ports):
+                    return Or(*(Bool(f'{version}_{p}_open') for p in sorted(ports, key=port_sort_key)))
+            else:
+                raise ValueError(f"Unknown port encoding {encoding!r}.")
+            self._formulas[encoding] = tuple(rule.formula(auth_vars, opened) for rule in self.rules)
+        return self._formulas[encoding]
+
+
+def port_sort_key(port):
+    """Orders numeric ports numerically and anything else after them."""
+    return (0, int(port), port) if port.isdigit() else (1, 0, port)
+
+
+@functools.lru_cache(maxsize=None)
+def load_policy(policy_path=DEFAULT_POLICY_PATH):
+    """Loads and compiles a policy file; each path is read once per process."""
+    try:
+        with open(policy_path, 'r') as f:
+            document = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Required configuration file 'fcdm_config.json' not found. "
+                                f"It must be in the 'fcdm' folder. Looked at: {policy_path}")
+    return CompiledPolicy(document)
@@ -1,108 +1,362 @@
 
-from z3 import Solver, Bool, And, Or, sat , is_true, BoolVal
-import json
-import os
+from .fcdm_policy import AUTH_VARIABLES, load_policy, port_sort_key
 
 
 
 class PolicyVerifier:
     """Encodes the Z3 constraints as part of the security policy and mathematically analyzes the configuration drift."""
-    def __init__(self):
 
+    # Default bound of every rule's Z3 query; a rule's own timeout_ms in the policy overrides it.
+    DEFAULT_RULE_TIMEOUT_MS = 10000
 
-        
-        current_file_dir= os.path.dirname(os.path.abspath(__file__))
-        config_path = os.path.join(current_file_dir, 'fcdm_config.json')
+    def __init__(self, fast_path=True, policy=None, port_encoding='bitvec', rule_timeout_ms=DEFAULT_RULE_TIMEOUT_MS,
+                 rule_workers=None):
+
+        # The compiled rule table is shared with the parser and loaded once per process.
+        self.policy = policy if policy is not None else load_policy()
+        self.service_port = self.policy.service_port
+        self.critical_ports = self.policy.critical_ports
+
+        # Ground (fully concrete) inputs are decided in pure Python unless disabled.
+        self.fast_path = fast_path
+
+        # 'bool' (one Bool per port and version) or 'bitvec' (one bit-vector per version),
+        # see CompiledPolicy.formulas().
+        if port_encoding not in ('bool', 'bitvec'):
+            raise ValueError(f"Unknown port encoding {port_encoding!r}.")
+        self.port_encoding = port_encoding
+
+        # Every rule is checked as its own Z3 query (in its own context) on a pool of
+        # rule_workers threads (default: one per rule); a query that exceeds its
+        # timeout leaves the rule UNKNOWN instead of stalling the audit. None or 0 disables the timeout.
+        if rule_timeout_ms is not None and (isinstance(rule_timeout_ms, bool) or rule_timeout_ms < 0):
+            raise ValueError(f"rule_timeout_ms must be a non-negative number of milliseconds, not {rule_timeout_ms!r}.")
+        self.rule_timeout_ms = rule_timeout_ms
+        self.rule_workers = rule_workers
+        self.rule_solvers = None
+        self._rule_contexts = []
+        self._rule_executor = None
+
+        # Which engine decided the last check and, for Z3, its solver.statistics().
+        self.last_engine = None
+        self.last_statistics = {}
+        # {port rule id: V2 ports that violate it} of the last check.
+        self.last_violations = {}
+        # IDs of the policy rules the last check found violated.
+        self.last_violated = []
+        # {rule id: Z3's reason} for the rules the last check could not decide (e.g. 'timeout').
+        self.last_unknown = {}
+        # Structured report of the last check, naming only the changed settings and ports (see explain()).
+        self.last_explanation = None
+
+        # Incremental state: every rule solver holds the baseline (V1) facts and
+        # its rule's drift formula, and `solver` the baseline facts used to
+        # compute unsat cores; every candidate is checked inside push/pop scopes.
+        self.solver = None
+        self.baseline = None
+        self.baseline_key = None
+        self.ports_modeled = set()
+
+    def close(self):
+        """Shuts down the rule thread pool; a later check starts a new one."""
+        if self._rule_executor is not None:
+            self._rule_executor.shutdown(wait=True)
+            self._rule_executor = None
+
+    @staticmethod
+    def _baseline_key(config_v1, firewall_v1):
+        return (config_v1['root_login_allowed'], config_v1['password_auth_enabled'], frozenset(firewall_v1))
+
+    def load_baseline(self, config_v1, firewall_v1, extra_ports=()):
+        """
+        Asserts the baseline facts and the per-rule drift formulas once.
+
+        Loading the baseline that is already asserted is a no-op, so callers
+        can pass the same V1 state for every candidate without paying for it.
+        """
+        # z3 is imported on first use: ground configurations never need it.
+        from z3 import Solver, Bool, BitVec
+
+        key = self._baseline_key(config_v1, firewall_v1)
+        if self.port_encoding == 'bitvec':
+            # Ports outside the policy are never referenced by a rule, so the bit-vector width is fixed.
+            ports = set(self.policy.ports)
+        else:
+            ports = set(self.policy.ports) | set(firewall_v1) | set(extra_ports)
+        if key == self.baseline_key and ports <= self.ports_modeled:
+            return
 
-        try:
-            with open(config_path,'r') as f:    
-                self.policy = json.load(f)
-                self.service_port = self.policy['service_hardening']['service_port']
-        except Exception as e:
-            raise FileNotFoundError(f"Required configuration file fcdm_config.json"
-                                    f" Ensure the file is in the 'fcdm' folder. Error: {e}")
-
-    def check_security_drift(self, config_v1, config_v2, firewall_v1, firewall_v2):
         solver = Solver()
-        auth_var_dict = {
-            'v1': {
-                'root_allowed': Bool('v1_root_allowed'),
-                'password_enabled': Bool('v1_password_enabled')
-            },
-            'v2':{
-                'root_allowed': Bool('v2_root_allowed'),
-                'password_enabled': Bool('v2_password_enabled')
-            }
+        # Unsat cores explain violations with as few changed facts as possible.
+        solver.set("core.minimize", True)
+        if self.rule_timeout_ms:
+            solver.set("timeout", self.rule_timeout_ms)
+        self.ports_to_model = sorted(ports)
+        self.ports_modeled = ports
+        self.auth_var_dict = {
+            version: {var: Bool(f'{version}_{var}') for var in AUTH_VARIABLES.values()}
+            for version in ('v1', 'v2')
         }
-        
-        # Examine and extract observable ports found in the firmware, then store them in a list.
-        all_obs_ports = firewall_v1 | firewall_v2
-        if not all_obs_ports:
-            ports_to_model = []
+        if self.port_encoding == 'bitvec':
+            self.port_vectors = {version: BitVec(f'{version}_ports', len(self.policy.port_index))
+                                 for version in ('v1', 'v2')}
         else:
-            ports_to_model = sorted(list(all_obs_ports))
+            self.net_var_dict = {
+                'v1': {p: Bool(f'v1_{p}_open') for p in self.ports_to_model},
+                'v2': {p: Bool(f'v2_{p}_open') for p in self.ports_to_model}
+            }
 
-        net_var_dict = {
-            'v1': {p: Bool(f'v1_{p}_open') for p in ports_to_model},
-            'v2': {p: Bool(f'v2_{p}_open') for p in ports_to_model}
+        self._add_auth_facts(solver, 'v1', config_v1)
+        self._add_port_facts(solver, 'v1', firewall_v1)
 
-            }
-        for version, cfg in [('v1', config_v1), ('v2', config_v2)]:
-            solver.add(auth_var_dict[version]['root_allowed'] == cfg['root_login_allowed'])
-            solver.add(auth_var_dict[version]['password_enabled'] ==cfg['password_auth_enabled'])
-        
-    
-        for version, fw_ports in [('v1', firewall_v1), ('v2', firewall_v2)]:
-            for p in ports_to_model:
-                solver.add(net_var_dict[version][p] == (p in fw_ports))
-
-        v1_was_secure = And(auth_var_dict['v1']['root_allowed']== False,
-                            auth_var_dict['v1']['password_enabled']== False
-                            )
-        
-        v2_is_insecure = Or(auth_var_dict['v2']['root_allowed'] == True,
-                            auth_var_dict['v2']['password_enabled'] == True)
-        
-        security_drift_proof = And(v1_was_secure, v2_is_insecure)
-
-        net_v1_secure = And(*(net_var_dict['v1'][p] == False for p in ports_to_model))
-        net_v2_insecure = Or(*(net_var_dict['v2'][p] == True for p in ports_to_model))
-
-        security_drift_proof_2 = And(net_v1_secure, net_v2_insecure)
-
-        service_port = self.service_port
-        if service_port in ports_to_model:
-            svc_v1_secure = net_var_dict['v1'][service_port] == False
-            svc_v2_insecure = net_var_dict['v2'][service_port] == True
-            security_drift_proof_3 = And(svc_v1_secure, svc_v2_insecure)
-            overall_drift_proof = Or(security_drift_proof,security_drift_proof_2, security_drift_proof_3)
+        # One formula per policy rule, generated once from the compiled rule table.
+        self.drift_proofs = self.policy.formulas(self.port_encoding)
+        baseline_facts = solver.assertions()
+        self.rule_solvers = [self._rule_solver(index, rule, proof, baseline_facts)
+                             for index, (rule, proof) in enumerate(zip(self.policy.rules, self.drift_proofs))]
+
+        self.solver = solver
+        self.baseline = (config_v1, firewall_v1)
+        self.baseline_key = key
+
+    def _rule_solver(self, index, rule, proof, baseline_facts):
+        """Returns a solver in the rule's own Z3 context holding the baseline facts and the rule's drift formula."""
+        from z3 import Context, Solver
+
+        # Z3 contexts are not thread-safe, but separate contexts can be solved concurrently.
+        # They are costly to create, so a new baseline reuses them.
+        while len(self._rule_contexts) <= index:
+            self._rule_contexts.append(Context())
+        context = self._rule_contexts[index]
+        solver = Solver(ctx=context)
+        timeout_ms = rule.timeout_ms or self.rule_timeout_ms
+        if timeout_ms:
+            solver.set("timeout", timeout_ms)
+        solver.add(*(fact.translate(context) for fact in baseline_facts), proof.translate(context))
+        return solver
+
+    def _auth_facts(self, version, cfg):
+        # Unknown (None) settings stay unconstrained, so Z3 searches over both values.
+        return [self.auth_var_dict[version][var] == cfg[setting]
+                for setting, var in AUTH_VARIABLES.items() if cfg.get(setting) is not None]
+
+    def _port_facts(self, version, firewall):
+        if self.port_encoding == 'bitvec':
+            # A single equality fixes every port of this version at once.
+            return [self.port_vectors[version] == self.policy.port_mask(firewall)]
+        return [self.net_var_dict[version][p] == (p in firewall) for p in self.ports_to_model]
+
+    def _add_auth_facts(self, solver, version, cfg):
+        solver.add(*self._auth_facts(version, cfg))
+
+    def _add_port_facts(self, solver, version, firewall):
+        solver.add(*self._port_facts(version, firewall))
+
+    def check_candidate(self, config_v2, firewall_v2):
+        """
+        Checks one candidate against the loaded baseline.
+
+        Every rule is an independent query on its own solver, run concurrently
+        on the rule pool under the rule's timeout: sat means the candidate can
+        violate the rule, unsat that it cannot, and anything else (a timeout)
+        leaves the rule UNKNOWN. The per-rule verdicts are merged into one result.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        if self.solver is None:
+            raise Exception("No baseline loaded. Call load_baseline() before check_candidate().")
+
+        # Ports outside the modeled universe need fresh variables; this rebuilds once with them included.
+        self.load_baseline(*self.baseline, extra_ports=firewall_v2)
+
+        if self._rule_executor is None:
+            self._rule_executor = ThreadPoolExecutor(max_workers=self.rule_workers or len(self.rule_solvers),
+                                                     thread_name_prefix='fcdm-rule')
+        facts = self._auth_facts('v2', config_v2) + self._port_facts('v2', firewall_v2)
+        # Candidate facts are translated here, so the workers only ever touch their own contexts.
+        futures = [self._rule_executor.submit(self._check_rule, rule_solver,
+                                              [fact.translate(rule_solver.ctx) for fact in facts])
+                   for rule_solver in self.rule_solvers]
+        outcomes = [future.result() for future in futures]
+
+        self.last_engine = 'z3'
+        self.last_statistics = {rule.rule_id: statistics for rule, (_, _, statistics) in zip(self.policy.rules, outcomes)}
+        verdicts = [verdict for verdict, _, _ in outcomes]
+        unknown = {rule.rule_id: reason for rule, (verdict, reason, _) in zip(self.policy.rules, outcomes)
+                   if verdict is None}
+
+        violations = self.explain(verdicts, self.baseline[0], config_v2, firewall_v2)
+        for violation in violations:
+            violation['core'] = self._unsat_core(violation)
+        return self._format_result(verdicts, violations, unknown)
+
+    @staticmethod
+    def _check_rule(solver, facts):
+        """Returns (True / False / None for unknown, Z3's reason when unknown, statistics) of one rule query."""
+        from z3 import sat, unsat
+
+        solver.push()
+        try:
+            solver.add(*facts)
+            outcome = solver.check()
+            statistics = solver.statistics()
+            reason = solver.reason_unknown() if outcome not in (sat, unsat) else None
+        finally:
+            solver.pop()
+        verdict = None if reason is not None else outcome == sat
+        return verdict, reason, {key: statistics.get_key_value(key) for key in statistics.keys()}
+
+    def _port_open(self, version, port):
+        from z3 import Extract
+
+        if self.port_encoding == 'bitvec':
+            index = self.policy.port_index[port]
+            return Extract(index, index, self.port_vectors[version]) == 1
+        return self.net_var_dict[version][port]
+
+    def _unsat_core(self, violation):
+        """
+        Returns the smallest set of changed V2 facts found to entail a violation.
+
+        Only the settings and ports named by the violation are asserted (as
+        tracked facts) next to the negated rule, so the cost follows the size
+        of the drift. Returns None when the violation rests on a setting left
+        unknown (None) in either version, or when the query times out.
+        """
+        from z3 import Not, unsat
+
+        index = [rule.rule_id for rule in self.policy.rules].index(violation['rule'])
+        facts = [(f"v2.{setting}", self.auth_var_dict['v2'][AUTH_VARIABLES[setting]])
+                 for setting, values in violation['settings'].items() if values['v2'] is True]
+        facts += [(f"v2.port.{p}", self._port_open('v2', p)) for p in violation['ports']]
+
+        solver = self.solver
+        solver.push()
+        try:
+            solver.add(Not(self.drift_proofs[index]))
+            for label, fact in facts:
+                solver.assert_and_track(fact, label)
+            if solver.check() != unsat:
+                return None
+            core = {str(label) for label in solver.unsat_core()}
+        finally:
+            solver.pop()
+        return [label for label, _ in facts if label in core]
+
+    def explain(self, verdicts, config_v1, config_v2, firewall_v2):
+        """
+        Lists what changed for every violated rule.
+
+        A violated rule was satisfied by V1, so every one of its settings that
+        is enabled (or unknown, None) in V2 and every one of its ports that V2
+        opens changed between the versions. `core` is a minimal subset of those
+        facts that already entails the violation; rules are disjunctions, so on
+        ground inputs any single changed fact is one.
+        """
+        violations = []
+        for rule, violated in zip(self.policy.rules, verdicts):
+            if not violated:
+                continue
+            settings = {setting: {'v1': config_v1.get(setting), 'v2': config_v2.get(setting)}
+                        for setting in rule.settings if config_v2.get(setting) is not False}
+            ports = sorted(rule.ports & set(firewall_v2), key=port_sort_key)
+            facts = [f"v2.{s}" for s, values in settings.items() if values['v2'] is True]
+            facts += [f"v2.port.{p}" for p in ports]
+            violations.append({'rule': rule.rule_id, 'kind': rule.kind, 'message': rule.message,
+                               'settings': settings, 'ports': ports, 'core': facts[:1] or None})
+        return violations
+
+    def _violating_ports(self, violations):
+        return {violation['rule']: violation['ports'] for violation in violations if violation['kind'] == 'ports'}
+
+    @staticmethod
+    def is_ground(*configs):
+        """Returns True when every auth setting is a concrete boolean."""
+        return all(isinstance(cfg[setting], bool)
+                   for cfg in configs
+                   for setting in AUTH_VARIABLES)
+
+    def evaluate_drift(self, config_v1, config_v2, firewall_v1, firewall_v2):
+        """
+        Decides the policy rules directly for ground configurations.
+
+        Produces the same verdicts, changed facts and result text as the Z3 path.
+        """
+        self.last_engine = 'fast_path'
+        self.last_statistics = {}
+
+        verdicts = self.policy.evaluate(config_v1, config_v2, firewall_v1, firewall_v2)
+        if not any(verdicts):
+            return self._format_result(verdicts)
+        return self._format_result(verdicts, self.explain(verdicts, config_v1, config_v2, firewall_v2))
+
+    def check_security_drift(self, config_v1, config_v2, firewall_v1, firewall_v2, changes=None):
+        """
+        Checks V2 against V1. `changes` is an optional fcdm_diff.ChangeSet of the
+        two config trees, marked with mark_policy_inputs(): when none of its
+        changes touches a policy input, V2 normalizes exactly like V1 and passes
+        without evaluating the rules. The changes are added to the report.
+        """
+        if changes is not None and not any(change.policy_input for change in changes):
+            self.last_engine = 'tree_diff'
+            self.last_statistics = {}
+            result = self._format_result([False] * len(self.policy.rules))
+        elif self.fast_path and self.is_ground(config_v1, config_v2):
+            result = self.evaluate_drift(config_v1, config_v2, firewall_v1, firewall_v2)
         else:
-            security_drift_proof_3 = BoolVal(False)
-            overall_drift_proof = Or(security_drift_proof, security_drift_proof_2)
+            self.load_baseline(config_v1, firewall_v1, extra_ports=firewall_v2)
+            result = self.check_candidate(config_v2, firewall_v2)
+
+        if changes is not None:
+            self.last_explanation['tree_changes'] = changes.to_dicts()
+        return result
 
-        solver.add(overall_drift_proof)
+    def _format_result(self, verdicts, violations=(), unknown=None):
+        """
+        Merges the per-rule verdicts (None for undecided rules): DRIFT when a
+        rule is violated, else UNKNOWN when a rule is undecided, else PASS.
+        """
+        unknown = unknown or {}
+        self.last_violated = [rule.rule_id for rule, violated in zip(self.policy.rules, verdicts) if violated]
+        self.last_violations = self._violating_ports(violations)
+        self.last_unknown = unknown
+        verdict = 'DRIFT' if any(verdicts) else 'UNKNOWN' if unknown else 'PASS'
+        self.last_explanation = {
+            'verdict': verdict,
+            'engine': self.last_engine,
+            'policy': self.policy.version,
+            'violations': list(violations),
+        }
+        if unknown:
+            self.last_explanation['unknown'] = [{'rule': rule, 'reason': reason} for rule, reason in unknown.items()]
+        undecided = ", ".join(f"{rule} ({reason})" for rule, reason in unknown.items())
+
+        if verdict == 'PASS':
+            return "PASS: Configuration holds the security policy."
+        if verdict == 'UNKNOWN':
+            return f"UNKNOWN: No rule is violated, but Z3 could not decide: {undecided}."
 
         result = []
-        if solver.check() == sat:
-            result.append("CRITICAL DRIFT DETECTED: ")
-
-            model = solver.model()
-            result.append(f"Proof of Conflict: {model}")
-
-            reasons = []
-            if is_true(model.eval(security_drift_proof, model_completion = True)):
-                reasons.append("\nAuth Policy Violation: Root login/Password Auth enabled.")
-            if is_true(model.eval(security_drift_proof_2, model_completion = True)):
-                reasons.append("\nNetwork Policy Violation: Critical Port 22, 23, or 80 are opened.")
-            if is_true(model.eval(security_drift_proof_3, model_completion = True)):
-                reasons.append(f"\nService Hardening Violation: Debug Port {service_port} (Telnet) was re-enabled.")
-            
-
-            if reasons:
-                result.append(f"Reason: V1 was secure, but V2 regressed: {' '.join(reasons)}")
-            else:
-                result.append("Reason: Unknown complex policy violation.")
-        else:
-            result.append("PASS: Configuration holds the security policy.")
-        
-        return "\n".join(result)
\ No newline at end of file
+        result.append("CRITICAL DRIFT DETECTED: ")
+        result.append(f"Proof of Conflict: {self._format_proof(violations)}")
+
+        reasons = [f"\n{violation['message']}" for violation in violations]
+
+        result.append(f"Reason: V1 was secure, but V2 regressed: {' '.join(reasons)}")
+        if unknown:
+            result.append(f"Undecided rules: {undecided}")
+        return "\n".join(result)
+
+    @staticmethod
+    def _format_proof(violations):
+        """Prints only the changed settings and the newly opened ports, e.g. [root_login_allowed: False -> True, opened ports: {23}]."""
+        settings, ports = {}, {}
+        for violation in violations:
+            settings.update(violation['settings'])
+            ports.update(dict.fromkeys(violation['ports']))
+
+        describe = lambda value: 'unknown' if value is None else value
+        changes = [f"{setting}: {describe(values['v1'])} -> {describe(values['v2'])}" for setting, values in settings.items()]
+        if ports:
+            changes.append("opened ports: {" + ", ".join(sorted(ports, key=port_sort_key)) + "}")
+        return "[" + ", ".join(changes) + "]"
@@ -0,0 +1,402 @@
+import abc
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+
+def content_key(path):
+    """
+    Content of one side of a job: the SHA-256 of an image file, or the Merkle
+    root of an extracted directory's whole etc/config tree. Both are only
+    recomputed when a file's size or mtime changed.
+    """
+    from .fcdm_extraction_store import ExtractionStore
+    from .fcdm_extractor import find_root
+    from .fcdm_fingerprint import config_tree_fingerprint
+
+    try:
+        if os.path.isfile(path):
+            return f"image:{ExtractionStore.image_digest(path)}"
+        root = find_root(path) if os.path.isdir(path) else None
+        if root is not None:
+            return f"tree:{config_tree_fingerprint(os.path.join(root, 'etc', 'config'))}"
+    except OSError:
+        pass
+    return "missing"
+
+
+def job_key(v1_path, v2_path):
+    """
+    Deterministic job ID of an image pair: the absolute paths with the content
+    of each (see content_key), so resubmitting an unchanged pair maps to the
+    same job and a pair whose configs were edited is queued again.
+    """
+    digest = hashlib.sha256()
+    for path in (v1_path, v2_path):
+        digest.update(f"{os.path.abspath(path)}\0{content_key(path)}\0".encode())
+    return digest.hexdigest()[:32]
+
+
+class JobBroker(abc.ABC):
+    """
+    Interface of the audit job queue.
+
+    A job is a (V1, V2) image pair. Workers claim() a job under a lease,
+    extend it with heartbeat() while the audit runs, and end it with
+    complete() or fail(); both only apply while the caller still holds the
+    lease, so a worker whose lease expired and was re-claimed cannot
+    overwrite the new holder's result. Jobs whose lease expires are handed
+    out again. Other brokers (a shared database, a message queue) implement
+    the same methods.
+    """
+
+    @abc.abstractmethod
+    def submit(self, v1_path, v2_path, max_attempts=3):
+        """Queues a pair and returns its job ID; a pair already queued or done is not queued twice."""
+
+    @abc.abstractmethod
+    def claim(self, worker, lease_seconds):
+        """Leases the next runnable job to `worker` and returns it as a dict, or None."""
+
+    @abc.abstractmethod
+    def heartbeat(self, job_id, token, lease_seconds):
+        """Extends a lease. Returns False when the lease was lost."""
+
+    @abc.abstractmethod
+    def complete(self, job_id, token, result):
+        """Stores the result of a leased job. Returns False when the lease was lost."""
+
+    @abc.abstractmethod
+    def fail(self, job_id, token, error):
+        """Requeues a leased job with backoff, or fails it for good. Returns the new status, or None."""
+
+    @abc.abstractmethod
+    def get(self, job_id):
+        """Returns the job as a dict, or None."""
+
+    @abc.abstractmethod
+    def jobs(self, status=None):
+        """Returns all jobs (optionally only those in `status`) as dicts."""
+
+    @abc.abstractmethod
+    def stats(self):
+        """Returns {status: job count}."""
+
+
+class SQLiteBroker(JobBroker):
+    """
+    Job queue in a single SQLite database (WAL mode), shared by the worker
+    processes of one machine. Claims run in BEGIN IMMEDIATE transactions, so
+    two workers never lease the same job.
+    """
+
+    STATUSES = ('queued', 'leased', 'done', 'failed')
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            v1 TEXT NOT NULL,
+            v2 TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL,
+            lease_owner TEXT,
+            lease_token TEXT,
+            lease_expires REAL,
+            not_before REAL NOT NULL,
+            created REAL NOT NULL,
+            updated REAL NOT NULL,
+            error TEXT,
+            result TEXT
+        );
+        CREATE INDEX IF NOT EXISTS jobs_runnable ON jobs (status, not_before);
+    """
+
+    def __init__(self, path, retry_delay=1.0):
+        self.path = path
+        # Failed attempts wait retry_delay * 2 ** (attempts - 1) seconds before they run again.
+        self.retry_delay = retry_delay
+        self.lock = threading.Lock()
+        # Autocommit mode; transactions are opened explicitly where a read decides a write.
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    @staticmethod
+    def _job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def submit(self, v1_path, v2_path, max_attempts=3):
+        job_id = job_key(v1_path, v2_path)
+        now = time.time()
+        with self._transaction() as db:
+            db.execute("INSERT OR IGNORE INTO jobs (id, v1, v2, status, max_attempts, not_before, created, updated) "
+                       "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+                       (job_id, os.path.abspath(v1_path), os.path.abspath(v2_path), max_attempts, now, now, now))
+        return job_id
+
+    def claim(self, worker, lease_seconds):
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._transaction() as db:
+            # A worker that died on its last attempt leaves an expired lease behind.
+            db.execute("UPDATE jobs SET status = 'failed', error = 'lease expired', lease_token = NULL, updated = ? "
+                       "WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts", (now, now))
+            row = db.execute("SELECT id FROM jobs WHERE (status = 'queued' AND not_before <= ?) "
+                             "OR (status = 'leased' AND lease_expires < ?) ORDER BY created, id LIMIT 1",
+                             (now, now)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?, lease_token = ?, "
+                       "lease_expires = ?, updated = ? WHERE id = ?",
+                       (worker, token, now + lease_seconds, now, row['id']))
+            return self._job(db.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone())
+
+    def heartbeat(self, job_id, token, lease_seconds):
+        now = time.time()
+        with self.lock:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET lease_expires = ?, updated = ? WHERE id = ? AND status = 'leased' AND lease_token = ?",
+                (now + lease_seconds, now, job_id, token))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, token, result):
+        now = time.time()
+        with self.lock:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_token = NULL, updated = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_token = ?",
+                (json.dumps(result), now, job_id, token))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, token, error):
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = 'leased' "
+                             "AND lease_token = ?", (job_id, token)).fetchone()
+            if row is None:
+                return None
+            if row['attempts'] >= row['max_attempts']:
+                status, not_before = 'failed', now
+            else:
+                status, not_before = 'queued', now + self.retry_delay * 2 ** (row['attempts'] - 1)
+            db.execute("UPDATE jobs SET status = ?, error = ?, not_before = ?, lease_token = NULL, updated = ? "
+                       "WHERE id = ?", (status, str(error), not_before, now, job_id))
+        return status
+
+    def get(self, job_id):
+        with self.lock:
+            return self._job(self.connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def jobs(self, status=None):
+        with self.lock:
+            if status is None:
+                rows = self.connection.execute("SELECT * FROM jobs ORDER BY created, id").fetchall()
+            else:
+                rows = self.connection.execute("SELECT * FROM jobs WHERE status = ? ORDER BY created, id",
+                                               (status,)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def stats(self):
+        with self.lock:
+            counts = dict(self.connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in self.STATUSES}
+
+
+def open_broker(queue_dir):
+    """Opens (creating if needed) the queue of a queue directory."""
+    os.makedirs(queue_dir, exist_ok=True)
+    return SQLiteBroker(os.path.join(queue_dir, 'queue.sqlite3'))
+
+
+class QueueWorker:
+    """
+    Runs leased jobs through one warm FCDMController.
+
+    While an audit runs, a heartbeat thread extends the lease every third of
+    its length; a worker that dies stops renewing it and the job is claimed
+    again once it expires. Aborted audits and exceptions count as failed
+    attempts and are retried by the broker.
+    """
+
+    def __init__(self, broker, controller, worker_id=None, lease_seconds=60.0, poll_interval=0.5):
+        self.broker = broker
+        self.controller = controller
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.processed = 0
+
+    def _heartbeat(self, job, done):
+        while not done.wait(self.lease_seconds / 3):
+            if not self.broker.heartbeat(job['id'], job['lease_token'], self.lease_seconds):
+                return
+
+    def run_once(self):
+        """Claims and audits one job. Returns the finished job's status, or None when nothing was runnable."""
+        job = self.broker.claim(self.worker_id, self.lease_seconds)
+        if job is None:
+            return None
+
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, done), daemon=True)
+        heartbeat.start()
+        started = time.perf_counter()
+        try:
+            # The controller's console output would interleave across workers; it is kept in the log.
+            with contextlib.redirect_stdout(io.StringIO()):
+                # The job ID makes the result store keep one row per job across retried attempts.
+                self.controller.run_auth_integrity_audit(job['v1'], job['v2'], job_id=job['id'])
+            metrics = self.controller.last_metrics
+            if metrics.verdict not in ('PASS', 'DRIFT', 'UNKNOWN'):
+                raise ValueError(f"Analysis {metrics.verdict.lower()} (run {metrics.run_id}).")
+            result = {'verdict': metrics.verdict, 'run_id': metrics.run_id, 'worker': self.worker_id,
+                      'attempt': job['attempts'], 'elapsed_s': round(time.perf_counter() - started, 6),
+                      'explanation': self.controller.last_explanation}
+        except Exception as e:
+            status = self.broker.fail(job['id'], job['lease_token'], e)
+        else:
+            status = 'done' if self.broker.complete(job['id'], job['lease_token'], result) else None
+        finally:
+            done.set()
+            heartbeat.join()
+
+        self.processed += 1
+        print(f"[queue] {self.worker_id} job {job['id'][:12]} attempt {job['attempts']}: "
+              f"{status or 'lease lost'}", flush=True)
+        return status or 'lost'
+
+    def run(self, exit_when_idle=False, max_jobs=None, stopping=None):
+        """Processes jobs until `stopping` is set, `max_jobs` were run, or (with exit_when_idle) the queue drains."""
+        while stopping is None or not stopping.is_set():
+            if max_jobs is not None and self.processed >= max_jobs:
+                return
+            if self.run_once() is not None:
+                continue
+            if exit_when_idle:
+                counts = self.broker.stats()
+                if not counts['queued'] and not counts['leased']:
+                    return
+            time.sleep(self.poll_interval)
+
+
+def _work_process(queue_dir, worker_index, options):
+    from .fcdm_controller import make_controller
+
+    broker = open_broker(queue_dir)
+    controller = make_controller(use_cache=options['use_cache'], backend=options['backend'],
+                                 log_file_path=options.get('log_file_path'), results_path=options.get('results_path'))
+    worker = QueueWorker(broker, controller, worker_id=f"{socket.gethostname()}:{os.getpid()}:{worker_index}",
+                         lease_seconds=options['lease_seconds'], poll_interval=options['poll_interval'])
+    try:
+        worker.run(exit_when_idle=options['exit_when_idle'], max_jobs=options.get('max_jobs'))
+    finally:
+        controller.close()
+        broker.close()
+
+
+def run_workers(queue_dir, workers=1, use_cache=True, backend='auto', lease_seconds=60.0, poll_interval=0.5,
+                exit_when_idle=False, max_jobs=None, log_file_path=None, results_path=None):
+    """Starts `workers` local worker processes on a queue directory and waits for them."""
+    options = {'use_cache': use_cache, 'backend': backend, 'lease_seconds': lease_seconds,
+               'poll_interval': poll_interval, 'exit_when_idle': exit_when_idle, 'max_jobs': max_jobs,
+               'log_file_path': log_file_path, 'results_path': results_path}
+    # Workers are spawned so none inherits a Z3 context or SQLite connection from the parent.
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=_work_process, args=(queue_dir, index, options), name=f"fcdm-queue-{index}")
+                 for index in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        raise
+    return [process.exitcode for process in processes]
+
+
+def queue_main(argv):
+    """Entry point of `python -m fcdm queue`."""
+    parser = argparse.ArgumentParser(prog='fcdm queue', description='Run audits through a shared job queue directory.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    submit = commands.add_parser('submit', help='queue every candidate against a baseline')
+    submit.add_argument('queue_dir')
+    submit.add_argument('baseline', help='baseline (V1) firmware image or extracted image directory')
+    submit.add_argument('candidates', nargs='+', help='candidate (V2) images or directories')
+    submit.add_argument('--max-attempts', type=int, default=3, help='attempts before a job fails (default: 3)')
+
+    work = commands.add_parser('work', help='run local worker processes')
+    work.add_argument('queue_dir')
+    work.add_argument('-j', '--workers', type=int, default=1, help='number of worker processes (default: 1)')
+    work.add_argument('--lease', type=float, default=60.0, help='lease length in seconds (default: 60)')
+    work.add_argument('--poll-interval', type=float, default=0.5, help='idle polling interval in seconds')
+    work.add_argument('--exit-when-idle', action='store_true', help='stop once no job is queued or leased')
+    work.add_argument('--no-cache', action='store_true', help='do not use the extraction store, parse cache and verdict index')
+    work.add_argument('--extractor', choices=('auto', 'squashfs', 'binwalk'), default='auto')
+
+    status = commands.add_parser('status', help='show job counts')
+    status.add_argument('queue_dir')
+
+    results = commands.add_parser('results', help='print the finished jobs as JSON lines')
+    results.add_argument('queue_dir')
+    results.add_argument('--status', choices=SQLiteBroker.STATUSES, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == 'work':
+        exit_codes = run_workers(args.queue_dir, args.workers, use_cache=not args.no_cache, backend=args.extractor,
+                                 lease_seconds=args.lease, poll_interval=args.poll_interval,
+                                 exit_when_idle=args.exit_when_idle)
+        return 0 if not any(exit_codes) else 1
+
+    broker = open_broker(args.queue_dir)
+    try:
+        if args.command == 'submit':
+            missing = [path for path in [args.baseline] + args.candidates if not os.path.exists(path)]
+            if missing:
+                print(f"\nERROR: No such firmware image or directory: {', '.join(missing)}", file=sys.stderr)
+                return 1
+            for candidate in args.candidates:
+                print(f"{broker.submit(args.baseline, candidate, args.max_attempts)} {candidate}")
+        elif args.command == 'status':
+            print(json.dumps(broker.stats()))
+        else:
+            for job in broker.jobs(args.status):
+                if job['status'] in ('done', 'failed'):
+                    print(json.dumps({key: job[key] for key in ('id', 'v1', 'v2', 'status', 'attempts',
+                                                                'error', 'result')}))
+    finally:
+        broker.close()
+    return 0
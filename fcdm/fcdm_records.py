@@ -0,0 +1,123 @@
+import sys
+from collections.abc import Mapping, Set
+
+
+class DropbearSettings(Mapping):
+    """
+    Normalized dropbear auth settings of one image, as a frozen record.
+
+    Reads like the settings dict it replaces (`settings['root_login_allowed']`,
+    `.get()`, iteration, `==` against a dict) but keeps two slots instead of
+    a dict per parsed image. A setting is True, False or None (unknown).
+    """
+    __slots__ = ('root_login_allowed', 'password_auth_enabled')
+    SETTINGS = __slots__
+
+    def __init__(self, root_login_allowed=False, password_auth_enabled=False):
+        object.__setattr__(self, 'root_login_allowed', root_login_allowed)
+        object.__setattr__(self, 'password_auth_enabled', password_auth_enabled)
+
+    @classmethod
+    def from_dict(cls, settings):
+        return cls(settings.get('root_login_allowed', False), settings.get('password_auth_enabled', False))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __getitem__(self, key):
+        if key not in self.SETTINGS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.SETTINGS)
+
+    def __len__(self):
+        return len(self.SETTINGS)
+
+    def __hash__(self):
+        return hash((self.root_login_allowed, self.password_auth_enabled))
+
+    def __reduce__(self):
+        return (type(self), (self.root_login_allowed, self.password_auth_enabled))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.root_login_allowed!r}, {self.password_auth_enabled!r})"
+
+
+class PortUniverse:
+    """
+    The ports a policy can report, each with a fixed bit position (its index in `ports`).
+
+    Shared by every PortSet of a policy, so a parsed image keeps one int
+    mask instead of a set of port strings. The port names are interned
+    once here.
+    """
+
+    def __init__(self, ports):
+        self.ports = tuple(sys.intern(str(p)) for p in ports)
+        self.bits = {p: 1 << i for i, p in enumerate(self.ports)}
+
+    def port_set(self, ports):
+        """Returns the PortSet of the universe ports among `ports`; other ports are ignored."""
+        mask = 0
+        for p in ports:
+            mask |= self.bits.get(p, 0)
+        return PortSet(mask, self)
+
+
+class PortSet(Set):
+    """
+    An immutable set of port strings stored as a bit mask over a PortUniverse.
+
+    Behaves like a frozenset of port strings for membership, iteration,
+    `&`/`|`, isdisjoint() and `==` against plain sets.
+    """
+    __slots__ = ('mask', 'universe')
+
+    def __init__(self, mask, universe):
+        object.__setattr__(self, 'mask', mask)
+        object.__setattr__(self, 'universe', universe)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        # Set operators with ports outside the universe fall back to a plain frozenset.
+        return frozenset(iterable)
+
+    def __contains__(self, port):
+        return bool(self.mask & self.universe.bits.get(port, 0))
+
+    def __iter__(self):
+        mask = self.mask
+        for i, port in enumerate(self.universe.ports):
+            if mask >> i & 1:
+                yield port
+
+    def __len__(self):
+        return self.mask.bit_count()
+
+    def __and__(self, other):
+        if isinstance(other, PortSet) and other.universe is self.universe:
+            return PortSet(self.mask & other.mask, self.universe)
+        return Set.__and__(self, other)
+
+    def __or__(self, other):
+        if isinstance(other, PortSet) and other.universe is self.universe:
+            return PortSet(self.mask | other.mask, self.universe)
+        return Set.__or__(self, other)
+
+    def __eq__(self, other):
+        if isinstance(other, PortSet) and other.universe is self.universe:
+            return self.mask == other.mask
+        return Set.__eq__(self, other)
+
+    __hash__ = Set._hash
+
+    def __reduce__(self):
+        return (type(self), (self.mask, self.universe))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({set(self)!r})"
@@ -0,0 +1,313 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from .fcdm_policy import port_sort_key
+
+
+def device_model(root):
+    """
+    Returns the device model of an extracted tree from etc/device_info
+    (DEVICE_MANUFACTURER DEVICE_PRODUCT), falling back to the target in
+    etc/openwrt_release, or None when the tree carries neither.
+    """
+    for name, keys in (('device_info', ('DEVICE_MANUFACTURER', 'DEVICE_PRODUCT')),
+                       ('openwrt_release', ('DISTRIB_TARGET',))):
+        try:
+            with open(os.path.join(root, 'etc', name), 'r', errors='replace') as f:
+                lines = f.read(64 * 1024).splitlines()
+        except OSError:
+            continue
+        values = {}
+        for line in lines:
+            key, _, value = line.partition('=')
+            values[key.strip()] = value.strip().strip('\'"')
+        model = " ".join(values[key] for key in keys if values.get(key))
+        if values.get(keys[-1]) and model:
+            return model
+    return None
+
+
+def parse_time(text, now=None):
+    """Parses YYYY-MM-DD[ HH:MM[:SS]] (local time) or a relative age such as 90d, 12h or 30m into epoch seconds."""
+    match = re.fullmatch(r'(\d+)([dhm])', text.strip())
+    if match:
+        seconds = int(match.group(1)) * {'d': 86400, 'h': 3600, 'm': 60}[match.group(2)]
+        return (time.time() if now is None else now) - seconds
+    for pattern in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(text.strip(), pattern))
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized time {text!r}; use YYYY-MM-DD[ HH:MM[:SS]] or an age like 90d.")
+
+
+class ResultStore:
+    """
+    Persistent SQLite store of audit results.
+
+    Every audit is one row of `audits` (run ID, time, both images with their
+    config fingerprints and, for image files, their SHA-256, the candidate's
+    device model, verdict and engine). Builds are told apart by the image
+    SHA-256: builds that only differ outside the policy files share a config
+    fingerprint.
+    What a drift consisted of is kept as distinct `facts` of the audit: each
+    violated rule, regressed setting and opened port once. Facts repeat the
+    audit time, so "which builds opened port 23 last quarter" walks one
+    index range newest first instead of grepping the logs.
+    Audits run for a queue job carry its job ID and are kept once per job:
+    a retried attempt replaces the row of the previous one.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS audits (
+            id INTEGER PRIMARY KEY,
+            run_id TEXT,
+            ts REAL NOT NULL,
+            v1_path TEXT,
+            v2_path TEXT,
+            v1_hash TEXT,
+            v2_hash TEXT,
+            v1_image TEXT,
+            v2_image TEXT,
+            device_model TEXT,
+            verdict TEXT NOT NULL,
+            engine TEXT,
+            policy TEXT,
+            job_id TEXT
+        );
+        CREATE TABLE IF NOT EXISTS facts (
+            audit_id INTEGER NOT NULL REFERENCES audits (id),
+            ts REAL NOT NULL,
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (kind, value, ts, audit_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS audits_ts ON audits (ts);
+        CREATE INDEX IF NOT EXISTS audits_v2_hash ON audits (v2_hash, ts);
+        CREATE INDEX IF NOT EXISTS audits_v2_image ON audits (v2_image, ts);
+        CREATE INDEX IF NOT EXISTS audits_model ON audits (device_model, ts);
+        CREATE INDEX IF NOT EXISTS facts_audit ON facts (audit_id);
+        CREATE UNIQUE INDEX IF NOT EXISTS audits_job ON audits (job_id);
+    """
+
+    COLUMNS = ('id', 'run_id', 'ts', 'v1_path', 'v2_path', 'v1_hash', 'v2_hash', 'v1_image', 'v2_image',
+               'device_model', 'verdict', 'engine', 'policy', 'job_id')
+    FACT_KINDS = ('rule', 'setting', 'port')
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def record(self, audit):
+        """Stores one audit and returns its ID. See record_many() for the fields."""
+        return self.record_many([audit])[0]
+
+    @staticmethod
+    def _facts(violations):
+        facts = {}
+        for violation in violations or ():
+            facts[('rule', violation['rule'])] = None
+            facts.update(dict.fromkeys(('setting', setting) for setting in violation['settings']))
+            facts.update(dict.fromkeys(('port', port) for port in violation['ports']))
+        return facts
+
+    def record_many(self, audits):
+        """
+        Stores audits in one transaction and returns their IDs. Each audit is a
+        dict of the COLUMNS (ts defaults to now) plus `violations`, as listed
+        by PolicyVerifier.explain(). An audit with a job_id replaces the audit
+        stored for that job, if any.
+        """
+        ids = []
+        db = self.connection
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for audit in audits:
+                if audit.get('job_id') is not None:
+                    db.execute("DELETE FROM facts WHERE audit_id IN (SELECT id FROM audits WHERE job_id = ?)",
+                               (audit['job_id'],))
+                    db.execute("DELETE FROM audits WHERE job_id = ?", (audit['job_id'],))
+                row = [audit.get(column) for column in self.COLUMNS[1:]]
+                row[1] = ts = audit.get('ts') or time.time()
+                audit_id = db.execute(f"INSERT INTO audits ({', '.join(self.COLUMNS[1:])}) "
+                                      f"VALUES ({', '.join('?' * (len(self.COLUMNS) - 1))})", row).lastrowid
+                db.executemany("INSERT INTO facts (audit_id, ts, kind, value) VALUES (?, ?, ?, ?)",
+                               [(audit_id, ts, kind, value) for kind, value in self._facts(audit.get('violations'))])
+                ids.append(audit_id)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        return ids
+
+    def last_device_model(self, image_hash):
+        """Returns the device model last recorded for a candidate fingerprint, or None."""
+        row = self.connection.execute("SELECT device_model FROM audits WHERE v2_hash = ? AND device_model IS NOT NULL "
+                                      "ORDER BY ts DESC LIMIT 1", (image_hash,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _select(port=None, rule=None, setting=None, device_model=None, image_hash=None, config_hash=None,
+                verdict=None, since=None, until=None):
+        """
+        Returns (FROM ... WHERE clause, params, time column) for the filters.
+
+        With a fact filter, the first fact drives the query: its index range
+        is already in time order, so the newest matches come first without
+        sorting every match. Each fact occurs once per audit, so the join
+        yields no duplicates.
+        """
+        facts = [(kind, value) for kind, value in (('port', port), ('rule', rule), ('setting', setting))
+                 if value is not None]
+        clauses, params = [], []
+        if facts:
+            source, ts = "facts f JOIN audits a ON a.id = f.audit_id", "f.ts"
+            clauses.append("f.kind = ? AND f.value = ?")
+            params += facts[0]
+            for kind, value in facts[1:]:
+                clauses.append("EXISTS (SELECT 1 FROM facts WHERE kind = ? AND value = ? AND ts = a.ts "
+                               "AND audit_id = a.id)")
+                params += [kind, value]
+        else:
+            source, ts = "audits a", "a.ts"
+        if device_model is not None:
+            # GLOB patterns such as 'TP-Link*' still use the index when they start with a literal prefix.
+            clauses.append("a.device_model GLOB ?")
+            params.append(device_model)
+        if image_hash is not None:
+            clauses.append("a.v2_image GLOB ?")
+            params.append(image_hash + '*')
+        if config_hash is not None:
+            clauses.append("a.v2_hash GLOB ?")
+            params.append(config_hash + '*')
+        if verdict is not None:
+            clauses.append("a.verdict = ?")
+            params.append(verdict)
+        if since is not None:
+            clauses.append(f"{ts} >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append(f"{ts} < ?")
+            params.append(until)
+        return f"{source}{' WHERE ' + ' AND '.join(clauses) if clauses else ''}", params, ts
+
+    def query(self, limit=100, **filters):
+        """
+        Returns the newest matching audits (dicts with their violated `rules`
+        and opened `ports`). Filters: port, rule, setting, device_model (GLOB
+        pattern), image_hash (candidate image SHA-256 prefix), config_hash
+        (candidate config fingerprint prefix), verdict, and since/until
+        (epoch seconds).
+        """
+        source, params, ts = self._select(**filters)
+        rows = self.connection.execute(f"SELECT a.* FROM {source} ORDER BY {ts} DESC LIMIT ?",
+                                       params + [limit]).fetchall()
+        audits = [dict(row, rules=[], ports=[]) for row in rows]
+        by_id = {audit['id']: audit for audit in audits}
+        if by_id:
+            for audit_id, kind, value in self.connection.execute(
+                    f"SELECT audit_id, kind, value FROM facts WHERE audit_id IN ({', '.join('?' * len(by_id))}) "
+                    f"AND kind IN ('rule', 'port')", list(by_id)):
+                by_id[audit_id][kind + 's'].append(value)
+        for audit in audits:
+            audit['ports'].sort(key=port_sort_key)
+        return audits
+
+    def builds(self, limit=100, **filters):
+        """
+        Returns one row per matching candidate build (its image SHA-256, or the
+        config fingerprint of an extracted directory): the last path, model,
+        audit time and audit count.
+        """
+        source, params, ts = self._select(**filters)
+        rows = self.connection.execute(
+            f"SELECT a.v2_image, a.v2_hash, a.v2_path, a.device_model, max({ts}) AS ts, count(*) AS audits "
+            f"FROM {source} GROUP BY coalesce(a.v2_image, a.v2_hash) ORDER BY ts DESC LIMIT ?",
+            params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self, **filters):
+        source, params, _ = self._select(**filters)
+        return self.connection.execute(f"SELECT count(*) FROM {source}", params).fetchone()[0]
+
+
+def default_results_path():
+    return os.path.join(os.path.expanduser('~'), '.fcdm', 'results.sqlite3')
+
+
+def format_audit(audit):
+    when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(audit['ts']))
+    findings = ",".join(audit['rules']) + (f" ports={','.join(audit['ports'])}" if audit['ports'] else "")
+    return (f"{when}  {audit['verdict']:<7} {(audit['v2_image'] or audit['v2_hash'] or '-')[:12]:<12}  "
+            f"{audit['device_model'] or '-':<24} {audit['v2_path']}  {findings}")
+
+
+def results_main(argv):
+    """Entry point of `python -m fcdm results`."""
+    parser = argparse.ArgumentParser(prog='fcdm results', description='Query the stored audit results.')
+    parser.add_argument('--db', default=default_results_path(), help='result store (default: ~/.fcdm/results.sqlite3)')
+    parser.add_argument('--port', default=None, help='audits whose candidate opened this port')
+    parser.add_argument('--rule', default=None, help='audits that violated this policy rule')
+    parser.add_argument('--setting', default=None, help='audits in which this auth setting regressed')
+    parser.add_argument('--model', default=None, help='candidate device model (GLOB pattern, e.g. "TP-Link*")')
+    parser.add_argument('--hash', default=None, help='candidate image SHA-256 prefix')
+    parser.add_argument('--config-hash', default=None, help='candidate config fingerprint prefix')
+    parser.add_argument('--verdict', choices=('PASS', 'DRIFT', 'UNKNOWN', 'ABORTED'), default=None)
+    parser.add_argument('--since', default=None, help='YYYY-MM-DD[ HH:MM[:SS]] or an age such as 90d')
+    parser.add_argument('--until', default=None, help='YYYY-MM-DD[ HH:MM[:SS]] or an age such as 30d')
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--builds', action='store_true', help='one row per candidate build instead of per audit')
+    parser.add_argument('--count', action='store_true', help='only print the number of matching audits')
+    parser.add_argument('--json', action='store_true', help='print JSON lines')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"[INFO] No result store at {args.db}.")
+        return 0
+    try:
+        filters = {'port': args.port, 'rule': args.rule, 'setting': args.setting, 'device_model': args.model,
+                   'image_hash': args.hash, 'config_hash': args.config_hash, 'verdict': args.verdict,
+                   'since': parse_time(args.since) if args.since else None,
+                   'until': parse_time(args.until) if args.until else None}
+    except ValueError as e:
+        print(f"\nERROR: {e}", file=sys.stderr)
+        return 1
+
+    store = ResultStore(args.db)
+    try:
+        started = time.perf_counter()
+        if args.count:
+            print(store.count(**filters))
+            rows = None
+        elif args.builds:
+            rows = store.builds(args.limit, **filters)
+        else:
+            rows = store.query(args.limit, **filters)
+        elapsed = time.perf_counter() - started
+
+        for row in rows or ():
+            if args.json:
+                print(json.dumps(row))
+            elif args.builds:
+                when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row['ts']))
+                print(f"{when}  {(row['v2_image'] or row['v2_hash'] or '-')[:12]:<12}  {row['device_model'] or '-':<24} "
+                      f"{row['audits']:>6}  {row['v2_path']}")
+            else:
+                print(format_audit(row))
+        if not args.json:
+            print(f"[INFO] Query answered in {elapsed * 1000:.1f} ms.", file=sys.stderr)
+    finally:
+        store.close()
+    return 0
@@ -0,0 +1,300 @@
+import lzma
+import mmap
+import struct
+import zlib
+from collections import namedtuple
+
+
+SQUASHFS_MAGIC = b'hsqs'
+SUPERBLOCK = struct.Struct('<IIIIIHHHHHHQQQQQQQQ')
+METADATA_SIZE = 8192
+NO_FRAGMENT = 0xFFFFFFFF
+UNCOMPRESSED_BLOCK = 1 << 24
+MAX_SYMLINK_HOPS = 8
+
+# What the struct, zlib and lzma decoders raise on garbage input; zstd errors are converted where they occur.
+DECODE_ERRORS = (struct.error, zlib.error, lzma.LZMAError, EOFError, IndexError, ValueError, OverflowError,
+                 MemoryError)
+
+Inode = namedtuple('Inode', 'kind size start offset fragment fragment_offset block_sizes target')
+
+
+class SquashFSError(Exception):
+    """Raised when an image has no readable SquashFS 4.0 filesystem."""
+
+
+def _decompressor(compression_id, block_size):
+    if compression_id == 1:
+        return zlib.decompress
+    if compression_id == 2:
+        return lambda data: lzma.decompress(data, format=lzma.FORMAT_ALONE)
+    if compression_id == 4:
+        return lambda data: lzma.decompress(data, format=lzma.FORMAT_XZ)
+    if compression_id == 6:
+        try:
+            import zstandard
+        except ImportError:
+            raise SquashFSError("zstd-compressed SquashFS needs the 'zstandard' package.")
+        decompressor = zstandard.ZstdDecompressor()
+
+        def decompress(data):
+            try:
+                return decompressor.decompress(data, max_output_size=block_size)
+            except zstandard.ZstdError as e:
+                raise SquashFSError(f"Corrupted zstd block: {e}")
+        return decompress
+    raise SquashFSError(f"Unsupported SquashFS compression id {compression_id}.")
+
+
+def find_superblock(data, start=0):
+    """Returns the offset of the first valid SquashFS 4.0 superblock in `data`, or None."""
+    position = data.find(SQUASHFS_MAGIC, start)
+    while position != -1:
+        if position + SUPERBLOCK.size <= len(data):
+            fields = SUPERBLOCK.unpack_from(data, position)
+            block_size, block_log, major = fields[3], fields[6], fields[9]
+            bytes_used, inode_table_start = fields[12], fields[15]
+            if (major == 4 and 12 <= block_log <= 20 and block_size == 1 << block_log
+                    and inode_table_start < bytes_used <= len(data) - position):
+                return position
+        position = data.find(SQUASHFS_MAGIC, position + 1)
+    return None
+
+
+class _MetadataReader:
+    """Sequential reader over consecutive metadata blocks."""
+
+    def __init__(self, image, position, offset):
+        self.image = image
+        data, self.next_block = image._metadata_block(position)
+        self.buffer = data[offset:]
+
+    def read(self, length):
+        while len(self.buffer) < length:
+            data, self.next_block = self.image._metadata_block(self.next_block)
+            self.buffer += data
+        chunk, self.buffer = self.buffer[:length], self.buffer[length:]
+        return chunk
+
+
+class SquashFSImage:
+    """
+    Reads individual files out of the SquashFS filesystem embedded in a firmware image.
+
+    The image is memory-mapped and only the metadata blocks, data blocks and
+    fragments of the requested paths are decompressed; nothing is unpacked to disk.
+    """
+
+    def __init__(self, image_path, offset=None):
+        self._file = open(image_path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise SquashFSError(f"Firmware image {image_path} is empty.")
+
+        self.offset = find_superblock(self._map) if offset is None else offset
+        if self.offset is None:
+            self.close()
+            raise SquashFSError(f"No SquashFS 4.0 superblock found in {image_path}.")
+
+        (_, self.inode_count, _, self.block_size, _, compression_id, _, self.flags, _, _, _,
+         self.root_inode_ref, self.bytes_used, _, _, self.inode_table_start,
+         self.directory_table_start, self.fragment_table_start, _) = SUPERBLOCK.unpack_from(self._map, self.offset)
+
+        try:
+            self._decompress = _decompressor(compression_id, self.block_size)
+        except SquashFSError:
+            self.close()
+            raise
+
+        self._metadata_cache = {}
+        self._fragment_cache = {}
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _check_range(self, position, length):
+        """Returns the absolute offset of `length` bytes at filesystem `position`, if they lie in the image."""
+        start = self.offset + position
+        if position < 0 or length < 0 or start + length > len(self._map):
+            raise SquashFSError(f"SquashFS offset {position} (+{length} bytes) lies outside the image.")
+        return start
+
+    def _metadata_block(self, position):
+        """Returns (uncompressed data, position of the next block) for the block at `position`."""
+        cached = self._metadata_cache.get(position)
+        if cached is not None:
+            return cached
+
+        start = self._check_range(position, 2)
+        header, = struct.unpack_from('<H', self._map, start)
+        size = header & 0x7FFF
+        raw = self._map[start + 2:self._check_range(position + 2, size) + size]
+        data = raw if header & 0x8000 else self._decompress(raw)
+
+        self._metadata_cache[position] = (data, position + 2 + size)
+        return self._metadata_cache[position]
+
+    def _inode(self, ref):
+        reader = _MetadataReader(self, self.inode_table_start + (ref >> 16), ref & 0xFFFF)
+        inode_type = struct.unpack('<HHHHII', reader.read(16))[0]
+
+        if inode_type == 1:
+            start, _, size, offset, _ = struct.unpack('<IIHHI', reader.read(16))
+            return Inode('dir', size, start, offset, None, None, None, None)
+        if inode_type == 8:
+            _, size, start, _, _, offset, _ = struct.unpack('<IIIIHHI', reader.read(24))
+            return Inode('dir', size, start, offset, None, None, None, None)
+
+        if inode_type in (2, 9):
+            if inode_type == 2:
+                start, fragment, fragment_offset, size = struct.unpack('<IIII', reader.read(16))
+            else:
+                start, size, _, _, fragment, fragment_offset, _ = struct.unpack('<QQQIIII', reader.read(40))
+            if fragment == NO_FRAGMENT:
+                block_count = -(-size // self.block_size)
+            else:
+                block_count = size // self.block_size
+            block_sizes = struct.unpack(f'<{block_count}I', reader.read(4 * block_count))
+            return Inode('file', size, start, None, fragment, fragment_offset, block_sizes, None)
+
+        if inode_type in (3, 10):
+            _, target_size = struct.unpack('<II', reader.read(8))
+            target = reader.read(target_size).decode('utf-8', errors='replace')
+            return Inode('symlink', target_size, None, None, None, None, None, target)
+
+        return Inode('other', 0, None, None, None, None, None, None)
+
+    def _listdir(self, inode):
+        """Returns {name: inode ref} for a directory inode."""
+        remaining = inode.size - 3
+        entries = {}
+        if remaining <= 0:
+            return entries
+
+        reader = _MetadataReader(self, self.directory_table_start + inode.start, inode.offset)
+        while remaining > 0:
+            count, block, _ = struct.unpack('<III', reader.read(12))
+            remaining -= 12
+            for _ in range(count + 1):
+                offset, _, _, name_size = struct.unpack('<HhHH', reader.read(8))
+                name = reader.read(name_size + 1).decode('utf-8', errors='replace')
+                entries[name] = (block << 16) | offset
+                remaining -= 8 + name_size + 1
+        return entries
+
+    def _lookup(self, path):
+        parts = [part for part in path.strip('/').split('/') if part]
+        inode = self._inode(self.root_inode_ref)
+        stack = []
+        hops = 0
+
+        while parts:
+            part = parts.pop(0)
+            if part == '.':
+                continue
+            if part == '..':
+                inode = stack.pop() if stack else inode
+                continue
+            if inode.kind != 'dir':
+                return None
+
+            ref = self._listdir(inode).get(part)
+            if ref is None:
+                return None
+
+            child = self._inode(ref)
+            if child.kind == 'symlink':
+                hops += 1
+                if hops > MAX_SYMLINK_HOPS:
+                    return None
+                target_parts = [p for p in child.target.split('/') if p]
+                if child.target.startswith('/'):
+                    stack, inode = [], self._inode(self.root_inode_ref)
+                parts = target_parts + parts
+                continue
+
+            stack.append(inode)
+            inode = child
+        return inode
+
+    def lookup(self, path):
+        """Returns the Inode at `path` (symlinks resolved), or None if it does not exist."""
+        try:
+            return self._lookup(path)
+        except DECODE_ERRORS as e:
+            raise SquashFSError(f"Corrupted SquashFS metadata while resolving {path}: {e}")
+
+    def listdir(self, path):
+        """Returns the sorted entry names of the directory at `path`, or None if there is no directory."""
+        inode = self.lookup(path)
+        if inode is None or inode.kind != 'dir':
+            return None
+        try:
+            return sorted(self._listdir(inode))
+        except DECODE_ERRORS as e:
+            raise SquashFSError(f"Corrupted SquashFS directory {path}: {e}")
+
+    def _fragment(self, index):
+        cached = self._fragment_cache.get(index)
+        if cached is not None:
+            return cached
+
+        per_block = METADATA_SIZE // 16
+        pointer, = struct.unpack_from('<Q', self._map, self._check_range(
+            self.fragment_table_start + 8 * (index // per_block), 8))
+        reader = _MetadataReader(self, pointer, 16 * (index % per_block))
+        start, size, _ = struct.unpack('<QII', reader.read(16))
+
+        self._fragment_cache[index] = self._data_block(start, size)
+        return self._fragment_cache[index]
+
+    def _data_block(self, start, size_field):
+        size = size_field & ~UNCOMPRESSED_BLOCK
+        offset = self._check_range(start, size)
+        raw = self._map[offset:offset + size]
+        return raw if size_field & UNCOMPRESSED_BLOCK else self._decompress(raw)
+
+    def read_file(self, path, max_bytes=None):
+        """
+        Returns the contents of the regular file at `path`, or None if there is none.
+        With `max_bytes`, only the blocks holding the first max_bytes bytes are decompressed.
+        """
+        inode = self.lookup(path)
+        if inode is None or inode.kind != 'file':
+            return None
+        length = inode.size if max_bytes is None else min(inode.size, max_bytes)
+
+        try:
+            chunks = []
+            read = 0
+            position = inode.start
+            for size_field in inode.block_sizes:
+                if read >= length:
+                    break
+                size = size_field & ~UNCOMPRESSED_BLOCK
+                read += self.block_size
+                if size == 0:
+                    chunks.append(b'\0' * self.block_size)
+                    continue
+                chunks.append(self._data_block(position, size_field))
+                position += size
+
+            if inode.fragment != NO_FRAGMENT and read < length:
+                tail = inode.size - len(inode.block_sizes) * self.block_size
+                fragment = self._fragment(inode.fragment)
+                chunks.append(fragment[inode.fragment_offset:inode.fragment_offset + tail])
+        except DECODE_ERRORS as e:
+            raise SquashFSError(f"Corrupted SquashFS data while reading {path}: {e}")
+
+        return b''.join(chunks)[:length]
@@ -0,0 +1,154 @@
+import os
+import time
+from .fcdm_batch import parse_image, make_extractor
+from .fcdm_cache import ParseCache
+from .fcdm_parser import ConfigParser
+from .fcdm_policy_verifier import PolicyVerifier
+
+
+class Timeline:
+    """
+    Verifies an ordered release series (oldest first) against its first release.
+
+    Every image is parsed at most once. Baseline-to-N checks run on a
+    verifier that keeps the first release loaded as its incremental baseline;
+    consecutive pairs run on a second verifier so the two never evict each
+    other's solver state.
+    """
+
+    def __init__(self, paths, parser=None, extractor=None):
+        self.paths = list(paths)
+        self.parser = parser or ConfigParser()
+        self.extractor = extractor or make_extractor()
+        self.baseline_verifier = PolicyVerifier()
+        self.pair_verifier = PolicyVerifier()
+        self.states = {}
+        self.parses = 0
+
+    def close(self):
+        self.baseline_verifier.close()
+        self.pair_verifier.close()
+
+    def state(self, index):
+        """Returns the parsed (config, firewall) state of a release, or None if it cannot be parsed."""
+        if index not in self.states:
+            self.parses += 1
+            self.states[index] = parse_image(self.parser, self.extractor, self.paths[index])
+        return self.states[index]
+
+    def _check(self, verifier, old_index, new_index):
+        old, new = self.state(old_index), self.state(new_index)
+        if old is None or new is None:
+            return 'ERROR', []
+        result = verifier.check_security_drift(old[0], new[0], old[1], new[1])
+        status = verifier.last_explanation['verdict']
+        return status, list(verifier.last_violated)
+
+    def check_baseline(self, index):
+        return self._check(self.baseline_verifier, 0, index)
+
+    def check_previous(self, index):
+        return self._check(self.pair_verifier, index - 1, index)
+
+    def first_regression(self):
+        """
+        Bisects to the first release that drifts from the baseline.
+
+        Assumes a regression persists once introduced; releases that cannot be
+        parsed are skipped. Returns the index, or None when the last readable
+        release still passes.
+        """
+        hi = None
+        unknown = list(range(1, len(self.paths)))
+        # Probe the newest readable release first: if it passes, nothing regressed.
+        while unknown and hi is None:
+            status, _ = self.check_baseline(unknown[-1])
+            if status == 'PASS':
+                return None
+            if status == 'DRIFT':
+                hi = unknown.pop()
+            else:
+                unknown.pop()
+        if hi is None:
+            return None
+
+        while unknown:
+            middle = len(unknown) // 2
+            status, _ = self.check_baseline(unknown[middle])
+            if status == 'DRIFT':
+                hi = unknown[middle]
+                unknown = unknown[:middle]
+            elif status == 'PASS':
+                unknown = unknown[middle + 1:]
+            else:
+                unknown.pop(middle)
+        return hi
+
+    def rows(self, parsed_only=False):
+        """
+        Returns one verdict row per release. With `parsed_only`, only releases
+        parsed so far are listed and no further image is parsed.
+        """
+        rows = []
+        for index in sorted(self.states) if parsed_only else range(len(self.paths)):
+            row = {'index': index, 'release': self.paths[index], 'previous': '-', 'rules': []}
+            if index == 0:
+                row['baseline'] = 'BASE'
+            else:
+                row['baseline'], row['rules'] = self.check_baseline(index)
+                if not parsed_only or index - 1 in self.states:
+                    row['previous'], _ = self.check_previous(index)
+            rows.append(row)
+        return rows
+
+
+def format_table(rows, first_regression=None):
+    """Renders the per-release verdicts as a compact text table."""
+    names = [os.path.basename(os.path.normpath(row['release'])) for row in rows]
+    width = max([len("release")] + [len(name) for name in names])
+    lines = [f"{'#':>4}  {'release':<{width}}  {'vs base':<7}  {'vs prev':<7}  rules"]
+    for row, name in zip(rows, names):
+        marker = '*' if row['index'] == first_regression else ' '
+        lines.append(f"{row['index']:>3}{marker}  {name:<{width}}  {row['baseline']:<7}  {row['previous']:<7}  "
+                     f"{', '.join(row['rules']) or '-'}")
+    return "\n".join(lines)
+
+
+def run_timeline(paths, bisect=False, cache_dir=None, store_dir=None, backend='auto'):
+    """
+    Audits an ordered release series and reports where it first regressed.
+
+    Every release is checked against the first one (the baseline) and against
+    its predecessor. With `bisect`, only the releases needed to locate the
+    first regression are parsed and shown (assuming regressions persist).
+
+    Returns:
+    tuple: (rows, index of the first regressing release or None)
+    """
+    start = time.perf_counter()
+    timeline = Timeline(paths,
+                        parser=ConfigParser(cache=ParseCache(cache_dir) if cache_dir else None),
+                        extractor=make_extractor(store_dir, backend))
+
+    if timeline.state(0) is None:
+        print("Timeline Aborted: Could not normalize the baseline configuration data.")
+        return [], None
+
+    try:
+        if bisect:
+            first = timeline.first_regression()
+            rows = timeline.rows(parsed_only=True)
+        else:
+            # Every release is verified anyway, so the first drift is read off the table.
+            rows = timeline.rows()
+            first = next((row['index'] for row in rows if row['baseline'] == 'DRIFT'), None)
+    finally:
+        timeline.close()
+
+    print("\n" + format_table(rows, first))
+    if first is None:
+        print("\n[INFO] No release drifted from the baseline.")
+    else:
+        print(f"\n[INFO] First regressing release: #{first} {paths[first]}")
+    print(f"[INFO] {len(paths)} releases, {timeline.parses} parsed, in {time.perf_counter() - start:.2f}s.")
+    return rows, first
@@ -0,0 +1,194 @@
+import os
+import re
+import shlex
+import sys
+
+
+class ReadLimits:
+    """Upper bounds that keep parsing memory flat on huge or hostile config files."""
+
+    def __init__(self, max_line_length=64 * 1024, max_sections=10000, max_file_size=16 * 1024 * 1024):
+        self.max_line_length = max_line_length
+        self.max_sections = max_sections
+        self.max_file_size = max_file_size
+
+
+DEFAULT_LIMITS = ReadLimits()
+
+
+class UCISection:
+    """A typed `config` section of a UCI package with its options and list options."""
+
+    def __init__(self, package, section_type, name, index):
+        self.package = package
+        self.section_type = section_type
+        self.name = name
+        self.index = index
+        self.options = {}
+        self.lists = {}
+
+    def get(self, key, default=None):
+        return self.options.get(key, default)
+
+    def values(self, key):
+        """Returns every value of `key`, whether it was given as an option or as a list."""
+        values = list(self.lists.get(key, ()))
+        if key in self.options:
+            values.insert(0, self.options[key])
+        return values
+
+    def __repr__(self):
+        return f"UCISection({self.package}.{self.section_type}[{self.index}] name={self.name!r})"
+
+
+# Code before the first unquoted '#', and the words in it, of lines without '"' or '\\'.
+_SIMPLE_CODE = re.compile(r"(?:'[^']*'|[^'#])*")
+_SIMPLE_WORD = re.compile(r"(?:'[^']*'|[^ \t\r\n'])+")
+
+
+def tokenize(line):
+    """Splits one UCI line into unquoted tokens, dropping comments."""
+    if '"' not in line and '\\' not in line:
+        # Same result as shlex for the common single-quoted case, in linear time;
+        # shlex slows down sharply on very long tokens.
+        code = _SIMPLE_CODE.match(line).group()
+        if line[len(code):len(code) + 1] != "'":
+            return [word.replace("'", "") for word in _SIMPLE_WORD.findall(code)]
+    else:
+        try:
+            return shlex.split(line, comments=True)
+        except ValueError:
+            pass
+    # Unbalanced quotes: fall back to whitespace splitting like the legacy parser did.
+    return [part.strip("'\"") for part in line.split()]
+
+
+def bounded_lines(f, limits=DEFAULT_LIMITS, diagnostics=None, source=None):
+    """
+    Yields the lines of text file `f` without ever holding more than
+    max_line_length characters of one line.
+
+    Longer lines are truncated (the rest is read and discarded in chunks) and
+    reading stops after max_file_size characters. Each event is appended to
+    `diagnostics` as a dict instead of raising.
+    """
+    def note(kind, detail):
+        if diagnostics is not None:
+            diagnostics.append({'source': source, 'kind': kind, 'detail': detail})
+
+    consumed = 0
+    line_number = 0
+    while True:
+        if consumed >= limits.max_file_size:
+            if f.read(1):
+                note('file_size', f"stopped reading after {limits.max_file_size} characters")
+            return
+
+        line = f.readline(min(limits.max_line_length, limits.max_file_size - consumed))
+        if not line:
+            return
+        consumed += len(line)
+        line_number += 1
+
+        if not line.endswith('\n') and len(line) == limits.max_line_length:
+            # Drain the rest of the oversize line without keeping it.
+            dropped = 0
+            while consumed < limits.max_file_size:
+                chunk = f.readline(min(limits.max_line_length, limits.max_file_size - consumed))
+                consumed += len(chunk)
+                dropped += len(chunk)
+                if not chunk or chunk.endswith('\n'):
+                    break
+            if dropped:
+                note('line_length', f"line {line_number} truncated to {limits.max_line_length} characters")
+        yield line
+
+
+def parse_sections(lines, package, limits=DEFAULT_LIMITS, diagnostics=None):
+    """
+    Streams `UCISection` records from an iterable of UCI lines.
+
+    Each section is yielded as soon as the next `config` line (or the end of
+    input) closes it, so only one section is held in memory at a time.
+    Sections beyond max_sections are not parsed; a diagnostic records it.
+    Section types, option names and values are interned: images repeat
+    the same few strings many times over.
+    """
+    section = None
+    index = 0
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+
+        tokens = tokenize(line)
+        if not tokens:
+            continue
+
+        keyword = tokens[0].lower()
+        if keyword == 'config':
+            if section is not None:
+                yield section
+            if index >= limits.max_sections:
+                if diagnostics is not None:
+                    diagnostics.append({'source': package, 'kind': 'section_count',
+                                        'detail': f"stopped after {limits.max_sections} sections"})
+                return
+            section_type = sys.intern(tokens[1]) if len(tokens) > 1 else ''
+            name = tokens[2] if len(tokens) > 2 else None
+            section = UCISection(package, section_type, name, index)
+            index += 1
+
+        elif section is not None and len(tokens) >= 3 and keyword == 'option':
+            section.options[sys.intern(tokens[1])] = sys.intern(' '.join(tokens[2:]))
+
+        elif section is not None and len(tokens) >= 3 and keyword == 'list':
+            section.lists.setdefault(sys.intern(tokens[1]), []).append(sys.intern(' '.join(tokens[2:])))
+
+    if section is not None:
+        yield section
+
+
+def iter_sections(file_path, package=None, limits=DEFAULT_LIMITS, diagnostics=None):
+    """Streams the sections of a single UCI file; the package defaults to the file name."""
+    package = package or os.path.basename(file_path)
+    with open(file_path, 'r', errors='replace') as f:
+        yield from parse_sections(bounded_lines(f, limits, diagnostics, package), package, limits, diagnostics)
+
+
+class UCIStream:
+    """Dispatches the sections of a UCI config directory to subscribed policy consumers in one pass."""
+
+    def __init__(self, limits=DEFAULT_LIMITS):
+        self.subscribers = {}
+        self.bytes_read = 0
+        self.limits = limits
+        # Limit violations met while reading, as {'source', 'kind', 'detail'} dicts.
+        self.diagnostics = []
+
+    def subscribe(self, package, callback, section_type=None):
+        """Registers `callback(section)` for sections of `package` (optionally only one section type)."""
+        self.subscribers.setdefault(package, []).append((section_type, callback))
+
+    def feed(self, package, lines):
+        """Dispatches the sections parsed from `lines` to the subscribers of `package`."""
+        subscribers = self.subscribers.get(package, ())
+        for section in parse_sections(lines, package, self.limits, self.diagnostics):
+            for section_type, callback in subscribers:
+                if section_type is None or section_type == section.section_type:
+                    callback(section)
+
+    def scan(self, config_dir):
+        """Reads every subscribed package file under `config_dir` exactly once."""
+        for package in sorted(self.subscribers):
+            file_path = os.path.join(config_dir, package)
+            if not os.path.isfile(file_path):
+                continue
+            with open(file_path, 'r', errors='replace') as f:
+                self.bytes_read += min(os.fstat(f.fileno()).st_size, self.limits.max_file_size)
+                self.feed_file(package, f, source=file_path)
+
+    def feed_file(self, package, f, source=None):
+        """Like feed(), reading the open text file `f` within the stream's limits."""
+        self.feed(package, bounded_lines(f, self.limits, self.diagnostics, source or package))
@@ -1,5 +1,3 @@
-from colorama import Fore, Style
-
 def colorize(text,color):
     """
      Wraps text in the specified color and resets the style.
@@ -10,4 +8,6 @@ def colorize(text,color):
     Return:
     str: Colorized string.
     """
+    from colorama import Style
+
     return f"{color}{text}{Style.RESET_ALL}"
\ No newline at end of file
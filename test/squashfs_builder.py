@@ -0,0 +1,213 @@
+"""Minimal SquashFS 4.0 image builder used by the tests and benchmarks (no mksquashfs needed)."""
+import lzma
+import struct
+import zlib
+
+METADATA_SIZE = 8192
+NO_FRAGMENT = 0xFFFFFFFF
+UNCOMPRESSED_BLOCK = 1 << 24
+COMPRESSORS = {
+    'gzip': (1, zlib.compress),
+    'xz': (4, lambda data: lzma.compress(data, format=lzma.FORMAT_XZ, check=lzma.CHECK_CRC32)),
+}
+
+
+class _MetadataWriter:
+    def __init__(self, compress):
+        self.compress = compress
+        self.output = bytearray()
+        self.buffer = bytearray()
+
+    def position(self):
+        """Returns (block start, offset) of the next byte written."""
+        return len(self.output), len(self.buffer)
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= METADATA_SIZE:
+            self._flush(self.buffer[:METADATA_SIZE])
+            self.buffer = self.buffer[METADATA_SIZE:]
+
+    def _flush(self, block):
+        compressed = self.compress(bytes(block))
+        if len(compressed) < len(block):
+            self.output += struct.pack('<H', len(compressed)) + compressed
+        else:
+            self.output += struct.pack('<H', len(block) | 0x8000) + block
+
+    def finish(self):
+        if self.buffer:
+            self._flush(self.buffer)
+            self.buffer = bytearray()
+        return bytes(self.output)
+
+
+def _tree(files):
+    root = {}
+    for path, data in files.items():
+        parts = path.strip('/').split('/')
+        node = root
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = data
+    return root
+
+
+def build_squashfs(files, block_size=131072, compression='gzip', fragments=True):
+    """
+    Builds a SquashFS 4.0 image from {path: bytes | str} and returns its bytes.
+
+    Values that are str are stored as symlink targets, bytes as regular files.
+    """
+    compression_id, compress = COMPRESSORS[compression]
+    block_log = block_size.bit_length() - 1
+    data = bytearray(b'\0' * 96)
+    fragment_entries = []
+    fragment_buffer = bytearray()
+
+    def flush_fragment():
+        nonlocal fragment_buffer
+        if not fragment_buffer:
+            return
+        compressed = compress(bytes(fragment_buffer))
+        if len(compressed) < len(fragment_buffer):
+            fragment_entries.append((len(data), len(compressed)))
+            data.extend(compressed)
+        else:
+            fragment_entries.append((len(data), len(fragment_buffer) | UNCOMPRESSED_BLOCK))
+            data.extend(fragment_buffer)
+        fragment_buffer = bytearray()
+
+    def store_file(content):
+        full_blocks = len(content) // block_size
+        tail = content[full_blocks * block_size:]
+        use_fragment = fragments and 0 < len(tail)
+        block_count = full_blocks if use_fragment else -(-len(content) // block_size)
+
+        start = len(data)
+        sizes = []
+        for index in range(block_count):
+            block = content[index * block_size:(index + 1) * block_size]
+            compressed = compress(block)
+            if len(compressed) < len(block):
+                sizes.append(len(compressed))
+                data.extend(compressed)
+            else:
+                sizes.append(len(block) | UNCOMPRESSED_BLOCK)
+                data.extend(block)
+
+        fragment, fragment_offset = NO_FRAGMENT, 0
+        if use_fragment:
+            if len(fragment_buffer) + len(tail) > block_size:
+                flush_fragment()
+            fragment, fragment_offset = len(fragment_entries), len(fragment_buffer)
+            fragment_buffer.extend(tail)
+        return start, sizes, fragment, fragment_offset
+
+    tree = _tree(files)
+
+    # Assign inode numbers in post-order so every child exists before its parent.
+    numbers = {}
+
+    def number(node, path):
+        for name in sorted(node):
+            child = node[name]
+            if isinstance(child, dict):
+                number(child, path + (name,))
+            else:
+                numbers[path + (name,)] = len(numbers) + 1
+        numbers[path] = len(numbers) + 1
+
+    number(tree, ())
+    stored = {}
+
+    def store(node, path):
+        for name in sorted(node):
+            child = node[name]
+            if isinstance(child, dict):
+                store(child, path + (name,))
+            elif isinstance(child, bytes):
+                stored[path + (name,)] = store_file(child)
+
+    store(tree, ())
+    flush_fragment()
+
+    inodes = _MetadataWriter(compress)
+    directories = _MetadataWriter(compress)
+    refs = {}
+
+    def write_inodes(node, path, parent_number):
+        entries = []
+        for name in sorted(node):
+            child = node[name]
+            child_path = path + (name,)
+            if isinstance(child, dict):
+                write_inodes(child, child_path, numbers[path])
+                entries.append((name, 1))
+                continue
+
+            refs[child_path] = inodes.position()
+            if isinstance(child, bytes):
+                start, sizes, fragment, fragment_offset = stored[child_path]
+                inodes.write(struct.pack('<HHHHII', 2, 0o644, 0, 0, 0, numbers[child_path]))
+                inodes.write(struct.pack('<IIII', start, fragment, fragment_offset, len(child)))
+                inodes.write(struct.pack(f'<{len(sizes)}I', *sizes))
+                entries.append((name, 2))
+            else:
+                target = child.encode()
+                inodes.write(struct.pack('<HHHHII', 3, 0o777, 0, 0, 0, numbers[child_path]))
+                inodes.write(struct.pack('<II', 1, len(target)) + target)
+                entries.append((name, 3))
+
+        listing_start = directories.position()
+        listing_size = 0
+        for name, entry_type in entries:
+            block, offset = refs[path + (name,)]
+            encoded = name.encode()
+            entry = struct.pack('<III', 0, block, numbers[path + (name,)])
+            entry += struct.pack('<HhHH', offset, 0, entry_type, len(encoded) - 1) + encoded
+            directories.write(entry)
+            listing_size += len(entry)
+
+        refs[path] = inodes.position()
+        inodes.write(struct.pack('<HHHHII', 1, 0o755, 0, 0, 0, numbers[path]))
+        inodes.write(struct.pack('<IIHHI', listing_start[0], 2, listing_size + 3, listing_start[1], parent_number))
+
+    write_inodes(tree, (), len(numbers) + 1)
+
+    inode_table_start = len(data)
+    data.extend(inodes.finish())
+    directory_table_start = len(data)
+    data.extend(directories.finish())
+
+    fragment_table_start = 0xFFFFFFFFFFFFFFFF
+    if fragment_entries:
+        fragment_writer = _MetadataWriter(compress)
+        block_starts = []
+        for index, (start, size) in enumerate(fragment_entries):
+            if index % (METADATA_SIZE // 16) == 0:
+                block_starts.append(fragment_writer.position()[0])
+            fragment_writer.write(struct.pack('<QII', start, size, 0))
+        metadata_start = len(data)
+        data.extend(fragment_writer.finish())
+        fragment_table_start = len(data)
+        for block_start in block_starts:
+            data.extend(struct.pack('<Q', metadata_start + block_start))
+
+    id_writer = _MetadataWriter(compress)
+    id_writer.write(struct.pack('<I', 0))
+    id_block = len(data)
+    data.extend(id_writer.finish())
+    id_table_start = len(data)
+    data.extend(struct.pack('<Q', id_block))
+
+    root_block, root_offset = refs[()]
+    flags = 0x0200 | (0 if fragments else 0x0010)
+    superblock = struct.pack(
+        '<IIIIIHHHHHHQQQQQQQQ',
+        0x73717368, len(numbers), 0, block_size, len(fragment_entries),
+        compression_id, block_log, flags, 1, 4, 0,
+        (root_block << 16) | root_offset, len(data), id_table_start, 0xFFFFFFFFFFFFFFFF,
+        inode_table_start, directory_table_start, fragment_table_start, 0xFFFFFFFFFFFFFFFF)
+    data[:96] = superblock
+    return bytes(data)
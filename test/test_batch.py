@@ -0,0 +1,57 @@
+import os
+import sys
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_batch import run_batch
+
+
+DROPBEAR = """config dropbear
+\toption PasswordAuth '{password}'
+\toption RootPasswordAuth '{root}'
+\toption Port '22'
+"""
+
+FIREWALL_RULE = """
+config rule
+\toption name 'Allow-{port}'
+\toption src 'wan'
+\toption dest_port '{port}'
+\toption target 'ACCEPT'
+"""
+
+
+def make_image(base, name, root='off', password='off', ports=()):
+    """Writes a minimal extracted OpenWrt tree and returns the image directory."""
+    image_dir = os.path.join(base, name)
+    config_dir = os.path.join(image_dir, "squashfs-root", "etc", "config")
+    os.makedirs(config_dir)
+
+    with open(os.path.join(config_dir, "dropbear"), 'w') as f:
+        f.write(DROPBEAR.format(root=root, password=password))
+    with open(os.path.join(config_dir, "firewall"), 'w') as f:
+        f.write("config defaults\n\toption input 'REJECT'\n")
+        for port in ports:
+            f.write(FIREWALL_RULE.format(port=port))
+
+    return image_dir
+
+
+def test_batch_reports_each_candidate(tmp_path):
+    baseline = make_image(tmp_path, "v1")
+    candidates = [
+        make_image(tmp_path, "clean"),
+        make_image(tmp_path, "root", root='on'),
+        make_image(tmp_path, "telnet", ports=['23']),
+        os.path.join(tmp_path, "missing"),
+    ]
+    report_dir = os.path.join(tmp_path, "reports")
+
+    summaries = run_batch(baseline, candidates, workers=2, report_dir=report_dir)
+
+    assert [s['status'] for s in summaries] == ['PASS', 'DRIFT', 'DRIFT', 'ERROR']
+    assert "Debug Port 23" in summaries[2]['result']
+    assert len(os.listdir(report_dir)) == len(candidates)
+    assert all(os.path.exists(s['report']) for s in summaries)
@@ -0,0 +1,51 @@
+import os
+import sys
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_cache import ParseCache
+from fcdm.fcdm_parser import ConfigParser
+from test_batch import make_image
+
+
+def config_file(image_dir, name):
+    return os.path.join(image_dir, "squashfs-root", "etc", "config", name)
+
+
+def test_unchanged_config_is_served_from_cache(tmp_path):
+    image = make_image(tmp_path, "v1", root='on', ports=['23', '8080'])
+    cache_dir = os.path.join(tmp_path, "cache")
+
+    cold = ConfigParser(cache=ParseCache(cache_dir))
+    expected = (cold.parse_dropbear_config(config_file(image, "dropbear")),
+                cold.parse_firewall_config(config_file(image, "firewall")))
+    assert cold.cache.stats() == {'hits': 0, 'misses': 2, 'evictions': 0}
+
+    warm = ConfigParser(cache=ParseCache(cache_dir))
+    assert (warm.parse_dropbear_config(config_file(image, "dropbear")),
+            warm.parse_firewall_config(config_file(image, "firewall"))) == expected
+    assert warm.cache.stats() == {'hits': 2, 'misses': 0, 'evictions': 0}
+    assert expected == ({"root_login_allowed": True, "password_auth_enabled": False}, {'23'})
+
+
+def test_policy_version_is_part_of_the_key(tmp_path):
+    image = make_image(tmp_path, "v1", ports=['23'])
+    cache_dir = os.path.join(tmp_path, "cache")
+
+    ConfigParser(cache=ParseCache(cache_dir)).parse_firewall_config(config_file(image, "firewall"))
+
+    narrowed = ConfigParser(cache=ParseCache(cache_dir))
+    narrowed.CRITICAL_PORTS = ["22"]
+    assert narrowed.parse_firewall_config(config_file(image, "firewall")) == set()
+    assert narrowed.cache.misses == 1
+
+
+def test_lru_eviction_bounds_entries(tmp_path):
+    cache = ParseCache(os.path.join(tmp_path, "cache"), max_entries=2)
+    for index in range(4):
+        cache.put(ParseCache.make_key('firewall', str(index).encode(), 'v'), [index])
+
+    assert cache.evictions == 2
+    assert len(os.listdir(cache.cache_dir)) == 2
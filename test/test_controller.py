@@ -0,0 +1,96 @@
+import json
+import os
+import sys
+import time
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_controller import FCDMController
+from fcdm.fcdm_extractor import FirmwareExtractor
+from fcdm.fcdm_log import iter_records
+from fcdm.fcdm_parser import ConfigParser
+from fcdm.fcdm_policy_verifier import PolicyVerifier
+from test_batch import make_image
+
+
+class SlowExtractor(FirmwareExtractor):
+    """Simulates a subprocess-bound extraction stage of fixed latency."""
+
+    def __init__(self, base_dir, delay):
+        super().__init__(base_dir=base_dir)
+        self.delay = delay
+
+    def resolve_root(self, path):
+        time.sleep(self.delay)
+        return self.locate_root(path)
+
+
+def run_pair(tmp_path, extract_concurrency):
+    v1 = make_image(tmp_path, f"v1-{extract_concurrency}")
+    v2 = make_image(tmp_path, f"v2-{extract_concurrency}", password='on')
+    controller = FCDMController(parser=ConfigParser(), verifier=PolicyVerifier(),
+                                extractor=SlowExtractor(str(tmp_path), delay=0.3),
+                                log_file_path=str(tmp_path / "fcdm.log"),
+                                extract_concurrency=extract_concurrency)
+
+    start = time.perf_counter()
+    controller.run_auth_integrity_audit(v1, v2)
+    elapsed = time.perf_counter() - start
+    return elapsed, [record['msg'] for record in iter_records(controller.log_file_path,
+                                                              run_id=controller.last_metrics.run_id)]
+
+
+def test_pipeline_overlaps_extraction_of_both_images(tmp_path):
+    overlapped, messages = run_pair(tmp_path, extract_concurrency=2)
+    serialized, _ = run_pair(tmp_path, extract_concurrency=1)
+
+    assert any("CRITICAL DRIFT DETECTED" in message for message in messages)
+    # Ground configs are decided without Z3, and the log says so.
+    assert " -> Decided by: ground evaluation (no Z3)" in messages
+    assert overlapped < 0.55 <= serialized
+
+
+def test_run_appends_metrics_record(tmp_path):
+    v1 = make_image(tmp_path, "v1")
+    v2 = make_image(tmp_path, "v2", ports=['23'])
+    controller = FCDMController(parser=ConfigParser(), verifier=PolicyVerifier(fast_path=False),
+                                extractor=FirmwareExtractor(base_dir=str(tmp_path)),
+                                log_file_path=str(tmp_path / "fcdm_analysis.log"))
+
+    controller.run_auth_integrity_audit(v1, v2)
+    controller.run_auth_integrity_audit(v1, str(tmp_path / "missing"))
+
+    with open(tmp_path / "fcdm_analysis.metrics.jsonl") as f:
+        first, second = [json.loads(line) for line in f]
+
+    assert first['verdict'] == 'DRIFT' and second['verdict'] == 'ABORTED'
+    assert set(first['stages']) == {'extract_v1', 'extract_v2', 'parse_v1', 'parse_v2', 'verify'}
+    # Stages on executor threads count their own thread's CPU only.
+    assert all(stage['cpu_s'] <= stage['wall_s'] + 0.01 for stage in first['stages'].values())
+    assert first['bytes_read'] == sum(os.path.getsize(os.path.join(image, "squashfs-root", "etc", "config", name))
+                                      for image in (v1, v2) for name in ("dropbear", "firewall"))
+    assert first['solver']['engine'] == 'z3' and first['solver']['statistics']
+    assert first['peak_rss_kb'] > 0
+
+    controller.close()
+    assert controller.solve_executor._shutdown
+
+
+def test_records_of_a_failing_run_are_flushed(tmp_path):
+    class FailingParser(ConfigParser):
+        def parse_config_dir(self, *args):
+            raise OSError("disk gone")
+
+    controller = FCDMController(parser=FailingParser(), verifier=PolicyVerifier(),
+                                extractor=FirmwareExtractor(base_dir=str(tmp_path)),
+                                log_file_path=str(tmp_path / "fcdm_analysis.log"))
+    with pytest.raises(OSError):
+        controller.run_auth_integrity_audit(make_image(tmp_path, "v1"), make_image(tmp_path, "v2"))
+
+    records = list(iter_records(controller.log_file_path, run_id=controller.last_metrics.run_id))
+    assert records[0]['msg'] == "\n---Starting FCDM Drift Analysis---"
+    assert not hasattr(controller, 'log_messages')
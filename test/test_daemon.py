@@ -0,0 +1,128 @@
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_daemon import AuditDaemon, InboxWatcher, make_handler
+from test_batch import make_image
+
+
+def wait_for(predicate, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        value = predicate()
+        if value:
+            return value
+        time.sleep(0.02)
+    raise AssertionError("timed out")
+
+
+def request(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data)) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def finished(url):
+    job = request(url)[1]
+    return job if job['status'] not in ('QUEUED', 'RUNNING') else None
+
+
+def test_http_audits_with_warm_verifier(tmp_path):
+    daemon = AuditDaemon(make_image(tmp_path, "v1"))
+    daemon.start()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(daemon))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        ids = []
+        for name, kwargs in [("clean", {}), ("root", {'root': 'on'}), ("telnet", {'ports': ['23']})]:
+            status, body = request(url + "/audit", {'path': make_image(tmp_path, name, **kwargs)})
+            assert status == 202
+            ids.append(body['id'])
+
+        jobs = [wait_for(lambda: finished(f"{url}/results/{job_id}")) for job_id in ids]
+        assert [job['status'] for job in jobs] == ['PASS', 'DRIFT', 'DRIFT']
+        assert "Debug Port 23" in jobs[2]['result']
+
+        assert request(url + "/audit", {'path': str(tmp_path / "missing")})[0] == 400
+        assert request(f"{url}/results/999")[0] == 404
+
+        _, stats = request(url + "/stats")
+        assert stats['completed'] == 3
+        assert stats['latency_p99_ms'] >= stats['latency_p50_ms'] > 0
+        assert [job['id'] for job in request(f"{url}/results?since={ids[0]}")[1]] == ids[1:]
+    finally:
+        server.shutdown()
+        server.server_close()
+        daemon.stop(timeout=5)
+
+
+def test_worker_survives_a_failing_job(tmp_path):
+    daemon = AuditDaemon(make_image(tmp_path, "v1"))
+    daemon.start()
+    bad = make_image(tmp_path, "bad")
+    prepare_root = daemon.extractor.prepare_root
+
+    def failing_prepare_root(path):
+        if path == bad:
+            raise OverflowError("Python int too large to convert to C ssize_t")
+        return prepare_root(path)
+
+    daemon.extractor.prepare_root = failing_prepare_root
+    try:
+        bad_id, good_id = daemon.submit(bad), daemon.submit(make_image(tmp_path, "clean"))
+        good = wait_for(lambda: (daemon.result(good_id) or {}).get('status') not in ('QUEUED', 'RUNNING')
+                        and daemon.result(good_id))
+
+        assert good['status'] == 'PASS'
+        assert daemon.result(bad_id)['status'] == 'ERROR' and "OverflowError" in daemon.result(bad_id)['result']
+        assert daemon.stats()['errors'] == 1 and daemon._worker.is_alive()
+    finally:
+        daemon.stop(timeout=5)
+
+
+def test_full_queue_pushes_back(tmp_path):
+    daemon = AuditDaemon(make_image(tmp_path, "v1"), queue_size=1)
+    candidate = make_image(tmp_path, "clean")
+
+    # The worker is not started, so the single queue slot stays taken.
+    assert daemon.submit(candidate) == 1
+    assert daemon.submit(candidate) is None
+    assert daemon.stats()['rejected'] == 1
+
+
+def test_inbox_waits_for_stable_entries(tmp_path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    watcher = InboxWatcher(None, str(inbox))
+
+    (inbox / "fw.bin.part").write_bytes(b"partial")
+    (inbox / ".hidden").write_bytes(b"x")
+    image = inbox / "fw.bin"
+    image.write_bytes(b"first")
+    assert watcher.scan() == []
+
+    # Still growing: the size changed since the last poll.
+    image.write_bytes(b"first+more")
+    assert watcher.scan() == []
+    assert watcher.scan() == [str(image)]
+
+    watcher.seen[str(image)] = watcher.pending[str(image)]
+    assert watcher.scan() == []
+
+    image.unlink()
+    watcher.scan()
+    assert watcher.seen == {}
@@ -0,0 +1,128 @@
+import os
+import sys
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_diff import diff_trees
+from fcdm.fcdm_parser import ConfigParser
+from fcdm.fcdm_policy_verifier import PolicyVerifier
+
+DROPBEAR = "config dropbear\n\toption PasswordAuth 'off'\n\toption RootPasswordAuth 'off'\n"
+NETWORK = """config interface 'lan'
+\toption proto 'static'
+\toption ipaddr '192.168.1.1'
+\tlist dns '1.1.1.1'
+\tlist dns '8.8.8.8'
+
+config interface 'wan'
+\toption proto 'dhcp'
+"""
+FIREWALL = """config rule
+\toption src 'lan'
+\toption dest_port '22'
+\toption target 'ACCEPT'
+
+config rule
+\toption src 'wan'
+\toption dest_port '443'
+\toption target 'REJECT'
+"""
+
+
+def write_tree(base, name, **packages):
+    config_dir = os.path.join(base, name)
+    os.makedirs(config_dir)
+    files = {'dropbear': DROPBEAR, 'network': NETWORK, 'firewall': FIREWALL}
+    files.update(packages)
+    for package, content in files.items():
+        if content is not None:
+            with open(os.path.join(config_dir, package), 'w') as f:
+                f.write(content)
+    return config_dir
+
+
+def test_formatting_and_moved_rules_are_not_changes(tmp_path):
+    old = write_tree(tmp_path, "old")
+    rules = FIREWALL.split("\n\n")
+    # Reordered options, other quoting, comments and swapped anonymous sections.
+    new = write_tree(tmp_path, "new",
+                     network=NETWORK.replace("\toption proto 'static'\n\toption ipaddr '192.168.1.1'",
+                                             "\t# static LAN\n\toption ipaddr \"192.168.1.1\"\n\toption proto static"),
+                     firewall=rules[1] + "\n\n" + rules[0])
+
+    changes = diff_trees(old, new)
+    assert list(changes) == []
+    assert changes.stats == {'packages': 3, 'packages_skipped': 1, 'sections': 4, 'sections_skipped': 4}
+
+
+def test_typed_changes_and_policy_inputs(tmp_path):
+    old = write_tree(tmp_path, "old", uhttpd="config uhttpd 'main'\n\tlist listen_http '0.0.0.0:80'\n")
+    new = write_tree(tmp_path, "new", uhttpd=None, system="config system\n\toption hostname 'gw'\n",
+                     network=NETWORK.replace("192.168.1.1", "10.0.0.1").replace("\tlist dns '8.8.8.8'\n", ""),
+                     firewall=FIREWALL.replace("'443'", "'8443'"))
+
+    changes = diff_trees(old, new)
+    assert [str(change) for change in changes] == [
+        "option_changed firewall.@rule[1].dest_port: '443' -> '8443'",
+        "option_changed network.lan.ipaddr: '192.168.1.1' -> '10.0.0.1'",
+        "list_changed network.lan.dns: ['1.1.1.1', '8.8.8.8'] -> ['1.1.1.1']",
+        "package_added system",
+        "package_removed uhttpd",
+    ]
+    assert changes.stats['sections_skipped'] == 2
+
+    inputs = changes.mark_policy_inputs(ConfigParser().default_consumers())
+    assert [change.option for change in inputs] == ['dest_port']
+    assert changes.touching('network', 'interface', {'ipaddr'})[0].new == '10.0.0.1'
+
+
+def test_verifier_passes_trees_that_only_drift_outside_policy_inputs(tmp_path):
+    old = write_tree(tmp_path, "old")
+    new = write_tree(tmp_path, "new", network=NETWORK.replace("dhcp", "pppoe"))
+    changes = diff_trees(old, new)
+    changes.mark_policy_inputs(ConfigParser().default_consumers())
+
+    # An unknown setting alone would let Z3 assume a regression; identical inputs cannot regress.
+    unknown = {"root_login_allowed": None, "password_auth_enabled": False}
+    verifier = PolicyVerifier()
+    assert verifier.check_security_drift(unknown, unknown, set(), set(), changes).startswith("PASS")
+    assert verifier.last_engine == 'tree_diff'
+    assert verifier.last_explanation['tree_changes'] == [{
+        'kind': 'option_changed', 'package': 'network', 'section': 'wan', 'section_type': 'interface',
+        'option': 'proto', 'old': 'dhcp', 'new': 'pppoe', 'policy_input': False}]
+
+    new = write_tree(tmp_path, "telnet", firewall=FIREWALL + "\nconfig rule\n\toption src 'wan'\n"
+                                                           "\toption dest_port '23'\n\toption target 'ACCEPT'\n")
+    changes = diff_trees(old, new)
+    changes.mark_policy_inputs(ConfigParser().default_consumers())
+    assert [str(change) for change in changes] == ["section_added firewall.@rule[2]"]
+    secure = {"root_login_allowed": False, "password_auth_enabled": False}
+    assert "Debug Port 23" in verifier.check_security_drift(secure, secure, set(), {'23'}, changes)
+
+
+def test_tree_diff_reads_every_config_file_of_squashfs_images(tmp_path):
+    from fcdm.fcdm_controller import FCDMController
+    from fcdm.fcdm_extraction_store import ExtractionStore
+    from fcdm.fcdm_extractor import FirmwareExtractor
+    from test_squashfs import write_image
+
+    uhttpd = "config uhttpd 'main'\n\tlist listen_http '{}:80'\n"
+    files = {"etc/config/dropbear": DROPBEAR.encode(), "etc/config/firewall": FIREWALL.encode(),
+             "etc/config/uhttpd": uhttpd.format("127.0.0.1").encode()}
+    v1 = write_image(tmp_path, files, name="v1.img")
+    v2 = write_image(tmp_path, dict(files, **{"etc/config/uhttpd": uhttpd.format("0.0.0.0").encode()}), name="v2.img")
+
+    extractor = FirmwareExtractor(base_dir=str(tmp_path), backend='squashfs',
+                                  store=ExtractionStore(str(tmp_path / "store")))
+    # A policy-only extraction of V1 is already stored; the tree diff must not reuse it.
+    assert extractor.extract_root(v1) is not None
+    controller = FCDMController(parser=ConfigParser(), verifier=PolicyVerifier(), extractor=extractor,
+                                log_file_path=str(tmp_path / "fcdm.log"), tree_diff=True)
+    controller.run_auth_integrity_audit(v1, v2)
+
+    assert controller.last_explanation['verdict'] == 'PASS'
+    assert controller.last_explanation['tree_changes'] == [{
+        'kind': 'list_changed', 'package': 'uhttpd', 'section': 'main', 'section_type': 'uhttpd',
+        'option': 'listen_http', 'old': ['127.0.0.1:80'], 'new': ['0.0.0.0:80'], 'policy_input': False}]
@@ -0,0 +1,83 @@
+import os
+import sys
+import threading
+import time
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_controller import FCDMController
+from fcdm.fcdm_extraction_store import ExtractionStore
+from fcdm.fcdm_extractor import FirmwareExtractor
+from fcdm.fcdm_parser import ConfigParser
+from fcdm.fcdm_policy_verifier import PolicyVerifier
+from test_squashfs import firmware_files, write_image
+
+
+def fake_extract(calls, payload=b"x"):
+    def extract(work_dir):
+        calls.append(work_dir)
+        time.sleep(0.05)
+        root = os.path.join(work_dir, "_img.extracted", "squashfs-root")
+        os.makedirs(os.path.join(root, "etc", "config"))
+        with open(os.path.join(root, "etc", "config", "dropbear"), 'wb') as f:
+            f.write(payload)
+        return root
+    return extract
+
+
+def test_concurrent_fetches_share_one_extraction(tmp_path):
+    image = tmp_path / "v1.img"
+    image.write_bytes(b"firmware-v1")
+    store = ExtractionStore(str(tmp_path / "store"))
+    calls, roots = [], []
+
+    threads = [threading.Thread(target=lambda: roots.append(store.fetch(str(image), fake_extract(calls))))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(set(roots)) == 1
+    assert os.path.basename(os.path.dirname(os.path.dirname(roots[0]))) == ExtractionStore.image_digest(str(image))
+    assert store.fetch(str(image), fake_extract(calls)) == roots[0] and len(calls) == 1
+
+
+def test_eviction_keeps_store_under_cap(tmp_path):
+    store = ExtractionStore(str(tmp_path / "store"), max_bytes=2500)
+    calls = []
+    for index in range(4):
+        image = tmp_path / f"{index}.img"
+        image.write_bytes(f"firmware-{index}".encode())
+        store.fetch(str(image), fake_extract(calls, payload=b"x" * 1000))
+        time.sleep(0.01)
+
+    entries = [name for name in os.listdir(store.store_dir) if not name.startswith('.')]
+    assert len(entries) == 2
+    assert ExtractionStore.image_digest(str(tmp_path / "3.img")) in entries
+    # Evicted entries and failed extractions leave no lock files behind.
+    store.fetch(str(tmp_path / "0.img"), lambda work_dir: None)
+    locks = sorted(name[1:-len(".lock")] for name in os.listdir(store.store_dir) if name.endswith(".lock"))
+    assert locks == sorted(entries)
+
+
+def test_controller_audits_image_files(tmp_path, capsys):
+    files = firmware_files()
+    v1 = dict(files, **{"etc/config/dropbear": b"config dropbear\n\toption RootPasswordAuth 'off'\n",
+                        "etc/config/firewall": b"config defaults\n"})
+    v1_image = write_image(tmp_path, v1, name="v1.img")
+    v2_image = write_image(tmp_path, files, name="v2.img")
+
+    extractor = FirmwareExtractor(base_dir=str(tmp_path), store=ExtractionStore(str(tmp_path / "store")))
+    controller = FCDMController(parser=ConfigParser(), verifier=PolicyVerifier(), extractor=extractor,
+                                log_file_path=str(tmp_path / "fcdm.log"))
+    controller.run_auth_integrity_audit(v1_image, v2_image)
+    controller.run_auth_integrity_audit(v1_image, v2_image)
+
+    output = capsys.readouterr().out
+    assert output.count("CRITICAL DRIFT DETECTED") == 2
+    assert output.count("Reusing stored extraction") == 2
+    assert not os.path.exists(tmp_path / "_v1.img.extracted")
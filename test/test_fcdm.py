@@ -1,5 +1,6 @@
 import sys
 import os
+import random
 from colorama import Fore, Style
 
 
@@ -91,6 +92,181 @@ def test_no_change():
     run_test("TC-10: No Change (Expected Pass)", 
              config_v1, firewall_v1, config_v2, firewall_v2, expected_pass=True)
 
+# TC-11: Incremental Baseline Reuse (one solver, one push/pop scope per candidate)
+def test_incremental_baseline_reuse():
+    verifier = PolicyVerifier()
+    secure = {"root_login_allowed": False, "password_auth_enabled": False}
+    verifier.load_baseline(secure, set())
+
+    solver = verifier.solver
+    baseline_assertions = len(solver.assertions())
+
+    candidates = [
+        (secure, set(), False),
+        ({"root_login_allowed": False, "password_auth_enabled": True}, set(), True),
+        (secure, {'23'}, True),
+        (secure, set(), False),
+    ]
+    for config_v2, firewall_v2, expect_drift in candidates:
+        result_text = verifier.check_candidate(config_v2, firewall_v2)
+        assert ("CRITICAL DRIFT DETECTED" in result_text) == expect_drift
+        assert verifier.solver is solver
+        assert len(solver.assertions()) == baseline_assertions
+
+def strip_proof(result_text):
+    """Drops the (possibly multi-line) model printout, keeping verdict and reasons."""
+    lines = result_text.splitlines()
+    if len(lines) > 1 and lines[1].startswith("Proof of Conflict:"):
+        reason_start = next(i for i, line in enumerate(lines) if line.startswith("Reason:"))
+        return lines[:1] + lines[reason_start:]
+    return lines
+
+# TC-12: Differential Test (pure-Python fast path agrees with Z3 on randomized ground inputs)
+def test_fast_path_matches_z3():
+    rng = random.Random(20251017)
+    fast = PolicyVerifier()
+    z3_only = PolicyVerifier(fast_path=False)
+    port_pool = ['22', '23', '80', '443', '8080']
+
+    def random_state():
+        config = {"root_login_allowed": rng.random() < 0.3, "password_auth_enabled": rng.random() < 0.3}
+        return config, {p for p in port_pool if rng.random() < 0.25}
+
+    for _ in range(300):
+        config_v1, firewall_v1 = random_state()
+        config_v2, firewall_v2 = random_state()
+        expected = z3_only.check_security_drift(config_v1, config_v2, firewall_v1, firewall_v2)
+        actual = fast.check_security_drift(config_v1, config_v2, firewall_v1, firewall_v2)
+        assert strip_proof(actual) == strip_proof(expected)
+
+    assert fast.solver is None
+
+# TC-13: Unknown settings fall back to Z3 and are treated as possibly insecure
+def test_unknown_setting_uses_solver():
+    verifier = PolicyVerifier()
+    config_v1 = {"root_login_allowed": False, "password_auth_enabled": False}
+    config_v2 = {"root_login_allowed": None, "password_auth_enabled": False}
+
+    result_text = verifier.check_security_drift(config_v1, config_v2, set(), set())
+    assert "Auth Policy Violation" in result_text
+    assert verifier.solver is not None
+
+# TC-14: Bit-vector port encoding agrees with the per-port Bool encoding
+def test_bitvec_encoding_matches_bool():
+    rng = random.Random(20251018)
+    bool_encoding = PolicyVerifier(fast_path=False, port_encoding='bool')
+    bitvec_encoding = PolicyVerifier(fast_path=False, port_encoding='bitvec')
+    port_pool = ['22', '23', '80', '443', '8080']
+
+    for _ in range(100):
+        config_v1 = {"root_login_allowed": False, "password_auth_enabled": rng.random() < 0.2}
+        config_v2 = {"root_login_allowed": rng.random() < 0.2, "password_auth_enabled": False}
+        firewall_v1 = {p for p in port_pool if rng.random() < 0.2}
+        firewall_v2 = {p for p in port_pool if rng.random() < 0.3}
+        expected = bool_encoding.check_security_drift(config_v1, config_v2, firewall_v1, firewall_v2)
+        actual = bitvec_encoding.check_security_drift(config_v1, config_v2, firewall_v1, firewall_v2)
+        assert strip_proof(actual) == strip_proof(expected)
+
+        if "Network Policy Violation" in actual:
+            assert bitvec_encoding.last_violations['network_surface'] == \
+                sorted(firewall_v2 & {'22', '23', '80', '443'}, key=int)
+
+# TC-15: Explanations name only the changed settings and ports, with an unsat core on the Z3 path
+def test_explanation_names_only_changes():
+    import json
+
+    secure = {"root_login_allowed": False, "password_auth_enabled": False}
+    config_v2 = {"root_login_allowed": True, "password_auth_enabled": False}
+    firewall_v1, firewall_v2 = {'22'}, {'22', '23', '1234'}
+
+    explanations = []
+    for verifier in (PolicyVerifier(), PolicyVerifier(fast_path=False), PolicyVerifier(fast_path=False, port_encoding='bool')):
+        result_text = verifier.check_security_drift(secure, config_v2, set(), firewall_v2)
+        assert "Proof of Conflict: [root_login_allowed: False -> True, opened ports: {22, 23}]" in result_text
+        explanation = json.loads(json.dumps(verifier.last_explanation))
+        for violation in explanation['violations']:
+            changed = [f"v2.{s}" for s in violation['settings']] + [f"v2.port.{p}" for p in violation['ports']]
+            core = violation.pop('core')
+            assert len(core) == 1 and set(core) <= set(changed)
+        explanations.append(explanation)
+
+    assert explanations[0]['engine'] == 'fast_path' and explanations[1]['engine'] == 'z3'
+    assert all(e['violations'] == explanations[0]['violations'] for e in explanations)
+    assert [v['rule'] for v in explanations[0]['violations']] == ['auth_integrity', 'network_surface', 'service_hardening']
+    assert explanations[0]['violations'][0]['settings'] == {"root_login_allowed": {"v1": False, "v2": True}}
+
+    # The Z3 core is a changed fact that entails the violation on its own.
+    verifier = PolicyVerifier(fast_path=False)
+    verifier.check_security_drift(secure, config_v2, firewall_v1, firewall_v2)
+    assert [v['core'] for v in verifier.last_explanation['violations']] == [['v2.root_login_allowed'], ['v2.port.23']]
+
+    # A violation that rests on an unknown setting has no core.
+    verifier.check_security_drift(secure, {"root_login_allowed": None, "password_auth_enabled": False}, set(), set())
+    violation, = verifier.last_explanation['violations']
+    assert violation['settings'] == {"root_login_allowed": {"v1": False, "v2": None}} and violation['core'] is None
+
+    verifier.check_security_drift(secure, secure, set(), set())
+    assert verifier.last_explanation == {'verdict': 'PASS', 'engine': 'z3',
+                                         'policy': verifier.policy.version, 'violations': []}
+
+# TC-16: Every rule is an independent query; a rule that times out is UNKNOWN, the others still decide
+def pigeonhole(context, holes):
+    """holes + 1 pigeons in `holes` holes: unsatisfiable, and exponentially hard for Z3's SAT core."""
+    from z3 import And, Bool, Not, Or
+
+    sits = [[Bool(f"p{i}_{j}", ctx=context) for j in range(holes)] for i in range(holes + 1)]
+    every_pigeon = [Or(*row) for row in sits]
+    one_per_hole = [Or(Not(sits[a][j]), Not(sits[b][j]))
+                    for j in range(holes) for a in range(holes + 1) for b in range(a + 1, holes + 1)]
+    return And(*every_pigeon, *one_per_hole)
+
+def test_rule_timeout_reports_unknown():
+    import time
+
+    secure = {"root_login_allowed": False, "password_auth_enabled": False}
+    verifier = PolicyVerifier(fast_path=False, rule_timeout_ms=200)
+    verifier.load_baseline(secure, set())
+    slow = verifier.rule_solvers[0]
+    slow.add(pigeonhole(slow.ctx, 12))
+
+    # With root login unknown, deciding the auth rule needs the hard assertion solved.
+    unknown = {"root_login_allowed": None, "password_auth_enabled": False}
+    start = time.perf_counter()
+    result_text = verifier.check_candidate(unknown, {'23'})
+    assert time.perf_counter() - start < 5
+    assert list(verifier.last_unknown) == ['auth_integrity']
+    assert verifier.last_violated == ['network_surface', 'service_hardening']
+    assert result_text.startswith("CRITICAL DRIFT DETECTED") and "Undecided rules: auth_integrity" in result_text
+
+    result_text = verifier.check_candidate(unknown, set())
+    assert result_text.startswith("UNKNOWN") and verifier.last_explanation['verdict'] == 'UNKNOWN'
+    assert verifier.last_explanation['unknown'][0]['rule'] == 'auth_integrity'
+
+    verifier.close()
+    assert verifier._rule_executor is None
+
+
+def test_rule_timeouts_are_validated():
+    import argparse
+    import json
+    import pytest
+    from fcdm.fcdm_controller import non_negative_int
+    from fcdm.fcdm_policy import DEFAULT_POLICY_PATH, CompiledPolicy
+
+    assert non_negative_int("0") == 0
+    for text in ("-5", "ten"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            non_negative_int(text)
+    with pytest.raises(ValueError):
+        PolicyVerifier(rule_timeout_ms=-1)
+    assert PolicyVerifier(rule_timeout_ms=0).rule_timeout_ms == 0
+
+    with open(DEFAULT_POLICY_PATH) as f:
+        document = json.load(f)
+    document['rules'][0]['timeout_ms'] = True
+    with pytest.raises(ValueError):
+        CompiledPolicy(document)
+
 # --- Execution ---
 
 if __name__ == "__main__":
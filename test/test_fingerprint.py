@@ -0,0 +1,70 @@
+import json
+import os
+import sys
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_controller import FCDMController
+from fcdm.fcdm_extractor import FirmwareExtractor
+from fcdm.fcdm_fingerprint import FingerprintIndex, merkle_root
+from fcdm.fcdm_parser import ConfigParser
+from fcdm.fcdm_policy_verifier import PolicyVerifier
+from test_squashfs import firmware_files, write_image
+
+
+def make_controller(tmp_path):
+    return FCDMController(parser=ConfigParser(), verifier=PolicyVerifier(),
+                          extractor=FirmwareExtractor(base_dir=str(tmp_path)),
+                          log_file_path=str(tmp_path / "fcdm.log"),
+                          fingerprints=FingerprintIndex(str(tmp_path / "index")))
+
+
+def test_merkle_root_tracks_config_changes():
+    files = {("etc", "config", "dropbear"): b"a", ("etc", "config", "firewall"): b"b"}
+    assert merkle_root(files) == merkle_root(dict(reversed(list(files.items()))))
+    assert merkle_root(files) != merkle_root({**files, ("etc", "config", "firewall"): None})
+    assert merkle_root(files) != merkle_root({**files, ("etc", "config", "firewall"): b"c"})
+
+
+def test_unchanged_configs_return_the_cached_verdict(tmp_path, capsys):
+    files = firmware_files()
+    v1 = dict(files, **{"etc/config/dropbear": b"config dropbear\n\toption RootPasswordAuth 'off'\n",
+                        "etc/config/firewall": b"config defaults\n"})
+    v1_image = write_image(tmp_path, v1, name="v1.img")
+    nightly_1 = write_image(tmp_path, files, name="nightly-1.img")
+    # The rootfs changes outside etc/config, so the image bytes differ.
+    nightly_2 = write_image(tmp_path, dict(files, **{"usr/lib/big.bin": os.urandom(1000)}), name="nightly-2.img")
+
+    first = make_controller(tmp_path)
+    first.report_path = str(tmp_path / "first.json")
+    first.run_auth_integrity_audit(v1_image, nightly_1)
+
+    controller = make_controller(tmp_path)
+    controller.report_path = str(tmp_path / "cached.json")
+    controller.run_auth_integrity_audit(v1_image, nightly_2)
+    assert controller.last_metrics.cached_verdict
+    assert controller.last_metrics.verdict == 'DRIFT'
+    assert controller.verifier.last_engine is None
+    assert not os.path.exists(tmp_path / "_nightly-2.img.extracted")
+
+    output = capsys.readouterr().out
+    assert output.count("CRITICAL DRIFT DETECTED") == 2
+    assert output.count("Cached verdict") == 1
+
+    # The cached verdict carries the same structured drift report.
+    reports = []
+    for name in ("first.json", "cached.json"):
+        with open(tmp_path / name) as f:
+            report = json.load(f)
+        # Only the candidate path and the run differ.
+        del report['v2'], report['run_id']
+        reports.append(report)
+    assert reports[0] == reports[1] and reports[0]['verdict'] == 'DRIFT'
+
+    # A config change is a different fingerprint and is audited again.
+    edited = write_image(tmp_path, dict(files, **{"etc/config/firewall": b"config defaults\n"}), name="edited.img")
+    controller.run_auth_integrity_audit(v1_image, edited)
+    assert not controller.last_metrics.cached_verdict
+    assert controller.verifier.last_engine is not None
@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+from multiprocessing import Pool
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_log import LogSink, iter_records, last_run_id, log_files
+
+
+RECORDS_PER_WRITER = 300
+
+
+def write_records(args):
+    log_file_path, max_bytes = args
+    sink = LogSink(log_file_path, max_bytes=max_bytes, backups=50, buffer_size=16)
+    for index in range(RECORDS_PER_WRITER):
+        sink.emit(f"record {index} " + "x" * 40)
+    sink.flush()
+    return sink.run_id
+
+
+def test_parallel_writers_append_whole_records(tmp_path):
+    """
+    Verifies that concurrent processes never interleave or lose records,
+    including across size-based rotations.
+    """
+    log_file_path = str(tmp_path / "fcdm_analysis.log")
+    with Pool(4) as pool:
+        run_ids = pool.map(write_records, [(log_file_path, 64 * 1024)] * 4)
+
+    assert len(log_files(log_file_path, backups=50)) > 1
+    for path in log_files(log_file_path, backups=50):
+        with open(path) as f:
+            for line in f:
+                json.loads(line)
+
+    for run_id in run_ids:
+        records = list(iter_records(log_file_path, run_id=run_id, backups=50))
+        assert [record['msg'].split()[1] for record in records] == [str(i) for i in range(RECORDS_PER_WRITER)]
+
+
+def test_runs_are_filtered_and_buffered(tmp_path):
+    """Verifies that records are only written on flush and can be streamed per run."""
+    log_file_path = str(tmp_path / "fcdm_analysis.log")
+    sink = LogSink(log_file_path)
+    first = sink.run_id
+    sink.emit("first run")
+    assert not os.path.exists(log_file_path)
+
+    second = sink.start_run()
+    sink.emit("second run")
+    sink.flush()
+
+    assert [r['msg'] for r in iter_records(log_file_path, run_id=first)] == ["first run"]
+    assert [r['msg'] for r in iter_records(log_file_path, run_id=second)] == ["second run"]
+    assert last_run_id(log_file_path) == second
@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_parser import ConfigParser
+from fcdm.fcdm_policy import DEFAULT_POLICY_PATH, load_policy
+from fcdm.fcdm_policy_verifier import PolicyVerifier
+from test_batch import make_image
+
+
+def write_policy(tmp_path, extra_rules):
+    with open(DEFAULT_POLICY_PATH) as f:
+        document = json.load(f)
+    document['rules'] += extra_rules
+    policy_path = str(tmp_path / "policy.json")
+    with open(policy_path, 'w') as f:
+        json.dump(document, f)
+    return policy_path
+
+
+def test_components_share_one_compiled_policy():
+    parser, verifier = ConfigParser(), PolicyVerifier()
+    assert parser.policy is verifier.policy is load_policy()
+    assert verifier.policy.formulas() is PolicyVerifier().policy.formulas()
+
+
+def test_declared_rule_is_enforced_by_both_engines(tmp_path):
+    """A rule added to the policy file is parsed, evaluated and solved without code changes."""
+    policy = load_policy(write_policy(tmp_path, [{
+        "id": "alt_http", "kind": "ports", "ports": ["8080"],
+        "message": "Network Policy Violation: Alternate HTTP port 8080 was opened."
+    }]))
+    image = make_image(tmp_path, "v2", ports=['8080'])
+    parser = ConfigParser(policy=policy)
+    firewall_v2 = parser.parse_firewall_config(os.path.join(image, "squashfs-root", "etc", "config", "firewall"))
+    assert firewall_v2 == {'8080'}
+
+    secure = {"root_login_allowed": False, "password_auth_enabled": False}
+    fast = PolicyVerifier(policy=policy).check_security_drift(secure, secure, set(), firewall_v2)
+    solved = PolicyVerifier(fast_path=False, policy=policy).check_security_drift(secure, secure, set(), firewall_v2)
+    for result_text in (fast, solved):
+        assert "Alternate HTTP port 8080" in result_text
+        assert "Critical Port" not in result_text
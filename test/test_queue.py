@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_controller import FCDMController
+from fcdm.fcdm_extractor import FirmwareExtractor
+from fcdm.fcdm_parser import ConfigParser
+from fcdm.fcdm_policy_verifier import PolicyVerifier
+from fcdm.fcdm_queue import JobBroker, QueueWorker, open_broker, run_workers
+from fcdm.fcdm_results import ResultStore
+from test_batch import FIREWALL_RULE, make_image
+
+
+def make_worker(tmp_path, broker, worker_id):
+    controller = FCDMController(parser=ConfigParser(), verifier=PolicyVerifier(),
+                                extractor=FirmwareExtractor(base_dir=str(tmp_path)),
+                                log_file_path=str(tmp_path / "fcdm_analysis.log"))
+    return QueueWorker(broker, controller, worker_id=worker_id, lease_seconds=30, poll_interval=0.01)
+
+
+def test_submit_is_idempotent_and_lease_expiry_reclaims(tmp_path):
+    broker = open_broker(str(tmp_path / "queue"))
+    v1, v2 = make_image(tmp_path, "v1"), make_image(tmp_path, "v2", root='on')
+
+    job_id = broker.submit(v1, v2)
+    assert broker.submit(v1, v2) == job_id
+    assert broker.stats()['queued'] == 1
+
+    # A worker that claims the job and dies stops renewing its lease.
+    stale = broker.claim("dead-worker", lease_seconds=0.05)
+    assert broker.claim("other", lease_seconds=30) is None
+    time.sleep(0.1)
+
+    assert make_worker(tmp_path, broker, "live-worker").run_once() == 'done'
+    job = broker.get(job_id)
+    assert job['attempts'] == 2 and job['lease_owner'] == "live-worker"
+    assert job['result']['verdict'] == 'DRIFT'
+    assert job['result']['explanation']['violations'][0]['settings']['root_login_allowed']['v2'] is True
+
+    # The stale holder can no longer write or requeue the job.
+    assert broker.complete(job_id, stale['lease_token'], {'verdict': 'PASS'}) is False
+    assert broker.fail(job_id, stale['lease_token'], "late") is None
+    assert broker.get(job_id)['result']['verdict'] == 'DRIFT'
+    assert broker.submit(v1, v2) == job_id and broker.stats()['done'] == 1
+
+
+def test_edited_directories_are_queued_again(tmp_path):
+    broker = open_broker(str(tmp_path / "queue"))
+    v1, v2 = make_image(tmp_path, "v1"), make_image(tmp_path, "v2")
+    first = broker.submit(v1, v2)
+    assert make_worker(tmp_path, broker, "worker").run_once() == 'done'
+
+    # Editing a config file leaves the image directory's own size and mtime untouched.
+    stat = os.stat(v2)
+    with open(os.path.join(v2, "squashfs-root", "etc", "config", "firewall"), 'a') as f:
+        f.write(FIREWALL_RULE.format(port='23'))
+    os.utime(v2, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    second = broker.submit(v1, v2)
+    assert second != first and broker.get(second)['status'] == 'queued'
+    assert make_worker(tmp_path, broker, "worker").run_once() == 'done'
+    assert broker.get(first)['result']['verdict'] == 'PASS'
+    assert broker.get(second)['result']['verdict'] == 'DRIFT'
+    assert broker.submit(v1, v2) == second
+
+
+def test_incomplete_broker_cannot_be_constructed():
+    class SubmitOnly(JobBroker):
+        def submit(self, v1_path, v2_path, max_attempts=3):
+            return None
+
+    with pytest.raises(TypeError):
+        SubmitOnly()
+
+
+def test_failed_attempts_are_retried_then_failed(tmp_path):
+    broker = open_broker(str(tmp_path / "queue"))
+    broker.retry_delay = 0.01
+    job_id = broker.submit(make_image(tmp_path, "v1"), str(tmp_path / "missing"), max_attempts=2)
+    worker = make_worker(tmp_path, broker, "worker")
+
+    assert worker.run_once() == 'queued'
+    assert broker.get(job_id)['not_before'] > time.time() - 0.01
+    time.sleep(0.05)
+    assert worker.run_once() == 'failed'
+
+    job = broker.get(job_id)
+    assert job['attempts'] == 2 and "aborted" in job['error']
+    assert broker.stats() == {'queued': 0, 'leased': 0, 'done': 0, 'failed': 1}
+
+
+def test_retried_job_is_recorded_once(tmp_path):
+    broker = open_broker(str(tmp_path / "queue"))
+    broker.retry_delay = 0.01
+    v2 = str(tmp_path / "v2")
+    job_id = broker.submit(make_image(tmp_path, "v1"), v2)
+    worker = make_worker(tmp_path, broker, "worker")
+    worker.controller.results = results = ResultStore(str(tmp_path / "results.sqlite3"))
+
+    # The first attempt aborts on the missing candidate, the retry finds it.
+    assert worker.run_once() == 'queued'
+    make_image(tmp_path, "v2", root='on')
+    time.sleep(0.05)
+    assert worker.run_once() == 'done'
+
+    audits = results.query()
+    assert len(audits) == 1 and results.count(rule=audits[0]['rules'][0]) == 1
+    assert audits[0]['job_id'] == job_id and audits[0]['verdict'] == 'DRIFT'
+    worker.controller.close()
+
+
+def test_worker_processes_complete_each_job_once(tmp_path):
+    queue_dir = str(tmp_path / "queue")
+    broker = open_broker(queue_dir)
+    v1 = make_image(tmp_path, "v1")
+    candidates = [make_image(tmp_path, f"v2-{index}", ports=['23'] if index % 2 else ()) for index in range(6)]
+    for candidate in candidates:
+        broker.submit(v1, candidate)
+
+    exit_codes = run_workers(queue_dir, workers=2, use_cache=False, backend='squashfs', poll_interval=0.05,
+                             exit_when_idle=True, log_file_path=str(tmp_path / "fcdm_analysis.log"),
+                             results_path=str(tmp_path / "results.sqlite3"))
+
+    assert exit_codes == [0, 0]
+    jobs = broker.jobs()
+    assert [job['status'] for job in jobs] == ['done'] * 6
+    assert all(job['attempts'] == 1 for job in jobs)
+    verdicts = {job['v2']: job['result']['verdict'] for job in jobs}
+    assert verdicts == {candidate: 'DRIFT' if index % 2 else 'PASS' for index, candidate in enumerate(candidates)}
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_controller import FCDMController
+from fcdm.fcdm_extraction_store import ExtractionStore
+from fcdm.fcdm_extractor import FirmwareExtractor
+from fcdm.fcdm_parser import ConfigParser
+from fcdm.fcdm_policy_verifier import PolicyVerifier
+from fcdm.fcdm_results import ResultStore, parse_time, results_main
+from test_batch import make_image
+from test_squashfs import firmware_files, write_image
+
+
+def test_controller_records_audits_with_findings_and_model(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    controller = FCDMController(parser=ConfigParser(), verifier=PolicyVerifier(),
+                                extractor=FirmwareExtractor(base_dir=str(tmp_path)),
+                                log_file_path=str(tmp_path / "fcdm_analysis.log"), results=store)
+    v1 = make_image(tmp_path, "v1")
+    v2 = make_image(tmp_path, "v2", ports=['23'])
+    with open(os.path.join(v2, "squashfs-root", "etc", "device_info"), 'w') as f:
+        f.write("DEVICE_MANUFACTURER='TP-Link'\nDEVICE_PRODUCT='Archer C7'\nDEVICE_REVISION='v5'\n")
+
+    controller.run_auth_integrity_audit(v1, v2)
+    controller.run_auth_integrity_audit(v1, v1)
+    controller.run_auth_integrity_audit(v1, str(tmp_path / "missing"))
+
+    assert store.count() == 3
+    assert [audit['verdict'] for audit in store.query()] == ['ABORTED', 'PASS', 'DRIFT']
+    (audit,) = store.query(port='23', since=parse_time("1d"))
+    assert audit['v2_path'] == v2 and audit['device_model'] == "TP-Link Archer C7"
+    assert audit['ports'] == ['23'] and audit['run_id'] is not None
+    assert store.query(device_model="TP-Link*", verdict='DRIFT')[0]['id'] == audit['id']
+    assert store.query(config_hash=audit['v2_hash'][:8])[0]['id'] == audit['id'] and audit['v2_image'] is None
+    assert store.count(port='23', until=time.time() - 3600) == 0
+    assert store.count(rule='auth_integrity') == 0 and store.count(rule='network_surface') == 1
+
+
+def test_builds_are_grouped_by_image_hash(tmp_path):
+    store = ResultStore(str(tmp_path / "results.sqlite3"))
+    controller = FCDMController(parser=ConfigParser(), verifier=PolicyVerifier(),
+                                extractor=FirmwareExtractor(base_dir=str(tmp_path), backend='squashfs'),
+                                log_file_path=str(tmp_path / "fcdm_analysis.log"), results=store)
+    files = firmware_files()
+    v1 = write_image(tmp_path, files, name="v1.img")
+    # Two builds with the same policy files, so the same config fingerprint.
+    builds = [write_image(tmp_path, dict(files, **{"etc/banner": banner}), name=f"{index}.img")
+              for index, banner in enumerate((b"build 1\n", b"build 2\n"))]
+    for candidate in builds + builds[:1]:
+        controller.run_auth_integrity_audit(v1, candidate)
+
+    rows = store.builds()
+    assert len({audit['v2_hash'] for audit in store.query()}) == 1
+    assert sorted(row['audits'] for row in rows) == [1, 2]
+    assert {row['v2_image'] for row in rows} == {ExtractionStore.image_digest(path) for path in builds}
+    assert store.count(image_hash=rows[0]['v2_image'][:10]) == rows[0]['audits']
+
+
+def test_query_cli_filters_by_port_and_time(tmp_path, capsys):
+    db = str(tmp_path / "results.sqlite3")
+    store = ResultStore(db)
+    port_violation = {'rule': 'network_surface', 'settings': {}, 'ports': ['23']}
+    store.record_many([
+        {'ts': parse_time("2026-05-10"), 'v2_path': '/img/a', 'v2_hash': 'aa', 'verdict': 'DRIFT',
+         'violations': [port_violation]},
+        {'ts': parse_time("2026-08-10"), 'v2_path': '/img/b', 'v2_hash': 'bb', 'verdict': 'DRIFT',
+         'violations': [port_violation]},
+        {'ts': parse_time("2026-08-11"), 'v2_path': '/img/c', 'v2_hash': 'cc', 'verdict': 'PASS'},
+    ])
+    store.close()
+
+    assert results_main(['--db', db, '--port', '23', '--since', '2026-07-01', '--until', '2026-10-01']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 1 and "/img/b" in lines[0] and "ports=23" in lines[0]
+
+    assert results_main(['--db', db, '--verdict', 'DRIFT', '--count']) == 0
+    assert capsys.readouterr().out.strip() == "2"
@@ -0,0 +1,111 @@
+import os
+import random
+import sys
+
+import pytest
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_extractor import FirmwareExtractor
+from fcdm.fcdm_squashfs import SquashFSError, SquashFSImage
+from squashfs_builder import build_squashfs
+from test_batch import DROPBEAR, FIREWALL_RULE
+
+
+def firmware_files():
+    return {
+        "etc/config/dropbear": DROPBEAR.format(root='on', password='off').encode(),
+        "etc/config/firewall": FIREWALL_RULE.format(port='23').encode(),
+        "etc/config/network": b"config interface 'lan'\n",
+        "etc/banner": b"OpenWrt\n",
+        "usr/lib/big.bin": os.urandom(300000),
+        "var": "tmp",
+        "tmp/run": b"",
+    }
+
+
+def write_image(tmp_path, files, name="firmware.img", **options):
+    # A fake kernel in front of the filesystem, like a real sysupgrade image.
+    image_path = os.path.join(tmp_path, name)
+    with open(image_path, 'wb') as f:
+        f.write(b"\x27\x05\x19\x56" + os.urandom(70000))
+        f.write(build_squashfs(files, **options))
+    return image_path
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"compression": "xz"},
+    {"fragments": False, "block_size": 4096},
+])
+def test_reads_files_without_unpacking(tmp_path, options):
+    files = firmware_files()
+    image_path = write_image(tmp_path, files, **options)
+
+    with SquashFSImage(image_path) as image:
+        assert image.offset == 70004
+        for path, content in files.items():
+            if isinstance(content, bytes):
+                assert image.read_file(path) == content
+        assert image.read_file("var/run") == b""
+        assert image.read_file("etc/config/missing") is None
+        assert image.read_file("etc/config") is None
+
+
+def test_rejects_images_without_squashfs(tmp_path):
+    image_path = os.path.join(tmp_path, "blob.img")
+    with open(image_path, 'wb') as f:
+        f.write(b"hsqs" + os.urandom(4096))
+
+    with pytest.raises(SquashFSError):
+        SquashFSImage(image_path)
+
+
+def test_extractor_backend_keeps_extract_config_api(tmp_path):
+    image_path = write_image(tmp_path, firmware_files())
+    extractor = FirmwareExtractor(base_dir=str(tmp_path), backend='squashfs')
+
+    config_path = extractor.extract_config(image_path)
+    firewall_path = extractor.get_firewall_path()
+
+    assert config_path == os.path.join(tmp_path, "_firmware.img.extracted", "squashfs-root", "etc", "config", "dropbear")
+    with open(firewall_path, 'rb') as f:
+        assert f.read() == firmware_files()["etc/config/firewall"]
+    # Only the requested config files are materialized.
+    assert sorted(os.listdir(os.path.dirname(config_path))) == ["dropbear", "firewall"]
+
+
+def test_corrupted_tables_raise_squashfs_error(tmp_path):
+    files = {"etc/config/dropbear": b"config dropbear\n", "etc/config/firewall": b"config defaults\n"}
+    image_path = write_image(tmp_path, files)
+    with SquashFSImage(image_path) as image:
+        offset, pointer_at = image.offset, image.offset + image.fragment_table_start
+    with open(image_path, 'rb') as f:
+        data = bytearray(f.read())
+
+    # A fragment table pointer far past the end of the image.
+    data[pointer_at:pointer_at + 8] = (0x7FFFFFFFFFFFFFF0).to_bytes(8, 'little')
+    with open(image_path, 'wb') as f:
+        f.write(data)
+    with SquashFSImage(image_path) as image, pytest.raises(SquashFSError):
+        image.read_file("etc/config/dropbear")
+    assert FirmwareExtractor(base_dir=str(tmp_path), backend='squashfs').extract_config(image_path) is None
+
+    # Random byte flips anywhere in the filesystem never escape as anything but SquashFSError.
+    rng = random.Random(1)
+    with open(write_image(tmp_path, files, name="clean.img"), 'rb') as f:
+        clean = f.read()
+    for _ in range(200):
+        mutated = bytearray(clean)
+        for _ in range(4):
+            mutated[rng.randrange(offset + 96, len(mutated))] = rng.randrange(256)
+        with open(image_path, 'wb') as f:
+            f.write(mutated)
+        with SquashFSImage(image_path, offset=offset) as image:
+            for path in files:
+                try:
+                    image.read_file(path)
+                except SquashFSError:
+                    pass
@@ -0,0 +1,51 @@
+"""Startup regression benchmark: `python -X importtime -m fcdm` must stay light for --version/--log."""
+import os
+import subprocess
+import sys
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+
+# Cumulative import budget of fcdm.fcdm_controller; z3, pyfiglet and asyncio alone exceed it.
+STARTUP_BUDGET_US = int(os.environ.get('FCDM_STARTUP_BUDGET_MS', '60')) * 1000
+LAZY_MODULES = ('z3', 'pyfiglet', 'colorama', 'asyncio', 'fcdm.fcdm_extractor', 'fcdm.fcdm_policy_verifier')
+
+
+def import_times(*args, home):
+    """Runs python -X importtime and returns {module: cumulative microseconds}."""
+    env = dict(os.environ, HOME=str(home))
+    completed = subprocess.run([sys.executable, '-X', 'importtime', *args],
+                               cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr[-2000:]
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line.split('|')
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+def check_startup(*args, home):
+    times = import_times('-m', 'fcdm', *args, home=home)
+
+    assert 'fcdm.fcdm_controller' in times
+    assert [module for module in LAZY_MODULES if module in times] == []
+    assert times['fcdm.fcdm_controller'] < STARTUP_BUDGET_US
+
+
+def test_version_startup_budget(tmp_path):
+    check_startup('--version', home=tmp_path)
+
+
+def test_log_startup_budget(tmp_path):
+    check_startup('--log', home=tmp_path)
+
+
+def test_ground_verification_does_not_import_z3(tmp_path):
+    code = ("import sys; from fcdm.fcdm_policy_verifier import PolicyVerifier; "
+            "cfg = {'root_login_allowed': False, 'password_auth_enabled': False}; "
+            "PolicyVerifier().check_security_drift(cfg, cfg, set(), {'23'}); "
+            "assert 'z3' not in sys.modules")
+    times = import_times('-c', code, home=tmp_path)
+    assert 'fcdm.fcdm_policy_verifier' in times and 'z3' not in times
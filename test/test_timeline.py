@@ -0,0 +1,34 @@
+import os
+import sys
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_timeline import Timeline, run_timeline
+from test_batch import make_image
+
+
+def make_series(tmp_path, count, regress_at):
+    """Releases before `regress_at` are clean; from it on telnet is opened."""
+    return [make_image(tmp_path, f"r{index:02d}", ports=['23'] if index >= regress_at else [])
+            for index in range(count)]
+
+
+def test_timeline_table_and_first_regression(tmp_path):
+    paths = make_series(tmp_path, 6, regress_at=3)
+    rows, first = run_timeline(paths)
+
+    assert first == 3
+    assert [row['baseline'] for row in rows] == ['BASE', 'PASS', 'PASS', 'DRIFT', 'DRIFT', 'DRIFT']
+    assert [row['previous'] for row in rows] == ['-', 'PASS', 'PASS', 'DRIFT', 'PASS', 'PASS']
+    assert rows[3]['rules'] == ['network_surface', 'service_hardening']
+
+
+def test_bisect_parses_logarithmically(tmp_path):
+    paths = make_series(tmp_path, 33, regress_at=21)
+    os.rename(os.path.join(paths[16], "squashfs-root"), os.path.join(paths[16], "broken"))
+
+    timeline = Timeline(paths)
+    assert timeline.first_regression() == 21
+    assert timeline.parses <= 9
@@ -0,0 +1,134 @@
+import os
+import pickle
+import random
+import shlex
+import sys
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from fcdm.fcdm_parser import ConfigParser
+from fcdm.fcdm_cache import ParseCache
+from fcdm.fcdm_records import DropbearSettings, PortSet
+from fcdm.fcdm_uci import ReadLimits, UCIStream, parse_sections, tokenize
+
+
+FIREWALL = """
+config defaults
+\toption input 'REJECT'
+
+config rule 'wan_web'
+\toption name 'Allow Web UI'   # inline comment
+\toption src 'wan'
+\tlist dest_port '80'
+\tlist dest_port '443'
+\toption target 'ACCEPT'
+
+config rule
+\toption src 'lan'
+\toption dest_port '23'
+\toption target 'ACCEPT'
+"""
+
+DROPBEAR = """
+config dropbear
+\toption PasswordAuth 'off'
+\toption RootPasswordAuth 'off'
+
+config dropbear 'debug'
+\toption PasswordAuth 'on'
+\toption Port '2222'
+"""
+
+
+def test_sections_are_typed_records_with_lists():
+    sections = list(parse_sections(FIREWALL.splitlines(), 'firewall'))
+
+    assert [s.section_type for s in sections] == ['defaults', 'rule', 'rule']
+    web = sections[1]
+    assert web.name == 'wan_web'
+    assert web.get('name') == 'Allow Web UI'
+    assert web.values('dest_port') == ['80', '443']
+
+
+def test_stream_dispatches_only_subscribed_sections(tmp_path):
+    (tmp_path / "firewall").write_text(FIREWALL)
+    (tmp_path / "dropbear").write_text(DROPBEAR)
+    (tmp_path / "network").write_text("config interface 'lan'\n")
+
+    seen = []
+    stream = UCIStream()
+    stream.subscribe('firewall', seen.append, section_type='rule')
+    stream.subscribe('dropbear', seen.append)
+    stream.scan(str(tmp_path))
+
+    assert [(s.package, s.section_type) for s in seen] == [
+        ('dropbear', 'dropbear'), ('dropbear', 'dropbear'), ('firewall', 'rule'), ('firewall', 'rule')]
+
+
+def test_config_dir_matches_per_file_parsing(tmp_path):
+    (tmp_path / "firewall").write_text(FIREWALL)
+    (tmp_path / "dropbear").write_text(DROPBEAR)
+    parser = ConfigParser()
+
+    policy_settings, open_ports = parser.parse_config_dir(str(tmp_path))
+
+    assert policy_settings == parser.parse_dropbear_config(str(tmp_path / "dropbear"))
+    assert open_ports == parser.parse_firewall_config(str(tmp_path / "firewall"))
+    # The second dropbear instance re-enables password logins.
+    assert policy_settings == {"root_login_allowed": False, "password_auth_enabled": True}
+    assert open_ports == {'80', '443'}
+
+
+def test_parsed_state_is_compact_records(tmp_path):
+    (tmp_path / "firewall").write_text(FIREWALL)
+    (tmp_path / "dropbear").write_text(DROPBEAR)
+    parser = ConfigParser(cache=ParseCache(str(tmp_path / "cache")))
+
+    for _ in range(2):  # the second pass is served from the cache
+        policy_settings, open_ports = parser.parse_config_dir(str(tmp_path))
+        assert isinstance(policy_settings, DropbearSettings) and isinstance(open_ports, PortSet)
+        assert dict(policy_settings) == {"root_login_allowed": False, "password_auth_enabled": True}
+        assert list(open_ports) == ['80', '443'] and '80' in open_ports and '22' not in open_ports
+
+    assert parser.policy.port_mask(open_ports) == parser.policy.port_mask({'80', '443'})
+    assert pickle.loads(pickle.dumps((policy_settings, open_ports))) == (policy_settings, {'443', '80'})
+    assert hash(open_ports) == hash(frozenset({'80', '443'}))
+    keys = [key for s in parse_sections(FIREWALL.splitlines(), 'firewall') for key in s.options]
+    assert all(key is sys.intern(key) for key in keys)
+
+
+def test_hostile_input_is_truncated_with_diagnostics(tmp_path):
+    """A giant line, too many sections and an oversize file are cut off, not loaded."""
+    hostile = ("config rule\n\toption name '" + "A" * 200000 + "'\n" + FIREWALL
+               + "config rule\n\toption src 'wan'\n" * 50 + "# padding\n" * 5000)
+    (tmp_path / "firewall").write_text(hostile)
+    (tmp_path / "dropbear").write_text(DROPBEAR)
+    size_limit = len(hostile) - 1000
+
+    for max_sections, expected in ((20, ['line_length', 'section_count']), (1000, ['file_size', 'line_length'])):
+        limits = ReadLimits(max_line_length=1024, max_sections=max_sections, max_file_size=size_limit)
+        for cache in (None, ParseCache(str(tmp_path / "cache"))):
+            diagnostics = []
+            parser = ConfigParser(cache=cache, limits=limits)
+            _, open_ports = parser.parse_config_dir(str(tmp_path), diagnostics=diagnostics)
+
+            assert open_ports == {'80', '443'}
+            assert sorted(d['kind'] for d in diagnostics) == expected
+            assert parser.bytes_read <= size_limit + len(DROPBEAR)
+
+
+def test_tokenizer_matches_shlex():
+    """The linear-time tokenizer agrees with shlex (and its legacy fallback) on random lines."""
+    rng = random.Random(2025)
+
+    def reference(line):
+        try:
+            return shlex.split(line, comments=True)
+        except ValueError:
+            return [part.strip("'\"") for part in line.split()]
+
+    for _ in range(20000):
+        line = ''.join(rng.choice("ab '#\t\"\\\r") for _ in range(rng.randint(0, 14)))
+        assert tokenize(line) == reference(line)